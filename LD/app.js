@@ -418,7 +418,9 @@ function exportData() {
       turnMode,
       turnShown: parseFloat(document.getElementById("turnValue").innerText) || 0,
       clinical
-    }
+    },
+    geometry: { width: WIDTH, height: HEIGHT, boxSize: BOX_SIZE, startBox, finishBox },
+    touches: touches.map(t => t.points)   // one stroke per pointerdown: [[x, y, t_ms], ...]
   };
 
   const blob = new Blob([JSON.stringify(exportObj, null, 2)], { type: "application/json" });
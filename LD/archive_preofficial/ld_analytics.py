@@ -0,0 +1,281 @@
+# ld_analytics.py
+# Line Drawing metrics recomputed offline from the raw touch streams (LD/app.js export `touches`:
+# strokes of [x, y, t_ms], or sessions from common/cmq_trajstore.py)
+# - Same definitions as app.js:
+#   deviation  = calcDeviation (distance to the S-centre -> F-centre line), summed over every recorded point
+#                except pointer-downs inside the start box (deviationArea; average = area / points)
+#   turns      = sign changes of dx / dy between consecutive points of a stroke, the previous sign carried
+#                across strokes from 0 (horizontalTurns / verticalTurns, avg deviation at the turn points)
+#   discontinuities = strokes after the first; off-by = points with last <= th < d (last = 0 at stroke start)
+#   clinical   = computeClinicalScore (outOfBounds / startFails are not in the trajectory: from the export stats)
+# - Vectorized over points and over sessions: any number of sessions concatenated (one array per column,
+#   session id per point) -> one pass of array ops + bincount, no per-point / per-session Python loop
+# - Off-by sweep: all thresholds at once from the sorted [last, d) crossing intervals
+#   (count(th) = #{last <= th} - #{d <= th}), O((points + thresholds) log) instead of a rescan per threshold
+
+import os, sys, glob, json, time, argparse
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Dict, Tuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+WIDTH, HEIGHT, BOX_SIZE = 900, 600, 50
+TESTS = {   # app.js `tests`: (startBox, finishBox) top-left corners
+    "Horizontal Test": ((10, HEIGHT/2 - BOX_SIZE/2), (WIDTH - 10 - BOX_SIZE, HEIGHT/2 - BOX_SIZE/2)),
+    "Vertical Test":   ((WIDTH/2 - BOX_SIZE/2, 10), (WIDTH/2 - BOX_SIZE/2, HEIGHT - 10 - BOX_SIZE)),
+    "Diagonal Test 1": ((10, 10), (WIDTH - 10 - BOX_SIZE, HEIGHT - 10 - BOX_SIZE)),
+    "Diagonal Test 2": ((10, HEIGHT - 10 - BOX_SIZE), (WIDTH - 10 - BOX_SIZE, 10)),
+}
+OFFBY_THRESHOLD = 10.0
+CLINICAL_DIVISORS = dict(dev=500.0, turn=150.0, dis=5.0, bounds=3.0)
+CLINICAL_LEVELS = [(0.5, "Normal, smooth, accurate movement"),
+                   (1.5, "Slight tremor or inaccuracy, but target achieved"),
+                   (2.5, "Moderate tremor; instability present but functional"),
+                   (3.5, "Severe tremor; frequent overshoot or instability"),
+                   (np.inf, "Inability to reach target or complete task")]
+
+# -------------------------
+# Geometry
+# -------------------------
+def session_geometry(geometry: Optional[Dict] = None, test: str = "") -> Tuple[float, ...]:
+    # -> (start box x, y, finish box x, y, box size); export geometry first, else the app's test layout
+    if geometry and geometry.get("startBox") and geometry.get("finishBox"):
+        box = float(geometry.get("boxSize", BOX_SIZE))
+        return (*map(float, geometry["startBox"]), *map(float, geometry["finishBox"]), box)
+    if test not in TESTS:
+        raise ValueError(f"no geometry and unknown test {test!r}")
+    (sx, sy), (fx, fy) = TESTS[test]
+    return float(sx), float(sy), float(fx), float(fy), float(BOX_SIZE)
+
+def deviation(x, y, geom) -> np.ndarray:
+    # calcDeviation; geom (5,) or per-point (N, 5)
+    g = np.asarray(geom, dtype=float)
+    half = g[..., 4]/2
+    sx, sy, ex, ey = g[..., 0] + half, g[..., 1] + half, g[..., 2] + half, g[..., 3] + half
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m = (ey - sy)/(ex - sx)
+        a, c = -m, -sy + m*sx
+        d = np.abs(a*x + y + c)/np.sqrt(a*a + 1)
+    return np.where(sx != ex, d, np.abs(x - sx))
+
+def _inside(x, y, bx, by, box) -> np.ndarray:
+    return (x >= bx) & (x <= bx + box) & (y >= by) & (y <= by + box)
+
+# -------------------------
+# Metrics
+# -------------------------
+def strokes_to_arrays(strokes: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # [[x, y, t_ms], ...] per stroke (or {"points": [...]}) -> x, y, t (s), stroke-start flags
+    pts = [np.asarray(s["points"] if isinstance(s, dict) else s, dtype=float).reshape(-1, 3) for s in strokes]
+    pts = [p for p in pts if len(p)]
+    if not pts:
+        return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool)
+    lens = np.array([len(p) for p in pts])
+    a = np.concatenate(pts)
+    start = np.zeros(len(a), dtype=bool)
+    start[np.cumsum(lens) - lens] = True
+    return a[:, 0], a[:, 1], a[:, 2]/1000.0, start
+
+def ld_metrics_batch(x, y, start, session, geoms, thresholds: Optional[Sequence[float]] = None,
+                     offby_threshold: float = OFFBY_THRESHOLD, t=None) -> Dict[str, np.ndarray]:
+    # x, y, start (stroke start), session (ids 0..S-1, non-decreasing): (N,); geoms: (S, 5)
+    # -> per-session arrays (S,), "offby_sweep" (S, T) when thresholds are given
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    start = np.asarray(start, dtype=bool)
+    session = np.asarray(session, dtype=np.int64)
+    geoms = np.atleast_2d(np.asarray(geoms, dtype=float))
+    S = len(geoms)
+    first = np.ones(len(x), dtype=bool)
+    first[1:] = session[1:] != session[:-1]
+    start = start | first
+    g = geoms[session]
+    d = deviation(x, y, g)
+    count = lambda mask, w=None: np.bincount(session[mask], None if w is None else w[mask], minlength=S)
+
+    # deviation area: every point except pointer-downs inside the start box
+    counted = ~(start & _inside(x, y, g[:, 0], g[:, 1], g[:, 4]))
+    n_points = count(np.ones(len(x), dtype=bool))
+    n_strokes = count(start)
+    area = count(counted, d)
+
+    # turns: moves only; previous sign carried over strokes, 0 at session start
+    move = ~start
+    out = dict(n_points=n_points, n_strokes=n_strokes, discontinuities=np.maximum(n_strokes - 1, 0),
+               deviation_area=area, deviation_avg=np.divide(area, n_points, out=np.zeros(S), where=n_points > 0))
+    prev_x, prev_y = np.roll(x, 1), np.roll(y, 1)
+    ms = session[move]
+    new_sess = np.ones(len(ms), dtype=bool)
+    new_sess[1:] = ms[1:] != ms[:-1]
+    for axis, cur, prev in (("horizontal", x, prev_x), ("vertical", y, prev_y)):
+        s = np.sign(cur[move] - prev[move])
+        last = np.roll(s, 1)
+        last[new_sess] = 0
+        turn = s != last
+        n = np.bincount(ms[turn], minlength=S)
+        dist = np.bincount(ms[turn], d[move][turn], minlength=S)
+        out[f"{axis}_turns"] = n
+        out[f"avg_{axis}_turn_dist"] = np.divide(dist, n, out=np.zeros(S), where=n > 0)
+
+    # off-by: crossings last <= th < d, last = 0 at stroke start
+    last_d = np.roll(d, 1)
+    last_d[start] = 0.0
+    up = last_d < d
+    lo, hi, sid = last_d[up], d[up], session[up]
+    out["offby"] = np.bincount(sid[(lo <= offby_threshold) & (offby_threshold < hi)], minlength=S)
+    if thresholds is not None:
+        out["offby_sweep"] = offby_sweep(lo, hi, sid, S, thresholds)
+    if t is not None:
+        t = np.asarray(t, dtype=float)
+        t_first = np.full(S, np.nan)
+        t_last = np.full(S, np.nan)
+        t_first[session[first]] = t[first]
+        last_pt = np.append(first[1:], True)
+        t_last[session[last_pt]] = t[last_pt]
+        out["duration_sec"] = t_last - t_first
+    return out
+
+def offby_sweep(lo, hi, sid, n_sessions: int, thresholds: Sequence[float]) -> np.ndarray:
+    # crossing intervals [lo, hi) per session -> (S, T) counts: +1 from the first threshold >= lo,
+    # -1 from the first threshold >= hi, cumulative sum along the sorted thresholds
+    th = np.asarray(thresholds, dtype=float)
+    order = np.argsort(th, kind="stable")
+    ths = th[order]
+    T = len(ths)
+    i_lo = np.searchsorted(ths, lo, side="left")
+    i_hi = np.searchsorted(ths, hi, side="left")
+    acc = (np.bincount(sid*(T + 1) + i_lo, minlength=n_sessions*(T + 1))
+           - np.bincount(sid*(T + 1) + i_hi, minlength=n_sessions*(T + 1)))
+    counts = np.cumsum(acc.reshape(n_sessions, T + 1), axis=1)[:, :T]
+    out = np.empty_like(counts)
+    out[:, order] = counts
+    return out
+
+def clinical_score(m: Dict, out_of_bounds=0, start_fails=0, turn_mode: str = "avgVertical") -> Dict:
+    # computeClinicalScore (vectorized over sessions; the export rounds to 2 decimals)
+    turn = m["vertical_turns"] if turn_mode == "avgVertical" else m["horizontal_turns"]
+    div = CLINICAL_DIVISORS
+    score_dev = np.minimum(4, m["deviation_area"]/div["dev"])
+    score_turn = np.minimum(4, np.asarray(turn)/div["turn"])
+    score_dis = np.minimum(4, (m["discontinuities"] + m["horizontal_turns"])/div["dis"])
+    score_bounds = np.minimum(4, (np.asarray(out_of_bounds) + np.asarray(start_fails))/div["bounds"])
+    sara = (score_dev + score_turn + score_dis + score_bounds)/4
+    cuts = np.array([c for c, _ in CLINICAL_LEVELS[:-1]])
+    desc = np.array([s for _, s in CLINICAL_LEVELS])[np.searchsorted(cuts, sara, side="right")]
+    return dict(score_dev=score_dev, score_turn=score_turn, score_dis=score_dis, score_bounds=score_bounds,
+                sara_score=sara, description=desc)
+
+def ld_metrics(strokes: Sequence, geometry: Optional[Dict] = None, test: str = "",
+               thresholds: Optional[Sequence[float]] = None, offby_threshold: float = OFFBY_THRESHOLD) -> Dict:
+    # one session -> scalars (+ "offby_sweep" list)
+    x, y, t, start = strokes_to_arrays(strokes)
+    m = ld_metrics_batch(x, y, start, np.zeros(len(x), dtype=np.int64), [session_geometry(geometry, test)],
+                         thresholds, offby_threshold, t=t)
+    return {k: (v[0].tolist() if np.ndim(v) > 1 else v[0].item()) for k, v in m.items()}
+
+# -------------------------
+# Batch (LD JSON exports / trajectory store)
+# -------------------------
+def round2(v) -> np.ndarray:
+    # JS +v.toFixed(2): exact binary value, ties up (np.round rounds half to even on the scaled value)
+    q = Decimal("0.01")
+    return np.array([float(Decimal(float(a)).quantize(q, ROUND_HALF_UP)) for a in np.ravel(v)]).reshape(np.shape(v))
+
+METRIC_COLS = ["n_points", "n_strokes", "duration_sec", "deviation_area", "deviation_avg", "horizontal_turns",
+               "vertical_turns", "avg_horizontal_turn_dist", "avg_vertical_turn_dist", "discontinuities", "offby"]
+
+def _frame(keys: List[Dict], m: Dict, thresholds, extra: Dict) -> pd.DataFrame:
+    df = pd.DataFrame(keys)
+    for c in METRIC_COLS:
+        df[c] = m[c]
+    for k, v in clinical_score(m, extra["out_of_bounds"], extra["start_fails"]).items():
+        df[k] = v if k == "description" else round2(v)
+    if thresholds is not None:
+        sweep = pd.DataFrame(m["offby_sweep"], columns=[f"offby_{th:g}" for th in thresholds])
+        df = pd.concat([df, sweep], axis=1)
+    return df
+
+def analyse_files(paths: List[str], thresholds=None, offby_threshold: float = OFFBY_THRESHOLD) -> pd.DataFrame:
+    keys, xs, ys, ts, starts, sess, geoms, oob, sf = [], [], [], [], [], [], [], [], []
+    for p in paths:
+        key = dict(record_id=os.path.splitext(os.path.basename(p))[0], path=p, status="ok", error="")
+        try:
+            with open(p, encoding="utf-8") as f:
+                obj = json.load(f)
+            x, y, t, start = strokes_to_arrays(obj.get("touches") or [])
+            if not len(x):
+                raise ValueError("no touches")
+            geom = session_geometry(obj.get("geometry"), obj.get("test", ""))
+        except Exception as e:
+            keys.append(dict(key, status="error", error=f"{type(e).__name__}: {e}"))
+            continue
+        stats = obj.get("stats") or {}
+        key.update(pid=str((obj.get("patient") or {}).get("id", "")), test=obj.get("test", ""))
+        keys.append(key)
+        xs.append(x); ys.append(y); ts.append(t); starts.append(start)
+        sess.append(np.full(len(x), len(geoms)))
+        geoms.append(geom)
+        oob.append(stats.get("outOfBounds", 0)); sf.append(stats.get("startFails", 0))
+    ok = [k for k in keys if k["status"] == "ok"]
+    if not ok:
+        return pd.DataFrame(keys)
+    m = ld_metrics_batch(np.concatenate(xs), np.concatenate(ys), np.concatenate(starts), np.concatenate(sess),
+                         geoms, thresholds, offby_threshold, t=np.concatenate(ts))
+    df = _frame(ok, m, thresholds, dict(out_of_bounds=np.array(oob), start_fails=np.array(sf)))
+    return pd.concat([df, pd.DataFrame([k for k in keys if k["status"] != "ok"])], ignore_index=True)
+
+def analyse_store(root: str, thresholds=None, offby_threshold: float = OFFBY_THRESHOLD) -> pd.DataFrame:
+    # all LD sessions of a common/cmq_trajstore.py store in one pass over the mapped columns
+    # (x / y stored as float32: deviations agree with the JSON path to ~1e-4 px)
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                    "common"))
+    from cmq_trajstore import TrajStore, FLAG_START
+    store = TrajStore(root)
+    keys = sorted(store.keys(module="LD", kind="ld"), key=lambda k: store.index["sessions"][k]["start"])
+    if not keys:
+        return pd.DataFrame()
+    info = [store.index["sessions"][k] for k in keys]
+    cols = store.columns()
+    rows = np.concatenate([np.arange(s["start"], s["stop"]) for s in info])
+    sess = np.repeat(np.arange(len(info)), [s["n"] for s in info])
+    geoms = [session_geometry(s["meta"].get("geometry"), s["meta"].get("test", "")) for s in info]
+    m = ld_metrics_batch(cols["x"][rows], cols["y"][rows], (cols["flags"][rows] & FLAG_START) > 0, sess, geoms,
+                         thresholds, offby_threshold, t=cols["t"][rows])
+    keys_df = [dict(record_id=s["record_id"], path=s["source"], status="ok", error="", pid=s["pid"],
+                    test=s["meta"].get("test", "")) for s in info]
+    zeros = np.zeros(len(info))
+    return _frame(keys_df, m, thresholds, dict(out_of_bounds=zeros, start_fails=zeros))
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Line Drawing metrics from exported touch streams")
+    parser.add_argument("inputs", nargs="*", help="LD JSON exports, directories or globs")
+    parser.add_argument("--store", default=None, help="common/cmq_trajstore.py store instead of JSON files")
+    parser.add_argument("--offby", type=float, default=OFFBY_THRESHOLD, help="off-by threshold (px)")
+    parser.add_argument("--sweep", type=float, nargs=3, metavar=("START", "STOP", "STEP"), default=None,
+                        help="extra off-by columns for thresholds START..STOP (px)")
+    parser.add_argument("--out", default="ld_metrics.csv")
+    args = parser.parse_args()
+
+    thresholds = None
+    if args.sweep:
+        a, b, s = args.sweep
+        thresholds = np.round(np.arange(a, b + s/2, s), 6)
+    t0 = time.perf_counter()
+    if args.store:
+        df = analyse_store(args.store, thresholds, args.offby)
+    else:
+        paths = sorted({p for spec in args.inputs for p in
+                        (glob.glob(os.path.join(spec, "**", "*.json"), recursive=True) if os.path.isdir(spec)
+                         else glob.glob(spec))})
+        if not paths:
+            parser.error("no LD exports found")
+        df = analyse_files(paths, thresholds, args.offby)
+    df.to_csv(args.out, index=False)
+    n_ok = int((df["status"] == "ok").sum()) if len(df) else 0
+    print(f"=== {n_ok}/{len(df)} sessions in {time.perf_counter() - t0:.2f}s"
+          + (f", {len(thresholds)} off-by thresholds" if thresholds is not None else ""))
+    print("Saved:", args.out)
@@ -0,0 +1,99 @@
+# test_ld_analytics.py
+# ld_metrics_batch vs a per-point replay of LD/app.js (pointerdown / pointermove handlers, updateOffBy,
+# averageTurnDistance) on random multi-stroke sessions of every test layout
+
+import math
+
+import numpy as np
+
+from ld_analytics import (TESTS, session_geometry, strokes_to_arrays, ld_metrics_batch, ld_metrics, offby_sweep,
+                          clinical_score)
+
+def _ref_session(strokes, geom, th=10.0):
+    sx0, sy0, fx0, fy0, box = geom
+    sx, sy, ex, ey = sx0 + box/2, sy0 + box/2, fx0 + box/2, fy0 + box/2
+    def calc_dev(x, y):
+        if sx != ex:
+            m = (ey - sy)/(ex - sx)
+            a, c = -m, -sy + m*sx
+            return abs(a*x + y + c)/math.sqrt(a*a + 1)
+        return abs(x - sx)
+    inside = lambda x, y: sx0 <= x <= sx0 + box and sy0 <= y <= sy0 + box
+    area, dx, dy, turns, offby = 0.0, 0, 0, [], 0
+    norm = lambda a: 1 if a > 0 else -1 if a < 0 else 0
+    for pts in strokes:
+        x0, y0 = pts[0][:2]
+        if not inside(x0, y0):
+            area += calc_dev(x0, y0)
+        for (lx, ly, _), (x, y, _) in zip(pts[:-1], pts[1:]):
+            d = calc_dev(x, y)
+            area += d
+            dx_now, dy_now = norm(x - lx), norm(y - ly)
+            if dx != dx_now: turns.append((True, d))
+            if dy != dy_now: turns.append((False, d))
+            dx, dy = dx_now, dy_now
+        last = 0
+        for x, y, _ in pts:
+            d = calc_dev(x, y)
+            if d > th and last <= th: offby += 1
+            last = d
+    avg = lambda h: (lambda a: sum(a)/len(a) if a else 0)([d for f, d in turns if f == h])
+    n = sum(len(p) for p in strokes)
+    return dict(n_points=n, n_strokes=len(strokes), discontinuities=len(strokes) - 1, deviation_area=area,
+                deviation_avg=area/n, horizontal_turns=sum(f for f, _ in turns),
+                vertical_turns=sum(not f for f, _ in turns), avg_horizontal_turn_dist=avg(True),
+                avg_vertical_turn_dist=avg(False), offby=offby)
+
+def _random_session(rng, test):
+    (sx, sy), (fx, fy) = TESTS[test]
+    strokes, t = [], 0
+    for k in range(rng.integers(1, 5)):
+        n = int(rng.integers(1, 60))
+        x0 = sx + 25 if k == 0 or rng.random() < 0.5 else rng.uniform(0, 900)
+        y0 = sy + 25 if k == 0 or rng.random() < 0.5 else rng.uniform(0, 600)
+        steps = np.round(rng.normal(0, 6, (n - 1, 2)) + [(fx - sx)/n, (fy - sy)/n])
+        steps[rng.random(n - 1) < 0.1] = 0                      # repeated coordinates (sign 0)
+        xy = np.vstack([[x0, y0], [x0, y0] + np.cumsum(steps, axis=0)])
+        ts = t + np.cumsum(rng.integers(8, 20, n))
+        t = ts[-1] + 200
+        strokes.append([[float(a), float(b), int(c)] for (a, b), c in zip(xy, ts)])
+    return strokes
+
+def _sessions(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    tests = list(TESTS)
+    return [(s, session_geometry(None, s)) for s in (tests[i % len(tests)] for i in range(n))], rng
+
+def test_ld_metrics_batch_matches_app_js():
+    specs, rng = _sessions()
+    sessions = [(_random_session(rng, test), geom) for test, geom in specs]
+    arrs = [strokes_to_arrays(s) for s, _ in sessions]
+    x, y, t, start = (np.concatenate(c) for c in zip(*arrs))
+    sess = np.repeat(np.arange(len(arrs)), [len(a[0]) for a in arrs])
+    m = ld_metrics_batch(x, y, start, sess, [g for _, g in sessions], t=t)
+    for i, (strokes, geom) in enumerate(sessions):
+        ref = _ref_session(strokes, geom)
+        for k, v in ref.items():
+            assert np.isclose(m[k][i], v), (i, k, m[k][i], v)
+        assert np.isclose(m["duration_sec"][i], (strokes[-1][-1][2] - strokes[0][0][2])/1000)
+
+def test_single_session_and_sweep():
+    specs, rng = _sessions(8, seed=1)
+    ths = [2.0, 10.0, 25.0, 10.0, 60.0]
+    for test, geom in specs:
+        strokes = _random_session(rng, test)
+        m = ld_metrics(strokes, test=test, thresholds=ths)
+        assert m["offby_sweep"] == [_ref_session(strokes, geom, th)["offby"] for th in ths]
+        assert m["offby"] == _ref_session(strokes, geom)["offby"]
+
+def test_offby_sweep_empty_session():
+    out = offby_sweep(np.array([1.0]), np.array([5.0]), np.array([1]), 3, [0.5, 1.0, 4.9, 5.0])
+    assert out.tolist() == [[0, 0, 0, 0], [0, 1, 1, 0], [0, 0, 0, 0]]
+
+def test_clinical_score_levels():
+    m = dict(deviation_area=np.array([0.0, 2000.0]), vertical_turns=np.array([0, 600]),
+             horizontal_turns=np.array([0, 20]), discontinuities=np.array([0, 0]))
+    c = clinical_score(m, out_of_bounds=np.array([0, 12]), start_fails=0)
+    assert c["sara_score"].tolist() == [0.0, 4.0]
+    assert c["description"].tolist() == ["Normal, smooth, accurate movement",
+                                         "Inability to reach target or complete task"]
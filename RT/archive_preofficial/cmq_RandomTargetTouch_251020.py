@@ -1,10 +1,12 @@
 import cv2
 import mediapipe as mp
-import random
 import time
 import math
 import csv
 
+from rt_score import sara_score_from_distance
+from rt_trial import get_random_target, TrajectoryBuffer
+
 # --- Initialization ---
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
@@ -30,42 +32,11 @@ csv_writer.writerow([
     "Smoothness", "Tremor Amplitude", "Score (0-4)"
 ])
 
-# --- Helper Functions ---
-def get_random_target():
-    return random.randint(120, 520), random.randint(100, 380)
-
-def compute_smoothness(positions):
-    if len(positions) < 5:
-        return 0
-    velocities = [math.hypot(positions[i+1][0]-positions[i][0],
-                             positions[i+1][1]-positions[i][1])
-                  for i in range(len(positions)-1)]
-    if len(velocities) < 2:
-        return 0
-    diffs = [abs(velocities[i+1]-velocities[i]) for i in range(len(velocities)-1)]
-    return round(sum(diffs)/len(diffs), 2)
-
-def compute_tremor(positions):
-    if len(positions) < 10:
-        return 0
-    xs = [p[0] for p in positions]
-    ys = [p[1] for p in positions]
-    mean_x, mean_y = sum(xs)/len(xs), sum(ys)/len(ys)
-    tremor = math.sqrt(sum((x-mean_x)**2 + (y-mean_y)**2 for x,y in positions)/len(positions))
-    return round(tremor, 2)
-
-def sara_score_from_distance(dist):
-    if dist < 20: return 0
-    elif dist < 40: return 1
-    elif dist < 60: return 2
-    elif dist < 80: return 3
-    else: return 4
-
 # --- Target Setup ---
 targets = [get_random_target() for _ in range(NUM_TARGETS)]
 target_index = 0
 hit_times, distances, scores = [], [], []
-path_positions = []
+path_positions = TrajectoryBuffer()   # x, y, t + running smoothness / tremor
 start_time = time.time()
 
 # --- Main Loop ---
@@ -108,14 +79,16 @@ with mp_hands.Hands(
             cv2.circle(frame, (cx, cy), 10, (255, 0, 0), -1)
 
             # Record path
-            path_positions.append((cx, cy))
+            path_positions.append(cx, cy, time.time())
+            cv2.putText(frame, f"Smooth={path_positions.smoothness()}  Tremor={path_positions.tremor()}",
+                        (20, h - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
             dist = math.hypot(cx - tx, cy - ty)
             elapsed = time.time() - start_time
 
             # Success condition
             if dist <= TARGET_RADIUS:
-                smoothness = compute_smoothness(path_positions)
-                tremor = compute_tremor(path_positions)
+                smoothness = path_positions.smoothness()
+                tremor = path_positions.tremor()
                 score = sara_score_from_distance(dist)
 
                 print(f"🎯 {TEST_TYPES[current_test]} → Target {target_index+1} hit in {elapsed:.2f}s | Dist={dist:.1f} | Smooth={smoothness} | Tremor={tremor}")
@@ -0,0 +1,390 @@
+# rt_pipeline.py
+# Pipelined capture / hand inference / render loop for the Random Target Touch test
+# (replaces the single-thread read -> flip -> cvtColor -> hands.process -> draw -> waitKey loop of
+#  cmq_RandomTargetTouch_251020.py and draft/RTT1.py)
+# - CaptureStage thread: cap.read() + flip, stamps each frame with its acquisition time
+# - InferenceStage thread: cvtColor + hands.process (MediaPipe releases the GIL while it runs)
+# - Main thread: trial logic (rt_trial.TrialRunner) on capture timestamps, drawing, imshow / waitKey
+# - Stages joined by bounded FrameQueues: drop_oldest (default, freshest frame wins), drop_newest or block
+# - Per trial: achieved FPS, dropped frames (capture index gaps), capture -> scoring latency (CSV columns)
+# - --fake: synthetic camera + dot tracker with a set inference latency (no camera / MediaPipe needed);
+#   --sequential runs the same stages inline for comparison
+
+import csv, math, time, queue, random, argparse, threading
+from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, Callable
+
+import numpy as np
+
+from rt_trial import TrialRunner, FrameLog, PRESETS, STATS_HEADER, csv_row
+
+# --- Optional deps (graceful fallback)
+CV2_OK = True
+try:
+    import cv2
+except Exception:
+    CV2_OK = False
+
+MEDIAPIPE_OK = True
+try:
+    import mediapipe as mp
+except Exception:
+    MEDIAPIPE_OK = False
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+# -------------------------
+# Frames & queues
+# -------------------------
+@dataclass
+class Frame:
+    idx: int                       # capture counter (gaps = dropped frames)
+    t: float                       # acquisition time (time.time() right after read)
+    image: np.ndarray
+    tip: Optional[Tuple[int, int]] = None
+    landmarks: object = None
+    t_start: float = float("nan")  # inference start (queue wait = t_start - t)
+    t_infer: float = float("nan")
+
+class FrameQueue:
+    # bounded queue between two stages; None = end of stream (never dropped)
+    def __init__(self, maxsize: int = 2, policy: str = "drop_oldest"):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"policy must be one of {DROP_POLICIES}")
+        self.q = queue.Queue(maxsize=max(1, maxsize))
+        self.policy = policy
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def put(self, item: Optional[Frame]):
+        if item is None or self.policy == "block":
+            self.q.put(item)
+            return
+        with self.lock:
+            try:
+                self.q.put_nowait(item)
+            except queue.Full:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return
+                try:
+                    old = self.q.get_nowait()
+                    if old is None:                  # keep the end marker
+                        self.q.put_nowait(old)
+                        return
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                self.q.put_nowait(item)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        return self.q.get(timeout=timeout)
+
+# -------------------------
+# Sources & trackers
+# -------------------------
+def flip(image: np.ndarray) -> np.ndarray:
+    return cv2.flip(image, 1) if CV2_OK else np.ascontiguousarray(image[:, ::-1])
+
+class MediaPipeTracker:
+    # one Hands instance, used from the inference thread only (tracking state is per stream;
+    # static_image_mode=True: no state, so one instance can serve frames of several streams)
+    def __init__(self, model_complexity: int = 0, static_image_mode: bool = False):
+        if not (MEDIAPIPE_OK and CV2_OK):
+            raise RuntimeError("mediapipe / opencv not available")
+        self.mp_hands = mp.solutions.hands
+        self.hands = self.mp_hands.Hands(static_image_mode=static_image_mode, model_complexity=model_complexity,
+                                         min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+    def process(self, bgr: np.ndarray):
+        results = self.hands.process(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+        if not results.multi_hand_landmarks:
+            return None, None
+        h, w = bgr.shape[:2]
+        lm = results.multi_hand_landmarks[0]
+        tip = lm.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
+        return (int(tip.x*w), int(tip.y*h)), lm
+
+    def draw(self, frame: np.ndarray, landmarks):
+        mp.solutions.drawing_utils.draw_landmarks(frame, landmarks, self.mp_hands.HAND_CONNECTIONS)
+
+    def close(self):
+        self.hands.close()
+
+class SyntheticCamera:
+    # fake VideoCapture: frames at `fps` on a fixed clock, a bright dot on a Lissajous path
+    # (drawn pre-flip); a late read() returns the newest frame like a 1-frame camera buffer
+    def __init__(self, fps: float = 30.0, duration: float = 20.0, size: Tuple[int, int] = (640, 480),
+                 path: Optional[Callable[[float], Tuple[float, float]]] = None):
+        self.fps, self.duration, self.size = fps, duration, size
+        self.path = path or (lambda s: (320 + 200*math.sin(1.3*s), 240 + 140*math.sin(1.7*s + 0.5)))
+        self.t0 = None
+        self.next_tick = 0
+
+    def isOpened(self) -> bool:
+        return self.t0 is None or time.time() - self.t0 < self.duration
+
+    def read(self):
+        now = time.time()
+        if self.t0 is None:
+            self.t0 = now
+        k = max(self.next_tick, int((now - self.t0)*self.fps))
+        wait = self.t0 + k/self.fps - now
+        if wait > 0:
+            time.sleep(wait)
+        self.next_tick = k + 1
+        s = k/self.fps
+        if s >= self.duration:
+            return False, None
+        w, h = self.size
+        img = np.zeros((h, w, 3), dtype=np.uint8)
+        x, y = self.path(s)
+        x = int(np.clip(w - 1 - x, 3, w - 4))            # mirrored: flip() brings it back to (x, y)
+        y = int(np.clip(y, 3, h - 4))
+        img[y-3:y+4, x-3:x+4] = 255
+        return True, img
+
+    def release(self):
+        pass
+
+class DotTracker:
+    # stand-in for MediaPipe: brightest pixel, `latency` seconds of (GIL-free) inference time
+    def __init__(self, latency: float = 0.03):
+        self.latency = latency
+
+    def process(self, bgr: np.ndarray):
+        time.sleep(self.latency)
+        g = bgr[:, :, 0]
+        i = int(np.argmax(g))
+        if g.flat[i] == 0:
+            return None, None
+        y, x = divmod(i, g.shape[1])
+        return (x, y), None
+
+    def draw(self, frame, landmarks):
+        pass
+
+    def close(self):
+        pass
+
+# -------------------------
+# Stages
+# -------------------------
+class CaptureStage(threading.Thread):
+    def __init__(self, cap, out: FrameQueue, live: bool = True, mirror: bool = True):
+        super().__init__(daemon=True)
+        self.cap, self.out, self.live, self.mirror = cap, out, live, mirror
+        self.stop_event = threading.Event()
+        self.captured = 0
+
+    def grab(self) -> Optional[Frame]:
+        while not self.stop_event.is_set() and self.cap.isOpened():
+            ok, image = self.cap.read()
+            t = time.time()
+            if ok:
+                self.captured += 1
+                return Frame(idx=self.captured - 1, t=t, image=flip(image) if self.mirror else image)
+            if not self.live:                   # video file: end of stream
+                return None
+        return None
+
+    def run(self):
+        while True:
+            f = self.grab()
+            self.out.put(f)
+            if f is None:
+                return
+
+class InferenceStage(threading.Thread):
+    def __init__(self, tracker, inp: FrameQueue, out: FrameQueue):
+        super().__init__(daemon=True)
+        self.tracker, self.inp, self.out = tracker, inp, out
+
+    def infer(self, f: Frame) -> Frame:
+        f.t_start = time.time()
+        f.tip, f.landmarks = self.tracker.process(f.image)
+        f.t_infer = time.time()
+        return f
+
+    def run(self):
+        while True:
+            f = self.inp.get()
+            if f is None:
+                self.out.put(None)
+                return
+            self.out.put(self.infer(f))
+
+class TrialStats:
+    # frames rendered within the current trial -> achieved FPS, dropped frames, mean latency
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n, self.first_idx, self.last_idx = 0, None, None
+        self.t_first = self.t_last = None
+        self.latency = 0.0
+
+    def add(self, f: Frame, t_render: float):
+        if self.n == 0:
+            self.first_idx, self.t_first = f.idx, f.t
+        self.n += 1
+        self.last_idx, self.t_last = f.idx, f.t
+        self.latency += t_render - f.t
+
+    def report(self) -> Dict:
+        span = (self.t_last - self.t_first) if self.n > 1 else float("nan")
+        out = dict(frames=self.n, fps=(self.n - 1)/span if span and span > 0 else float("nan"),
+                   dropped=(self.last_idx - self.first_idx + 1 - self.n) if self.n else 0,
+                   latency_ms=1000*self.latency/self.n if self.n else float("nan"))
+        self.reset()
+        return out
+
+# -------------------------
+# Render / scoring (main thread)
+# -------------------------
+def draw_frame(frame: np.ndarray, runner: TrialRunner, f: Frame, tracker, last_score, title: str):
+    cfg = runner.cfg
+    cv2.putText(frame, f"Test: {runner.test_type}  Target: {min(runner.index + 1, cfg.num_targets)}/{cfg.num_targets}",
+                (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+    if not runner.done and runner.resume_at is None:
+        cv2.circle(frame, runner.target_pos(f.t), cfg.target_radius, (0, 255, 0), 3)
+    elif runner.resume_at is not None:
+        cv2.putText(frame, "Test Done!", (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+    if f.tip is not None:
+        if f.landmarks is not None:
+            tracker.draw(frame, f.landmarks)
+        cv2.circle(frame, f.tip, 10, (255, 0, 0), -1)
+    if cfg.trajectory_metrics and len(runner.path):
+        cv2.putText(frame, f"Smooth={runner.path.smoothness()}  Tremor={runner.path.tremor()}",
+                    (20, frame.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+    if last_score is not None:
+        cv2.putText(frame, f"Last Score: {last_score}", (20, frame.shape[0] - 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    cv2.imshow(title, frame)
+
+def run_session(cap, tracker, preset: str = "251020", out_csv: Optional[str] = "ataxia_test_results.csv",
+                queue_size: int = 2, policy: str = "drop_oldest", sequential: bool = False, live: bool = True,
+                show: bool = True, seed: Optional[int] = None, frame_log: Optional[str] = None,
+                verbose: bool = True) -> Dict:
+    cfg = PRESETS[preset]
+    if seed is None:
+        seed = random.randrange(2**31)          # logged: replay needs the same target sequence
+    runner = TrialRunner(cfg, seed=seed)
+    flog = FrameLog(frame_log, preset=preset, seed=seed) if frame_log else None
+    show = show and CV2_OK
+    q_cap, q_inf = FrameQueue(queue_size, policy), FrameQueue(queue_size, policy)
+    capture = CaptureStage(cap, q_cap, live=live)
+    infer = InferenceStage(tracker, q_cap, q_inf)
+    if not sequential:
+        capture.start()
+        infer.start()
+
+    def next_frame() -> Optional[Frame]:
+        if sequential:
+            f = capture.grab()
+            return infer.infer(f) if f is not None else None
+        return q_inf.get()
+
+    writer, fh = None, None
+    if out_csv:
+        fh = open(out_csv, mode="w", newline="")
+        writer = csv.writer(fh)
+        writer.writerow(cfg.csv_header + STATS_HEADER)
+    stats, trials, tests = TrialStats(), [], []
+    last_score, rendered, t0 = None, 0, time.time()
+    try:
+        while not runner.done:
+            f = next_frame()
+            if f is None:
+                break
+            events = runner.update(f.t, f.tip)
+            if flog is not None:
+                flog.write(f.idx, f.t, f.tip)
+            t_render = time.time()
+            if runner.resume_at is None or events:
+                stats.add(f, t_render)
+            rendered += 1
+            for ev in events:
+                if ev["kind"] == "test_done":
+                    tests.append(ev)
+                    if verbose:
+                        print(f"=== {ev['test']} done: avg time {ev['avg_time']:.2f}s | avg score {ev['avg_score']:.2f}")
+                    continue
+                st = stats.report()
+                last_score = ev["score"]
+                trials.append(dict(ev, **st))
+                if writer is not None:
+                    writer.writerow(csv_row(cfg, ev, st))
+                if verbose:
+                    what = (f"hit in {ev['elapsed']:.2f}s | Dist={ev['dist']:.1f}" if ev["kind"] == "hit"
+                            else "FAILED (timeout)")
+                    print(f"{ev['test']} → Target {ev['target']} {what} | score {ev['score']} | "
+                          f"{st['fps']:.1f} fps, {st['dropped']} dropped, {st['latency_ms']:.0f} ms latency")
+            if show:
+                draw_frame(f.image, runner, f, tracker, last_score, "Ataxia Test")
+                key = cv2.waitKey(1) & 0xFF
+                if key in [27, ord('q')]:
+                    break
+    finally:
+        capture.stop_event.set()
+        # join both stages before the caller releases the camera / closes the tracker; keep draining the
+        # output queue so a stage blocked on a full queue (policy "block") can reach its end marker
+        deadline = time.time() + 5.0
+        while (capture.is_alive() or infer.is_alive()) and time.time() < deadline:
+            try:
+                q_inf.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        if not sequential:
+            capture.join(max(0.0, deadline - time.time()))
+            infer.join(max(0.0, deadline - time.time()))
+        if fh is not None:
+            fh.close()
+        if flog is not None:
+            flog.close()
+        if show:
+            cv2.destroyAllWindows()
+    wall = time.time() - t0
+    return dict(trials=trials, tests=tests, rows=runner.rows, seed=seed, frames_captured=capture.captured,
+                frames_rendered=rendered, fps=rendered/wall if wall > 0 else float("nan"),
+                dropped_capture=q_cap.dropped, dropped_inference=q_inf.dropped, wall_sec=wall)
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Random Target Touch test (pipelined capture / inference / render)")
+    parser.add_argument("--preset", choices=list(PRESETS), default="251020",
+                        help="251020 = cmq_RandomTargetTouch_251020.py, rtt1 = draft/RTT1.py")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--video", default=None, help="video file instead of the camera")
+    parser.add_argument("--queue-size", type=int, default=2, help="frames buffered between stages")
+    parser.add_argument("--policy", choices=DROP_POLICIES, default="drop_oldest")
+    parser.add_argument("--sequential", action="store_true", help="single-thread loop (comparison)")
+    parser.add_argument("--no-window", action="store_true")
+    parser.add_argument("--fake", action="store_true", help="synthetic camera + dot tracker (no camera)")
+    parser.add_argument("--fake-latency", type=float, default=0.03, help="simulated inference time (s)")
+    parser.add_argument("--fake-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=None, help="CSV (default: the script's file name)")
+    parser.add_argument("--frame-log", default=None, help="per-frame fingertip log for rt_replay.py")
+    args = parser.parse_args()
+
+    if args.fake:
+        cap, tracker, live = SyntheticCamera(duration=args.fake_seconds), DotTracker(args.fake_latency), True
+    else:
+        if not CV2_OK:
+            parser.error("opencv not available (use --fake)")
+        cap = cv2.VideoCapture(args.video if args.video else args.camera)
+        tracker, live = MediaPipeTracker(), args.video is None
+    out = args.out or ("finger_chase_results.csv" if args.preset == "rtt1" else "ataxia_test_results.csv")
+    try:
+        res = run_session(cap, tracker, preset=args.preset, out_csv=out, queue_size=args.queue_size,
+                          policy=args.policy, sequential=args.sequential, live=live,
+                          show=not args.no_window, seed=args.seed, frame_log=args.frame_log)
+    finally:
+        cap.release()
+        tracker.close()
+    print(f"=== {res['frames_rendered']} frames rendered / {res['frames_captured']} captured, "
+          f"{res['fps']:.1f} fps, dropped {res['dropped_capture']} (capture) + {res['dropped_inference']} (inference)")
+    print("Saved:", out)
@@ -0,0 +1,195 @@
+# rt_replay.py
+# Headless replay and batch re-scoring of recorded Random Target Touch sessions (no camera, no window)
+# - Frame logs (rt_pipeline.py --frame-log): capture timestamps + fingertip per frame, replayed through
+#   rt_trial.TrialRunner as fast as Python runs (logged timestamps, no waiting)
+# - Video files: frames through MediaPipe, timestamps from the video clock (CAP_PROP_POS_MSEC);
+#   --write-frame-logs keeps the tracked stream so the next re-score skips inference
+# - Same trial logic as the live test: target sequence (seed from the log header), TIME_LIMIT timeouts,
+#   hit radius, compute_smoothness / compute_tremor, sara_score_from_distance (cuts overridable,
+#   e.g. from common/cmq_calibrate.py --save-best)
+# - Directory mode: sessions fanned out over a process pool -> one targets CSV + one per-test summary CSV
+
+import os, csv, glob, json, time, argparse
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Tuple, Optional
+
+from rt_trial import TrialRunner, RTConfig, PRESETS, FrameLog, read_frame_log, csv_row
+
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+FRAME_LOG_SUFFIX = "_frames.csv"
+
+# frame logs: <record_id>_frames.csv (e.g. RT_P003_20251026_141455_frames.csv)
+def record_id(path: str) -> str:
+    name = os.path.basename(path)
+    if name.endswith(FRAME_LOG_SUFFIX):
+        return name[:-len(FRAME_LOG_SUFFIX)]
+    return os.path.splitext(name)[0]
+
+def collect_sessions(spec: str) -> List[str]:
+    if os.path.isdir(spec):
+        paths = [os.path.join(spec, f) for f in os.listdir(spec)
+                 if f.endswith(FRAME_LOG_SUFFIX) or f.lower().endswith(VIDEO_EXTS)]
+    else:
+        paths = glob.glob(spec)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+# -------------------------
+# Replay
+# -------------------------
+def replay_frames(frames: List[Tuple[float, Optional[Tuple[int, int]]]], cfg: RTConfig,
+                  seed: Optional[int]) -> Dict:
+    runner = TrialRunner(cfg, seed=seed)
+    tests = []
+    t0 = time.perf_counter()
+    for t, tip in frames:
+        for ev in runner.update(t, tip):
+            if ev["kind"] == "test_done":
+                tests.append(ev)
+        if runner.done:
+            break
+    elapsed = time.perf_counter() - t0
+    span = frames[-1][0] - frames[0][0] if len(frames) > 1 else 0.0
+    return dict(rows=runner.rows, tests=tests, complete=runner.done, frames=len(frames),
+                session_sec=span, replay_sec=elapsed)
+
+def track_video(path: str, frame_log: Optional[str] = None, meta: Optional[Dict] = None):
+    # video -> [(t, tip)] via MediaPipe (mirrored like the live test); t = video clock
+    import cv2
+    from rt_pipeline import MediaPipeTracker, flip
+    cap = cv2.VideoCapture(path)
+    tracker = MediaPipeTracker()
+    flog = FrameLog(frame_log, **(meta or {})) if frame_log else None
+    frames = []
+    try:
+        while True:
+            ok, image = cap.read()
+            if not ok:
+                break
+            t = cap.get(cv2.CAP_PROP_POS_MSEC)/1000.0
+            tip, _ = tracker.process(flip(image))
+            if flog is not None:
+                flog.write(len(frames), t, tip)
+            frames.append((t, tip))
+    finally:
+        cap.release()
+        tracker.close()
+        if flog is not None:
+            flog.close()
+    return frames
+
+def rescore_session(path: str, preset: str = "251020", cuts: Optional[Tuple[float, ...]] = None,
+                    seed: Optional[int] = None, write_frame_log: bool = False) -> Dict:
+    # runs inside a pool worker; never raises
+    rid = record_id(path)
+    base = dict(record_id=rid, path=path)
+    t0 = time.perf_counter()
+    try:
+        if path.endswith(FRAME_LOG_SUFFIX):
+            meta, frames = read_frame_log(path)
+        else:
+            log = os.path.join(os.path.dirname(path), rid + FRAME_LOG_SUFFIX)
+            meta = read_frame_log(log)[0] if os.path.exists(log) else {}
+            if seed is not None:
+                meta["seed"] = seed
+            meta.setdefault("preset", preset)
+            frames = track_video(path, log if write_frame_log and not os.path.exists(log) else None, meta)
+        cfg = PRESETS[meta.get("preset", preset)]
+        if cuts is not None:
+            cfg = replace(cfg, distance_cuts=tuple(cuts))
+        s = meta.get("seed", seed)
+        res = replay_frames(frames, cfg, int(s) if s not in (None, "", "None") else None)
+        res.update(base, preset=meta.get("preset", preset), seed=s, status="ok", error="", cfg=cfg)
+    except Exception as e:
+        res = dict(base, status="error", error=f"{type(e).__name__}: {e}", rows=[], tests=[])
+    res["elapsed_sec"] = round(time.perf_counter() - t0, 4)
+    return res
+
+# -------------------------
+# Batch
+# -------------------------
+SUMMARY_COLS = ["record_id", "test", "n_targets", "hits", "timeouts", "avg_score", "avg_time",
+                "complete", "frames", "session_sec", "replay_sec", "speedup", "status", "error", "path"]
+
+def summarize(res: Dict) -> List[Dict]:
+    if res["status"] != "ok":
+        return [dict(record_id=res["record_id"], path=res["path"], status=res["status"], error=res["error"])]
+    out = []
+    for test in dict.fromkeys(r["test"] for r in res["rows"]):
+        rows = [r for r in res["rows"] if r["test"] == test]
+        times = [r["elapsed"] for r in rows if r["elapsed"]]
+        out.append(dict(record_id=res["record_id"], test=test, n_targets=len(rows),
+                        hits=sum(r["dist"] is not None for r in rows),
+                        timeouts=sum(r["dist"] is None for r in rows),
+                        avg_score=sum(r["score"] for r in rows)/len(rows),
+                        avg_time=(sum(times)/len(times) if times else ""),
+                        complete=res["complete"], frames=res["frames"], session_sec=round(res["session_sec"], 2),
+                        replay_sec=round(res["replay_sec"], 4),
+                        speedup=(round(res["session_sec"]/res["replay_sec"]) if res["replay_sec"] > 0 else ""),
+                        status="ok", error="", path=res["path"]))
+    return out
+
+def rescore_batch(paths: List[str], out_targets: str = "rt_rescore_targets.csv",
+                  out_summary: str = "rt_rescore_summary.csv", workers: Optional[int] = None,
+                  preset: str = "251020", cuts: Optional[Tuple[float, ...]] = None,
+                  seed: Optional[int] = None, write_frame_logs: bool = False) -> List[Dict]:
+    workers = workers or os.cpu_count() or 1
+    summary, done = [], 0
+    header = PRESETS[preset].csv_header
+    with open(out_targets, "w", newline="", encoding="utf-8") as tf, \
+         open(out_summary, "w", newline="", encoding="utf-8") as sf, \
+         ProcessPoolExecutor(max_workers=workers) as pool:
+        tw = csv.writer(tf)
+        tw.writerow(["record_id"] + header)
+        sw = csv.DictWriter(sf, fieldnames=SUMMARY_COLS, extrasaction="ignore")
+        sw.writeheader()
+        futures = {pool.submit(rescore_session, p, preset, cuts, seed, write_frame_logs): p for p in paths}
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                res = fut.result()
+            except Exception as e:
+                res = dict(record_id=record_id(path), path=path, status="error",
+                           error=f"{type(e).__name__}: {e}", rows=[], tests=[])
+            for r in res["rows"]:
+                tw.writerow([res["record_id"]] + csv_row(res["cfg"], r))
+            rows = summarize(res)
+            sw.writerows(rows)
+            summary += rows
+            done += 1
+            print(f"[{done}/{len(paths)}] {res['record_id']}: {res['status']}"
+                  + (f" ({res['error']})" if res["status"] != "ok" else
+                     f" ({len(res['rows'])} targets, {res['frames']} frames in {1000*res['replay_sec']:.1f} ms)"))
+    return summary
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay / re-score recorded RT sessions (headless)")
+    parser.add_argument("inputs", nargs="+", help="frame logs (*_frames.csv) / videos, directories or globs")
+    parser.add_argument("--preset", choices=list(PRESETS), default="251020", help="when the log has none")
+    parser.add_argument("--seed", type=int, default=None, help="target seed for videos without a frame log")
+    parser.add_argument("--cuts", type=float, nargs=4, default=None, help="distance cut-offs (px)")
+    parser.add_argument("--calibration", default=None, help="cmq_calibrate.py --save-best JSON (rt)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--write-frame-logs", action="store_true", help="keep tracked video streams")
+    parser.add_argument("--out", default="rt_rescore_targets.csv")
+    parser.add_argument("--summary", default="rt_rescore_summary.csv")
+    args = parser.parse_args()
+
+    cuts = args.cuts
+    if args.calibration:
+        with open(args.calibration, encoding="utf-8") as f:
+            best = json.load(f)
+        cuts = [best["params"][f"cut{i}"] for i in range(1, 5)]
+    paths = sorted({p for spec in args.inputs for p in collect_sessions(spec)})
+    if not paths:
+        parser.error("no sessions found")
+    t0 = time.perf_counter()
+    rows = rescore_batch(paths, args.out, args.summary, workers=args.workers, preset=args.preset,
+                         cuts=cuts, seed=args.seed, write_frame_logs=args.write_frame_logs)
+    n_ok = len({r["record_id"] for r in rows if r["status"] == "ok"})
+    print(f"=== {n_ok}/{len(paths)} sessions re-scored in {time.perf_counter() - t0:.2f}s "
+          f"(cuts {tuple(cuts) if cuts else PRESETS[args.preset].distance_cuts})")
+    print("Saved:", args.out, args.summary)
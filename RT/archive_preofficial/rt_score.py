@@ -0,0 +1,25 @@
+# rt_score.py
+# Distance -> SARA (0–4) mapping of the Random Target Touch script (cmq_RandomTargetTouch_251020.py)
+# - sara_score_from_distance(): per-hit scalar (unchanged buckets, now parameterised by cuts)
+# - distance_score_batch(): same buckets for whole arrays; cuts may carry a candidate axis (K, 4)
+# - Timeouts: distance NaN -> 4 (the script logs "-" and scores 4), same as the scalar
+#   (every `dist < cut` is False for NaN)
+
+from typing import Sequence
+
+import numpy as np
+
+RT_DISTANCE_CUTS = (20.0, 40.0, 60.0, 80.0)   # px at the hit frame
+RT_MAX_SCORE = 4
+
+def sara_score_from_distance(dist, cuts: Sequence[float] = RT_DISTANCE_CUTS) -> int:
+    for score, c in enumerate(cuts):
+        if dist < c:
+            return score
+    return len(cuts)
+
+def distance_score_batch(dist, cuts=RT_DISTANCE_CUTS) -> np.ndarray:
+    # dist (...,) with cuts (n_cuts,) -> (...); dist (M, 1) with cuts (K, n_cuts) -> (M, K)
+    d = np.asarray(dist, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return (~(d[..., None] < np.asarray(cuts, dtype=float))).sum(axis=-1)
@@ -0,0 +1,402 @@
+# rt_stations.py
+# Several Random Target Touch stations in one process, sharing a small pool of hand-tracking workers
+# (instead of one full cmq_RandomTargetTouch_251020.py process + model per station)
+# - StationSession: one source (camera index, video file or SyntheticCamera) with its own CaptureStage
+#   thread, TrialRunner, buffered results CSV, optional frame log (rt_replay.py) and metrics;
+#   no module-level state
+# - FairScheduler: one newest-frame slot per station (older frames dropped, counted per station),
+#   ready stations served round-robin, at most one frame per station in flight (results stay in
+#   capture order, a fast camera can't starve a slow one)
+# - TrackerPool: K inference threads, each with its own tracker (MediaPipe Hands in static-image mode,
+#   so any worker can serve any station; drawing uses the first one)
+# - StationHost.run(): main thread scores every station's tracked frames (trial logic, CSV rows,
+#   optional one window per station)
+# - Per station: achieved FPS, capture -> scored latency (mean / p95), queue wait, inference time,
+#   dropped frames; per-trial FPS / dropped / latency columns as in rt_pipeline.py
+# - --fake N: N synthetic cameras (own paths and frame rates) + dot trackers with a set latency
+
+import os, csv, time, queue, random, argparse, threading
+from collections import deque
+from typing import List, Dict, Tuple, Optional, Callable
+
+import numpy as np
+
+from rt_trial import TrialRunner, FrameLog, PRESETS, STATS_HEADER, csv_row
+from rt_pipeline import (Frame, CaptureStage, TrialStats, SyntheticCamera, DotTracker, MediaPipeTracker,
+                         draw_frame, CV2_OK)
+
+METRIC_COLS = ["station", "status", "frames_captured", "frames_scored", "dropped", "fps", "latency_ms",
+               "latency_p95_ms", "wait_ms", "infer_ms", "targets", "tests_done", "wall_sec"]
+
+# -------------------------
+# Fair scheduling over stations
+# -------------------------
+class FairScheduler:
+    # submit() from capture threads, next() / done() from pool workers; sink(sid, frame) gets the
+    # tracked frames of each station in order, then None once its stream has ended
+    def __init__(self, sink: Callable[[int, Optional[Frame]], None], depth: int = 1):
+        self.sink, self.depth = sink, max(1, depth)
+        self.cv = threading.Condition()
+        self.slots: Dict[int, deque] = {}
+        self.ring: deque = deque()                # stations with a waiting frame and none in flight
+        self.busy, self.eof = set(), set()
+        self.dropped: Dict[int, int] = {}
+        self.closed = False
+
+    def add(self, sid: int):
+        with self.cv:
+            self.slots[sid], self.dropped[sid] = deque(), 0
+
+    def submit(self, sid: int, f: Optional[Frame]):
+        with self.cv:
+            slot = self.slots[sid]
+            if f is None:
+                self.eof.add(sid)
+                end = not slot and sid not in self.busy
+            else:
+                end = False
+                if len(slot) >= self.depth:
+                    slot.popleft()
+                    self.dropped[sid] += 1
+                slot.append(f)
+                if sid not in self.busy and sid not in self.ring:
+                    self.ring.append(sid)
+                    self.cv.notify()
+        if end:
+            self.sink(sid, None)
+
+    def next(self) -> Optional[Tuple[int, Frame]]:
+        # blocks; None once closed
+        with self.cv:
+            while not self.ring and not self.closed:
+                self.cv.wait()
+            if self.closed:
+                return None
+            sid = self.ring.popleft()
+            self.busy.add(sid)
+            return sid, self.slots[sid].popleft()
+
+    def done(self, sid: int, f: Frame):
+        self.sink(sid, f)                         # delivered before the station is released: keeps order
+        with self.cv:
+            self.busy.discard(sid)
+            end = False
+            if self.slots[sid]:
+                self.ring.append(sid)             # back of the ring: every ready station goes first
+                self.cv.notify()
+            else:
+                end = sid in self.eof
+        if end:
+            self.sink(sid, None)
+
+    def close(self):
+        with self.cv:
+            self.closed = True
+            self.cv.notify_all()
+
+class TrackerPool:
+    # K worker threads, one tracker each (MediaPipe releases the GIL while it runs)
+    def __init__(self, make_tracker: Callable[[], object], sched: FairScheduler, workers: int = 2):
+        self.sched = sched
+        self.trackers = [make_tracker() for _ in range(max(1, workers))]
+        self.threads = [threading.Thread(target=self._work, args=(tr,), daemon=True) for tr in self.trackers]
+        self.errors = 0
+
+    def start(self):
+        for th in self.threads:
+            th.start()
+
+    def _work(self, tracker):
+        while True:
+            job = self.sched.next()
+            if job is None:
+                return
+            sid, f = job
+            f.t_start = time.time()
+            try:
+                f.tip, f.landmarks = tracker.process(f.image)
+            except Exception:
+                f.tip, f.landmarks = None, None   # one bad frame = no hand, the station keeps going
+                self.errors += 1
+            f.t_infer = time.time()
+            self.sched.done(sid, f)
+
+    def close(self, timeout: float = 2.0):
+        self.sched.close()
+        for th in self.threads:
+            th.join(timeout)
+        for tr in self.trackers:
+            tr.close()
+
+# -------------------------
+# Per-station output & metrics
+# -------------------------
+class BufferedCSV:
+    # rows kept in memory, written every `rows` rows / `sec` seconds (checked on write and tick()) and on close
+    def __init__(self, path: str, header: List[str], rows: int = 20, sec: float = 5.0):
+        self.fh = open(path, mode="w", newline="")
+        self.writer = csv.writer(self.fh)
+        self.writer.writerow(header)
+        self.rows, self.sec = rows, sec
+        self.buf: List[List] = []
+        self.t_flush = time.time()
+        self.written = 0
+
+    def write(self, row: List):
+        self.buf.append(row)
+        self.tick()
+
+    def tick(self):
+        if len(self.buf) >= self.rows or (self.buf and time.time() - self.t_flush >= self.sec):
+            self.flush()
+
+    def flush(self):
+        self.writer.writerows(self.buf)
+        self.written += len(self.buf)
+        self.buf.clear()
+        self.fh.flush()
+        self.t_flush = time.time()
+
+    def close(self):
+        self.flush()
+        self.fh.close()
+
+class SessionMetrics:
+    # every scored frame: capture -> scored latency, queue wait (capture -> inference start), inference time
+    def __init__(self):
+        self.t, self.lat, self.wait, self.infer = [], [], [], []
+
+    def add(self, f: Frame, t_scored: float):
+        self.t.append(f.t)
+        self.lat.append(t_scored - f.t)
+        self.wait.append(f.t_start - f.t)
+        self.infer.append(f.t_infer - f.t_start)
+
+    def report(self) -> Dict:
+        n = len(self.t)
+        span = self.t[-1] - self.t[0] if n > 1 else 0.0
+        if n == 0:
+            return dict(frames_scored=0, fps=float("nan"), latency_ms=float("nan"),
+                        latency_p95_ms=float("nan"), wait_ms=float("nan"), infer_ms=float("nan"))
+        lat = 1000*np.asarray(self.lat)
+        return dict(frames_scored=n, fps=(n - 1)/span if span > 0 else float("nan"),
+                    latency_ms=float(lat.mean()), latency_p95_ms=float(np.percentile(lat, 95)),
+                    wait_ms=1000*float(np.mean(self.wait)), infer_ms=1000*float(np.mean(self.infer)))
+
+# -------------------------
+# Station session
+# -------------------------
+class StationSession:
+    # one testing station: source -> (shared pool) -> trial logic / results of its own
+    def __init__(self, sid: int, name: str, cap, sched: FairScheduler, preset: str = "251020",
+                 live: bool = True, out_dir: str = ".", seed: Optional[int] = None, frame_log: bool = False,
+                 verbose: bool = True):
+        self.sid, self.name, self.cap, self.sched = sid, name, cap, sched
+        self.cfg = PRESETS[preset]
+        self.seed = random.randrange(2**31) if seed is None else seed
+        self.runner = TrialRunner(self.cfg, seed=self.seed)
+        self.capture = CaptureStage(cap, self, live=live)
+        self.out_csv = os.path.join(out_dir, f"{name}_results.csv")
+        self.writer = BufferedCSV(self.out_csv, self.cfg.csv_header + STATS_HEADER)
+        self.flog = FrameLog(os.path.join(out_dir, f"{name}_frames.csv"), preset=preset, seed=self.seed) \
+            if frame_log else None
+        self.stats, self.metrics = TrialStats(), SessionMetrics()
+        self.trials: List[Dict] = []
+        self.tests: List[Dict] = []
+        self.last_score = None
+        self.status = "running"
+        self.verbose = verbose
+        self.t0 = self.t_end = None
+        sched.add(sid)
+
+    def put(self, f: Optional[Frame]):
+        # CaptureStage output -> scheduler slot
+        self.sched.submit(self.sid, f)
+
+    def start(self):
+        self.t0 = time.time()
+        self.capture.start()
+
+    def step(self, f: Frame) -> bool:
+        # one tracked frame (host thread) -> True when the station is finished
+        events = self.runner.update(f.t, f.tip)
+        if self.flog is not None:
+            self.flog.write(f.idx, f.t, f.tip)
+        t_scored = time.time()
+        self.metrics.add(f, t_scored)
+        if self.runner.resume_at is None or events:
+            self.stats.add(f, t_scored)
+        for ev in events:
+            if ev["kind"] == "test_done":
+                self.tests.append(ev)
+                self.writer.flush()
+                if self.verbose:
+                    print(f"[{self.name}] === {ev['test']} done: avg time {ev['avg_time']:.2f}s | "
+                          f"avg score {ev['avg_score']:.2f}")
+                continue
+            st = self.stats.report()
+            self.last_score = ev["score"]
+            self.trials.append(dict(ev, **st))
+            self.writer.write(csv_row(self.cfg, ev, st))
+            if self.verbose:
+                what = f"hit in {ev['elapsed']:.2f}s" if ev["kind"] == "hit" else "timeout"
+                print(f"[{self.name}] {ev['test']} → Target {ev['target']} {what} | score {ev['score']} | "
+                      f"{st['fps']:.1f} fps, {st['latency_ms']:.0f} ms")
+        if self.runner.done:
+            self.finish("complete")
+        return self.runner.done
+
+    def finish(self, status: str):
+        if self.t_end is not None:
+            return
+        self.status, self.t_end = status, time.time()
+        self.capture.stop_event.set()
+
+    def close(self):
+        self.finish(self.status if self.status != "running" else "stopped")
+        self.capture.join(1.0)
+        self.writer.close()
+        if self.flog is not None:
+            self.flog.close()
+        self.cap.release()
+
+    def report(self) -> Dict:
+        return dict(station=self.name, status=self.status, frames_captured=self.capture.captured,
+                    dropped=self.sched.dropped[self.sid], **self.metrics.report(), targets=len(self.trials),
+                    tests_done=len(self.tests),
+                    wall_sec=(self.t_end or time.time()) - (self.t0 or time.time()))
+
+# -------------------------
+# Host
+# -------------------------
+class StationHost:
+    # sessions + one shared tracker pool; run() on the main thread (cv2 windows need it)
+    def __init__(self, make_tracker: Callable[[], object], workers: int = 2, depth: int = 1):
+        self.results: "queue.Queue[Tuple[int, Optional[Frame]]]" = queue.Queue()
+        self.sched = FairScheduler(lambda sid, f: self.results.put((sid, f)), depth=depth)
+        self.pool = TrackerPool(make_tracker, self.sched, workers)
+        self.sessions: Dict[int, StationSession] = {}
+
+    def add(self, name: str, cap, **kw) -> StationSession:
+        sid = len(self.sessions)
+        self.sessions[sid] = StationSession(sid, name, cap, self.sched, **kw)
+        return self.sessions[sid]
+
+    def run(self, max_sec: Optional[float] = None, show: bool = False) -> List[Dict]:
+        show = show and CV2_OK
+        if show:
+            import cv2
+        self.pool.start()
+        for s in self.sessions.values():
+            s.start()
+        active = set(self.sessions)
+        t_stop = time.time() + max_sec if max_sec else None
+        try:
+            while active:
+                if t_stop is not None and time.time() >= t_stop:
+                    for sid in active:
+                        self.sessions[sid].finish("time_limit")
+                    break
+                try:
+                    sid, f = self.results.get(timeout=0.1)
+                except queue.Empty:
+                    for sid in active:
+                        self.sessions[sid].writer.tick()
+                    continue
+                if sid not in active:
+                    continue
+                s = self.sessions[sid]
+                if f is None:
+                    s.finish("source_ended")
+                    active.discard(sid)
+                    continue
+                if s.step(f):
+                    active.discard(sid)
+                if show:
+                    draw_frame(f.image, s.runner, f, self.pool.trackers[0], s.last_score, s.name)
+                    if (cv2.waitKey(1) & 0xFF) in [27, ord('q')]:
+                        for sid in active:
+                            self.sessions[sid].finish("stopped")
+                        break
+        finally:
+            for s in self.sessions.values():
+                s.finish("stopped")                # no-op for finished stations
+            self.pool.close()
+            for s in self.sessions.values():
+                s.close()
+            if show:
+                cv2.destroyAllWindows()
+        return [s.report() for s in self.sessions.values()]
+
+# -------------------------
+# Sources
+# -------------------------
+def fake_camera(i: int, seconds: float) -> SyntheticCamera:
+    # station i: own Lissajous path and frame rate (30 / 25 / 30 / 15 fps, ...)
+    fps = (30.0, 25.0, 30.0, 15.0)[i % 4]
+    a, b, ph = 1.1 + 0.13*i, 1.5 + 0.11*i, 0.7*i
+    return SyntheticCamera(fps=fps, duration=seconds,
+                           path=lambda s: (320 + 200*np.sin(a*s + ph), 240 + 140*np.sin(b*s + 0.5)))
+
+def open_source(spec: str):
+    # camera index ("0") -> live, anything else -> video file
+    import cv2
+    return (cv2.VideoCapture(int(spec)), True) if spec.isdigit() else (cv2.VideoCapture(spec), False)
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Random Target Touch: several stations, one shared tracker pool")
+    parser.add_argument("sources", nargs="*", help="camera indices and/or video files, one per station")
+    parser.add_argument("--fake", type=int, default=0, help="N synthetic stations (no camera / MediaPipe)")
+    parser.add_argument("--fake-latency", type=float, default=0.03, help="simulated inference time (s)")
+    parser.add_argument("--fake-seconds", type=float, default=30.0)
+    parser.add_argument("--names", nargs="+", default=None, help="station / record ids (default station1..N)")
+    parser.add_argument("--workers", type=int, default=2, help="shared hand-tracking workers")
+    parser.add_argument("--preset", choices=list(PRESETS), default="251020")
+    parser.add_argument("--seed", type=int, default=None, help="base seed (station i: seed + i)")
+    parser.add_argument("--out-dir", default=".", help="<name>_results.csv (+ <name>_frames.csv) per station")
+    parser.add_argument("--frame-logs", action="store_true", help="per-frame fingertip logs for rt_replay.py")
+    parser.add_argument("--max-sec", type=float, default=None, help="stop every station after this long")
+    parser.add_argument("--show", action="store_true", help="one window per station")
+    parser.add_argument("--metrics", default=None, help="per-station metrics CSV")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake:
+        make_tracker = lambda: DotTracker(args.fake_latency)
+        sources = [(fake_camera(i, args.fake_seconds), True) for i in range(args.fake)]
+    else:
+        if not args.sources:
+            parser.error("give camera indices / video files, or --fake N")
+        if not CV2_OK:
+            parser.error("opencv not available (use --fake)")
+        make_tracker = lambda: MediaPipeTracker(static_image_mode=True)
+        sources = [open_source(s) for s in args.sources]
+    names = args.names or [f"station{i + 1}" for i in range(len(sources))]
+    if len(names) != len(sources):
+        parser.error("--names needs one name per station")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    host = StationHost(make_tracker, workers=args.workers)
+    for i, ((cap, live), name) in enumerate(zip(sources, names)):
+        host.add(name, cap, preset=args.preset, live=live, out_dir=args.out_dir,
+                 seed=None if args.seed is None else args.seed + i, frame_log=args.frame_logs,
+                 verbose=not args.quiet)
+    t0 = time.time()
+    reports = host.run(max_sec=args.max_sec, show=args.show)
+    print(f"=== {len(reports)} stations, {args.workers} tracker workers, {time.time() - t0:.1f}s "
+          f"({host.pool.errors} tracker errors)")
+    print(f"{'station':<12}{'status':<14}{'fps':>7}{'lat ms':>8}{'p95 ms':>8}{'wait ms':>9}{'infer ms':>10}"
+          f"{'scored':>8}{'dropped':>9}{'targets':>9}")
+    for r in reports:
+        print(f"{r['station']:<12}{r['status']:<14}{r['fps']:>7.1f}{r['latency_ms']:>8.1f}{r['latency_p95_ms']:>8.1f}"
+              f"{r['wait_ms']:>9.1f}{r['infer_ms']:>10.1f}{r['frames_scored']:>8}{r['dropped']:>9}{r['targets']:>9}")
+    if args.metrics:
+        with open(args.metrics, "w", newline="", encoding="utf-8") as fh:
+            w = csv.DictWriter(fh, fieldnames=METRIC_COLS, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(reports)
+    print("Saved:", ", ".join(os.path.join(args.out_dir, f"{n}_results.csv") for n in names)
+          + (f", {args.metrics}" if args.metrics else ""))
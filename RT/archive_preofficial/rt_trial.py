@@ -0,0 +1,255 @@
+# rt_trial.py
+# Trial logic of the Random Target Touch scripts, independent of camera, window and clock
+# - RTConfig / PRESETS: "251020" = cmq_RandomTargetTouch_251020.py, "rtt1" = draft/RTT1.py
+# - TrialRunner.update(t, tip): one tracked frame at capture time t -> hit / timeout / test-done events
+#   (same rules as the scripts: hit when dist <= radius, timeout after time_limit, checked on frames
+#   with a detected hand; the chase target moves with the frame's capture time)
+# - CSV rows in each script's column layout (+ per-trial pipeline stats when given)
+# - compute_smoothness / compute_tremor / get_random_target: moved here unchanged (reference versions)
+# - TrajectoryBuffer: array-backed x / y / t ring + running sums, O(1) per frame, same end-of-trial
+#   smoothness / tremor as the list versions (live values on every frame)
+# - Frame logs (frame_idx, t, tip_x, tip_y + "# preset=.. seed=.." header): everything TrialRunner saw,
+#   so a session can be replayed and re-scored without the camera (rt_replay.py)
+
+import csv, math, random
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+from rt_score import sara_score_from_distance, RT_DISTANCE_CUTS, RT_MAX_SCORE
+
+# -------------------------
+# Config
+# -------------------------
+@dataclass
+class RTConfig:
+    target_radius: int = 35
+    num_targets: int = 5
+    time_limit: float = 4.0
+    test_types: Tuple[str, ...] = ("Finger Chase", "Finger to Nose")
+    moving_tests: Tuple[str, ...] = ("Finger Chase",)
+    chase_speed: float = 5.0
+    chase_amplitude: Tuple[int, int] = (30, 30)
+    target_x: Tuple[int, int] = (120, 520)
+    target_y: Tuple[int, int] = (100, 380)
+    pause_sec: float = 1.5                     # "Test Done!" screen between tests
+    trajectory_metrics: bool = True            # smoothness / tremor columns
+    distance_cuts: Tuple[float, ...] = RT_DISTANCE_CUTS
+    csv_header: List[str] = field(default_factory=lambda: [
+        "Test Type", "Target Index", "Hit Time (s)", "Distance (px)",
+        "Smoothness", "Tremor Amplitude", "Score (0-4)"])
+
+PRESETS = {
+    "251020": RTConfig(),
+    "rtt1": RTConfig(target_radius=40, num_targets=10, time_limit=3.0, test_types=("Finger Chase",),
+                     moving_tests=(), target_x=(100, 500), target_y=(100, 400), pause_sec=0.0,
+                     trajectory_metrics=False,
+                     csv_header=["Target", "Hit Time (s)", "Distance (px)", "Score (0-4)"]),
+}
+STATS_HEADER = ["FPS", "Dropped Frames", "Latency (ms)"]
+
+# -------------------------
+# Trajectory metrics (unchanged from the script)
+# -------------------------
+def get_random_target(cfg: RTConfig = PRESETS["251020"], rng=random):
+    return rng.randint(*cfg.target_x), rng.randint(*cfg.target_y)
+
+def compute_smoothness(positions):
+    if len(positions) < 5:
+        return 0
+    velocities = [math.hypot(positions[i+1][0]-positions[i][0],
+                             positions[i+1][1]-positions[i][1])
+                  for i in range(len(positions)-1)]
+    if len(velocities) < 2:
+        return 0
+    diffs = [abs(velocities[i+1]-velocities[i]) for i in range(len(velocities)-1)]
+    return round(sum(diffs)/len(diffs), 2)
+
+def compute_tremor(positions):
+    if len(positions) < 10:
+        return 0
+    xs = [p[0] for p in positions]
+    ys = [p[1] for p in positions]
+    mean_x, mean_y = sum(xs)/len(xs), sum(ys)/len(ys)
+    tremor = math.sqrt(sum((x-mean_x)**2 + (y-mean_y)**2 for x,y in positions)/len(positions))
+    return round(tremor, 2)
+
+class TrajectoryBuffer:
+    # last `capacity` points for drawing / export; the metrics cover every point since clear()
+    # smoothness: running sum of |v[i+1] - v[i]| (same order as compute_smoothness)
+    # tremor: Welford mean / M2 of x and y, RMS radial deviation = sqrt((M2x + M2y)/n)
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, 3))        # x, y, t
+        self.clear()
+
+    def clear(self):
+        self.n = 0
+        self.last: Optional[Tuple[float, float]] = None
+        self.last_v: Optional[float] = None
+        self.dv_sum = 0.0
+        self.mx = self.my = self.m2x = self.m2y = 0.0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def append(self, x: float, y: float, t: float = float("nan")):
+        self.data[self.n % self.capacity] = (x, y, t)
+        if self.last is not None:
+            v = math.hypot(x - self.last[0], y - self.last[1])
+            if self.last_v is not None:
+                self.dv_sum += abs(v - self.last_v)
+            self.last_v = v
+        self.last = (x, y)
+        self.n += 1
+        dx, dy = x - self.mx, y - self.my
+        self.mx += dx/self.n
+        self.my += dy/self.n
+        self.m2x += dx*(x - self.mx)
+        self.m2y += dy*(y - self.my)
+
+    def smoothness(self) -> float:
+        if self.n < 5:
+            return 0
+        return round(self.dv_sum/(self.n - 2), 2)
+
+    def tremor(self) -> float:
+        if self.n < 10:
+            return 0
+        return round(math.sqrt(max(self.m2x + self.m2y, 0.0)/self.n), 2)
+
+    def points(self) -> np.ndarray:
+        # (min(n, capacity), 3) oldest first (copy)
+        k = min(self.n, self.capacity)
+        i = self.n % self.capacity
+        return np.concatenate([self.data[i:k], self.data[:i]]) if self.n > self.capacity else self.data[:k].copy()
+
+# -------------------------
+# Trial state machine
+# -------------------------
+class TrialRunner:
+    def __init__(self, cfg: RTConfig = PRESETS["251020"], seed: Optional[int] = None):
+        self.cfg = cfg
+        self.rng = random.Random(seed)
+        self.test = 0
+        self.targets = [get_random_target(cfg, self.rng) for _ in range(cfg.num_targets)]
+        self.index = 0
+        self.start: Optional[float] = None        # trial start (capture time)
+        self.resume_at: Optional[float] = None    # end of the "Test Done!" pause
+        self.path = TrajectoryBuffer()
+        self.hit_times: List[Optional[float]] = []
+        self.scores: List[int] = []
+        self.rows: List[Dict] = []
+        self.done = False
+
+    @property
+    def test_type(self) -> str:
+        return self.cfg.test_types[min(self.test, len(self.cfg.test_types) - 1)]
+
+    def target_pos(self, t: float) -> Tuple[int, int]:
+        tx, ty = self.targets[min(self.index, len(self.targets) - 1)]
+        if self.test_type in self.cfg.moving_tests:
+            ax, ay = self.cfg.chase_amplitude
+            tx += int(ax*math.sin(t*self.cfg.chase_speed))
+            ty += int(ay*math.cos(t*self.cfg.chase_speed))
+        return tx, ty
+
+    def _trial_row(self, t: float, elapsed: Optional[float], dist: Optional[float], score: int) -> Dict:
+        cfg = self.cfg
+        row = dict(test=self.test_type, target=self.index + 1, elapsed=elapsed, dist=dist, score=score, t=t)
+        if cfg.trajectory_metrics and dist is not None:
+            row.update(smoothness=self.path.smoothness(), tremor=self.path.tremor())
+        self.hit_times.append(elapsed)
+        self.scores.append(score)
+        self.rows.append(row)
+        self.path.clear()
+        self.index += 1
+        self.start = t
+        return dict(row, kind="hit" if dist is not None else "timeout")
+
+    def update(self, t: float, tip: Optional[Tuple[int, int]]) -> List[Dict]:
+        # t: capture time (s) of the frame, tip: fingertip (px) or None (no hand)
+        if self.done:
+            return []
+        if self.resume_at is not None:
+            if t < self.resume_at:
+                return []
+            self.resume_at, self.start = None, t
+        if self.start is None:
+            self.start = t
+        events = []
+        if tip is not None:
+            tx, ty = self.target_pos(t)
+            cx, cy = tip
+            self.path.append(cx, cy, t)
+            dist = math.hypot(cx - tx, cy - ty)
+            elapsed = t - self.start
+            if dist <= self.cfg.target_radius:
+                score = sara_score_from_distance(dist, self.cfg.distance_cuts)
+                events.append(self._trial_row(t, elapsed, dist, score))
+            elif elapsed > self.cfg.time_limit:
+                events.append(self._trial_row(t, None, None, RT_MAX_SCORE))
+        if self.index >= self.cfg.num_targets:
+            times = [x for x in self.hit_times if x]
+            events.append(dict(kind="test_done", test=self.test_type, t=t,
+                               avg_score=sum(self.scores)/len(self.scores),
+                               avg_time=(sum(times)/len(times) if times else float("nan"))))
+            self.test += 1
+            if self.test >= len(self.cfg.test_types):
+                self.done = True
+            else:
+                self.targets = [get_random_target(self.cfg, self.rng) for _ in range(self.cfg.num_targets)]
+                self.index = 0
+                self.hit_times, self.scores = [], []
+                self.path.clear()
+                self.resume_at = t + self.cfg.pause_sec
+        return events
+
+# -------------------------
+# CSV rows (script layouts)
+# -------------------------
+def csv_row(cfg: RTConfig, row: Dict, stats: Optional[Dict] = None) -> List:
+    hit = row["dist"] is not None
+    if cfg.trajectory_metrics:
+        out = [row["test"], row["target"], f"{row['elapsed']:.2f}" if hit else "Timeout",
+               f"{row['dist']:.1f}" if hit else "-", row.get("smoothness", "-") if hit else "-",
+               row.get("tremor", "-") if hit else "-", row["score"]]
+    else:
+        out = [row["target"], f"{row['elapsed']:.2f}" if hit else "Timeout",
+               f"{row['dist']:.1f}" if hit else "-", row["score"]]
+    if stats is not None:
+        out += [f"{stats['fps']:.1f}", stats["dropped"], f"{stats['latency_ms']:.1f}"]
+    return out
+
+# -------------------------
+# Frame logs
+# -------------------------
+FRAME_LOG_COLS = ["frame_idx", "t", "tip_x", "tip_y"]
+
+class FrameLog:
+    # one row per frame passed to TrialRunner.update (tip empty = no hand)
+    def __init__(self, path: str, **meta):
+        self.fh = open(path, mode="w", newline="")
+        self.fh.write("# " + " ".join(f"{k}={v}" for k, v in meta.items()) + "\n")
+        self.writer = csv.writer(self.fh)
+        self.writer.writerow(FRAME_LOG_COLS)
+
+    def write(self, idx: int, t: float, tip: Optional[Tuple[int, int]]):
+        self.writer.writerow([idx, repr(t), *(tip if tip is not None else ("", ""))])
+
+    def close(self):
+        self.fh.close()
+
+def read_frame_log(path: str) -> Tuple[Dict[str, str], List[Tuple[float, Optional[Tuple[int, int]]]]]:
+    meta, frames = {}, []
+    with open(path, newline="") as fh:
+        first = fh.readline()
+        if first.startswith("#"):
+            meta = dict(kv.split("=", 1) for kv in first[1:].split() if "=" in kv)
+        else:
+            fh.seek(0)
+        for r in csv.DictReader(fh):
+            tip = (int(r["tip_x"]), int(r["tip_y"])) if r["tip_x"] not in ("", None) else None
+            frames.append((float(r["t"]), tip))
+    return meta, frames
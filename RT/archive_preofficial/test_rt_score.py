@@ -0,0 +1,31 @@
+# test_rt_score.py
+# distance_score_batch vs the per-hit scalar sara_score_from_distance (timeouts NaN -> 4, candidate cut axis)
+
+import numpy as np
+
+from rt_score import RT_DISTANCE_CUTS, RT_MAX_SCORE, sara_score_from_distance, distance_score_batch
+
+def _distances(n=5000, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    d = rng.uniform(0, 120, n)
+    d[::7] = np.round(d[::7]/20)*20                 # exactly on a cut
+    d[rng.random(n) < 0.05] = np.nan                 # timeouts
+    d[rng.random(n) < 0.01] = np.inf
+    return d
+
+def test_distance_score_batch_matches_scalar():
+    d = _distances()
+    assert distance_score_batch(d).tolist() == [sara_score_from_distance(v) for v in d]
+
+def test_timeout_scores_max():
+    assert distance_score_batch([np.nan]).tolist() == [RT_MAX_SCORE]
+    assert sara_score_from_distance(np.nan) == RT_MAX_SCORE
+
+def test_candidate_cuts_axis():
+    d = _distances(500, seed=1)
+    rng = np.random.default_rng(2)
+    cuts = np.vstack([RT_DISTANCE_CUTS, np.sort(rng.uniform(0, 100, (5, 4)), axis=1)])
+    grid = distance_score_batch(d[:, None], cuts)
+    assert grid.shape == (len(d), len(cuts))
+    for k, c in enumerate(cuts):
+        assert grid[:, k].tolist() == [sara_score_from_distance(v, c) for v in d]
@@ -0,0 +1,43 @@
+# test_rt_trial.py
+# TrajectoryBuffer running sums vs the list versions compute_smoothness / compute_tremor
+# (short paths, exactly one ring, and past the 1024-point ring so the buffer wraps)
+
+import numpy as np
+import pytest
+
+from rt_trial import TrajectoryBuffer, compute_smoothness, compute_tremor
+
+def _path(rng, n):
+    # webcam fingertip: integer pixels, random walk around the screen centre, ~10 % frames without motion
+    steps = rng.normal(0, 4, (n, 2))
+    steps[rng.random(n) < 0.1] = 0
+    xy = np.round(np.cumsum(steps, axis=0) + [320, 240]).astype(int)
+    return [(int(x), int(y)) for x, y in xy]
+
+@pytest.mark.parametrize("n", [0, 1, 2, 4, 5, 9, 10, 64, 1024, 1025, 3000])
+def test_buffer_metrics_match_list_versions(n):
+    rng = np.random.default_rng(n)
+    pts = _path(rng, n)
+    buf = TrajectoryBuffer(capacity=1024)
+    for i, (x, y) in enumerate(pts):
+        buf.append(x, y, i/30)
+        seen = pts[:i + 1]
+        if i % 97 == 0 or i == n - 1:                # live values, every so often + the end-of-trial value
+            assert buf.smoothness() == compute_smoothness(seen) and buf.tremor() == compute_tremor(seen)
+    assert len(buf) == n
+    assert buf.smoothness() == compute_smoothness(pts) and buf.tremor() == compute_tremor(pts)
+    kept = buf.points()
+    assert kept.shape == (min(n, 1024), 3) and kept[:, :2].tolist() == [list(p) for p in pts[-1024:]]
+    assert np.allclose(kept[:, 2], np.arange(max(0, n - 1024), n)/30)
+
+def test_clear_restarts_metrics():
+    rng = np.random.default_rng(3)
+    buf = TrajectoryBuffer(capacity=16)
+    for x, y in _path(rng, 200):
+        buf.append(x, y)
+    buf.clear()
+    pts = _path(rng, 40)
+    for x, y in pts:
+        buf.append(x, y)
+    assert buf.smoothness() == compute_smoothness(pts) and buf.tremor() == compute_tremor(pts)
+    assert buf.points()[:, :2].tolist() == [list(p) for p in pts[-16:]]
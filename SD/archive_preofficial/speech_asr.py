@@ -0,0 +1,266 @@
+# speech_asr.py
+# Batched, load-once ASR intelligibility service (replaces the per-clip `result.text` + jiwer script,
+# cmq_SpeechDeturbance_20251018.py)
+# - Local Whisper model (transformers, CPU only, local_files_only) loaded once per process
+# - Clips are sorted by duration (sf.info) and loaded + transcribed batch_size at a time (one generate() call
+#   per batch), so only one batch of audio is in memory
+# - Clips longer than one Whisper window (30 s) are cut into 30 s windows, transcribed as separate items and
+#   joined (the feature extractor would otherwise silently drop everything after 30 s); asr_windows > 1 in the
+#   output marks them (a word on a cut can be split)
+# - Transcripts cached by audio hash + model + language (speech_cache.FeatureCache, stage "asr")
+# - WER / CER against the reference prompts in bulk: one jiwer alignment over all clips,
+#   per-clip error counts read from the alignments
+# - Output rows: record_id, duration_sec, tempo_bpm (transcript words/min), wer, cer, intelligibility_pct
+#   (+ silence_ratio joined from a speech_batch summary) = the inputs of sara_speech_from_four
+# - Reports clips/sec (transcription and end-to-end)
+
+import os, sys, csv, glob, math, time, argparse
+from typing import List, Dict, Optional, Sequence
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "common"))     # shared record naming (cmq_records.py)
+from cmq_records import parse_record_name
+
+from speech_f0 import resample_to
+from speech_cache import FeatureCache, DEFAULT_MAX_MB
+
+# --- Optional deps (graceful fallback)
+JIWER_OK = True
+try:
+    import jiwer
+except Exception:
+    JIWER_OK = False
+
+TRANSFORMERS_OK = True
+try:
+    import torch
+    from transformers import WhisperProcessor, WhisperForConditionalGeneration
+except Exception:
+    TRANSFORMERS_OK = False
+
+ASR_SR = 16000
+WHISPER_WINDOW_SEC = 30.0
+AUDIO_EXTS = (".wav", ".flac", ".ogg", ".mp3", ".webm")
+DEFAULT_PROMPT = "the quick brown fox jumps over the lazy dog"
+
+# -------------------------
+# Transcription
+# -------------------------
+class WhisperTranscriber:
+    # load once, transcribe many: model_dir = local Whisper checkpoint (e.g. models/whisper-base)
+    def __init__(self, model_dir: str, language: str = "en", batch_size: int = 8,
+                 threads: Optional[int] = None, max_new_tokens: int = 96):
+        if not TRANSFORMERS_OK:
+            raise RuntimeError("transformers / torch not available")
+        if threads:
+            torch.set_num_threads(threads)
+        self.model_dir, self.language, self.batch_size = model_dir, language, batch_size
+        self.max_new_tokens = max_new_tokens
+        self.processor = WhisperProcessor.from_pretrained(model_dir, local_files_only=True)
+        self.model = WhisperForConditionalGeneration.from_pretrained(model_dir, local_files_only=True).eval()
+        self.name = os.path.basename(os.path.normpath(model_dir))
+
+    def transcribe(self, clips: Sequence[np.ndarray]) -> List[str]:
+        # clips: mono float32 @ ASR_SR; longer than one window -> 30 s windows, texts joined in order
+        items = [(j, w) for j, c in enumerate(clips) for w in asr_windows(c)]
+        parts = [""]*len(items)
+        order = np.argsort([len(w) for _, w in items], kind="stable")   # similar lengths share a batch
+        for i in range(0, len(order), self.batch_size):
+            idx = order[i:i+self.batch_size]
+            feats = self.processor([items[k][1] for k in idx], sampling_rate=ASR_SR,
+                                   return_tensors="pt").input_features
+            with torch.inference_mode():
+                ids = self.model.generate(feats, language=self.language, task="transcribe",
+                                          max_new_tokens=self.max_new_tokens)
+            for k, text in zip(idx, self.processor.batch_decode(ids, skip_special_tokens=True)):
+                parts[k] = text.strip()
+        out = [[] for _ in clips]
+        for (j, _), text in zip(items, parts):
+            if text:
+                out[j].append(text)
+        return [" ".join(t) for t in out]
+
+def asr_windows(y: np.ndarray) -> List[np.ndarray]:
+    n = int(WHISPER_WINDOW_SEC*ASR_SR)
+    return [y[i:i+n] for i in range(0, max(len(y), 1), n)]
+
+def n_windows(duration_sec: float) -> int:
+    return max(1, math.ceil(duration_sec/WHISPER_WINDOW_SEC - 1e-9))
+
+def load_clip(path: str) -> np.ndarray:
+    import soundfile as sf
+    y, sr = sf.read(path, dtype="float32", always_2d=True)
+    y, _ = resample_to(y.mean(axis=1), int(sr), ASR_SR)
+    return y
+
+# -------------------------
+# Scoring (bulk)
+# -------------------------
+def normalize_text(s: str) -> str:
+    # lower-case, no punctuation, single spaces (Whisper adds capitals / punctuation the prompts lack)
+    s = "".join(ch if ch.isalnum() or ch.isspace() or ch == "'" else " " for ch in s.lower())
+    return " ".join(s.split())
+
+def _errors(alignments) -> np.ndarray:
+    # substitutions + deletions + insertions per sentence from jiwer alignment chunks
+    err = np.zeros(len(alignments), dtype=np.int64)
+    for i, chunks in enumerate(alignments):
+        for c in chunks:
+            if c.type in ("substitute", "delete"):
+                err[i] += c.ref_end_idx - c.ref_start_idx
+            elif c.type == "insert":
+                err[i] += c.hyp_end_idx - c.hyp_start_idx
+    return err
+
+def score_transcripts(refs: Sequence[str], hyps: Sequence[str]) -> Dict:
+    # one word- and one character-level alignment over all clips -> per-clip WER / CER + corpus totals
+    if not JIWER_OK:
+        raise RuntimeError("jiwer not available")
+    refs = [normalize_text(r) for r in refs]
+    hyps = [normalize_text(h) for h in hyps]
+    w = jiwer.process_words(refs, hyps)
+    c = jiwer.process_characters(refs, hyps)
+    n_words = np.array([len(r) for r in w.references], dtype=float)
+    n_chars = np.array([len(r) for r in c.references], dtype=float)
+    wer = _errors(w.alignments)/np.maximum(n_words, 1)
+    cer = _errors(c.alignments)/np.maximum(n_chars, 1)
+    return dict(wer=wer, cer=cer,
+                intelligibility_pct=(1.0 - cer)*100.0,
+                corpus_wer=float(w.wer), corpus_cer=float(c.cer))
+
+# -------------------------
+# Service
+# -------------------------
+class IntelligibilityService:
+    # transcriber loaded once; cache=None -> always transcribe
+    def __init__(self, transcriber: WhisperTranscriber, cache: Optional[FeatureCache] = None):
+        self.asr, self.cache = transcriber, cache
+        self.params = dict(model=transcriber.name, language=transcriber.language)
+        self.stats = dict(clips=0, cached=0, transcribed=0, long_clips=0, asr_sec=0.0, total_sec=0.0)
+
+    def transcripts(self, paths: Sequence[str]) -> List[str]:
+        texts: List[Optional[str]] = [None]*len(paths)
+        keys = [self.cache.audio_key(p) for p in paths] if self.cache is not None else [None]*len(paths)
+        if self.cache is not None:
+            for i, k in enumerate(keys):
+                hit = self.cache.get(k, "asr", self.params)
+                if hit is not None:
+                    texts[i] = hit["text"]
+        todo = [i for i, t in enumerate(texts) if t is None]
+        todo.sort(key=lambda i: audio_duration(paths[i]))          # header only: similar lengths share a batch
+        bs = self.asr.batch_size
+        for b in range(0, len(todo), bs):
+            batch = todo[b:b+bs]
+            clips = [load_clip(paths[i]) for i in batch]           # one batch of audio in memory at a time
+            t0 = time.perf_counter()
+            new = self.asr.transcribe(clips)
+            self.stats["asr_sec"] += time.perf_counter() - t0
+            for i, y, t in zip(batch, clips, new):
+                texts[i] = t
+                if self.cache is not None:
+                    self.cache.put(keys[i], "asr", self.params, dict(text=t, duration_sec=len(y)/ASR_SR))
+        self.stats["cached"] += len(paths) - len(todo)
+        self.stats["transcribed"] += len(todo)
+        return texts
+
+    def score(self, paths: Sequence[str], refs: Sequence[str]) -> List[Dict]:
+        t0 = time.perf_counter()
+        hyps = self.transcripts(paths)
+        sc = score_transcripts(refs, hyps)
+        rows = []
+        for i, p in enumerate(paths):
+            rec = parse_record_name(p)
+            dur = audio_duration(p)
+            rows.append(dict(record_id=rec["record_id"], pid=rec["pid"], path=p, duration_sec=dur,
+                             tempo_bpm=(len(normalize_text(hyps[i]).split())*60.0/dur if dur > 0 else np.nan),
+                             asr_windows=n_windows(dur), reference=refs[i], transcript=hyps[i],
+                             wer=float(sc["wer"][i]), cer=float(sc["cer"][i]),
+                             intelligibility_pct=float(sc["intelligibility_pct"][i])))
+        self.stats["clips"] += len(paths)
+        self.stats["total_sec"] += time.perf_counter() - t0
+        self.stats["long_clips"] += sum(r["asr_windows"] > 1 for r in rows)
+        self.stats.update(corpus_wer=sc["corpus_wer"], corpus_cer=sc["corpus_cer"])
+        return rows
+
+    def throughput(self) -> Dict:
+        s = self.stats
+        return dict(s, asr_clips_per_sec=(s["transcribed"]/s["asr_sec"] if s["asr_sec"] else np.nan),
+                    clips_per_sec=(s["clips"]/s["total_sec"] if s["total_sec"] else np.nan))
+
+def audio_duration(path: str) -> float:
+    import soundfile as sf
+    return float(sf.info(path).duration)
+
+# -------------------------
+# Inputs: prompts & speech summary
+# -------------------------
+def load_references(paths: Sequence[str], refs_csv: Optional[str], default: str) -> List[str]:
+    # refs_csv: record_id,reference (missing ids fall back to the default prompt)
+    table = {}
+    if refs_csv:
+        with open(refs_csv, newline="", encoding="utf-8") as f:
+            table = {r["record_id"]: r["reference"] for r in csv.DictReader(f)}
+    return [table.get(parse_record_name(p)["record_id"], default) for p in paths]
+
+def join_speech_summary(rows: List[Dict], summary_csv: str):
+    # silence_ratio = pause_ratio from speech_batch_summary.csv (same record_id)
+    with open(summary_csv, newline="", encoding="utf-8") as f:
+        summ = {r["record_id"]: r for r in csv.DictReader(f)}
+    for row in rows:
+        s = summ.get(row["record_id"])
+        ok = s is not None and s.get("status", "ok") == "ok"
+        row["silence_ratio"] = float(s["pause_ratio"]) if ok else np.nan
+
+SARA_INPUT_COLS = ["record_id", "pid", "duration_sec", "silence_ratio", "tempo_bpm", "intelligibility_pct"]
+ASR_COLS = SARA_INPUT_COLS + ["wer", "cer", "asr_windows", "reference", "transcript", "path"]
+
+def collect_clips(spec: str) -> List[str]:
+    if os.path.isdir(spec):
+        paths = [os.path.join(spec, f) for f in os.listdir(spec) if f.lower().endswith(AUDIO_EXTS)]
+    else:
+        paths = glob.glob(spec)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speech Test intelligibility (batched local ASR + WER/CER)")
+    parser.add_argument("inputs", nargs="+", help="directories and/or globs of clips")
+    parser.add_argument("--model", required=True, help="local Whisper checkpoint directory")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--batch-size", type=int, default=8, help="clips per inference call")
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads (default: torch's)")
+    parser.add_argument("--ref", default=DEFAULT_PROMPT, help="reference prompt (all clips)")
+    parser.add_argument("--refs", default=None, help="per-clip prompts CSV (record_id,reference)")
+    parser.add_argument("--summary", default=None, help="speech_batch summary CSV (adds silence_ratio)")
+    parser.add_argument("--cache", default=None, help="transcript cache directory (e.g. .speech_cache)")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_MB)
+    parser.add_argument("--out", default="speech_asr_scores.csv")
+    args = parser.parse_args()
+
+    paths = sorted({p for spec in args.inputs for p in collect_clips(spec)})
+    if not paths:
+        parser.error("no input clips found")
+    t0 = time.perf_counter()
+    svc = IntelligibilityService(
+        WhisperTranscriber(args.model, language=args.language, batch_size=args.batch_size, threads=args.threads),
+        cache=FeatureCache(args.cache, args.cache_max_mb) if args.cache else None)
+    t_load = time.perf_counter() - t0
+    rows = svc.score(paths, load_references(paths, args.refs, args.ref))
+    if args.summary:
+        join_speech_summary(rows, args.summary)
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=ASR_COLS, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+    tp = svc.throughput()
+    print(f"=== ASR === {tp['clips']} clips ({tp['cached']} cached), model load {t_load:.1f}s, "
+          f"ASR {tp['asr_clips_per_sec']:.2f} clips/s, end-to-end {tp['clips_per_sec']:.2f} clips/s")
+    print(f"corpus WER {tp['corpus_wer']:.3f}, CER {tp['corpus_cer']:.3f}")
+    if tp["long_clips"]:
+        print(f"WARNING: {tp['long_clips']} clips longer than {WHISPER_WINDOW_SEC:g} s were transcribed in "
+              f"{WHISPER_WINDOW_SEC:g} s windows (asr_windows > 1; a word on a cut can be split)")
+    print("Saved:", args.out)
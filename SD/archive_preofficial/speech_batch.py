@@ -0,0 +1,160 @@
+# speech_batch.py
+# Batch / corpus mode for speech_pipeline.run_pipeline
+# - Collect recordings from a directory or glob (e.g. SD/raw, "SD/raw/SD_*.wav")
+# - Fan out over a process pool (configurable worker count)
+# - Stream one row per recording into a single combined summary CSV
+#   (keyed by the MOD_PID_YYYYMMDD_HHMMSS filename convention, parsed by common/cmq_records.py)
+# - Per-file failures are recorded as rows, the batch keeps going
+
+import os, sys, csv, glob, json, time, argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional
+
+# one process per core: keep BLAS/OpenMP/numba single-threaded inside each worker
+# (must be set before numpy/librosa are imported, workers inherit it)
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "common"))     # shared record naming (cmq_records.py)
+from cmq_records import parse_record_name
+
+from speech_pipeline import run_pipeline, to_jsonable, F0_ENGINES, PRAAT_MODES
+from speech_cache import FeatureCache, DEFAULT_MAX_MB
+from speech_profile import StageProfiler, profile_table
+from speech_tremor import TREMOR_MAP_COLS
+
+# -------------------------
+# Inputs & naming
+# -------------------------
+AUDIO_EXTS = (".wav", ".flac", ".ogg", ".mp3", ".webm")
+
+def collect_inputs(spec: str) -> List[str]:
+    if os.path.isdir(spec):
+        paths = [os.path.join(spec, f) for f in os.listdir(spec)
+                 if f.lower().endswith(AUDIO_EXTS)]
+    else:
+        paths = glob.glob(spec)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+# -------------------------
+# Worker
+# -------------------------
+KEY_COLS = ["record_id", "module", "pid", "date", "time", "path"]
+SUMMARY_COLS = ["pause_ratio", "speech_rate", "f0_sd_st", "jitter_percent", "shimmer_percent",
+                "tremor_peak_hz", "tremor_rms", "ddk_rate_sps", "ddk_interval_sd_ms"]
+STATUS_COLS = ["sara4_auto", "status", "error", "elapsed_sec"]
+ROW_COLS = KEY_COLS + SUMMARY_COLS + TREMOR_MAP_COLS + STATUS_COLS
+
+_CACHES = {}
+
+def analyse_one(path: str, sr: Optional[int], f0_engine: str = "pyin",
+                cache_dir: Optional[str] = None, cache_max_mb: float = DEFAULT_MAX_MB,
+                praat_mode: str = "concat", praat_timeout: float = 30.0, profile: bool = False,
+                low_mem: bool = False) -> Dict:
+    # runs inside a pool worker; never raises so one bad file can't stop the batch
+    # (Praat runs in one killable child per worker, so a hung file only costs praat_timeout)
+    row = dict(parse_record_name(path), path=path)
+    t0 = time.perf_counter()
+    try:
+        cache = None
+        if cache_dir:
+            # one FeatureCache per worker process (keeps its digest memo warm)
+            cache = _CACHES.get(cache_dir) or _CACHES.setdefault(cache_dir, FeatureCache(cache_dir, cache_max_mb))
+        out = run_pipeline(path, sr=sr, save=False, f0_engine=f0_engine, cache=cache,
+                           praat_mode=praat_mode, praat_timeout=praat_timeout,
+                           profiler=StageProfiler() if profile else None, low_mem=low_mem)
+        row.update(out["summary"])
+        row.update({k: out["tremor"].get(k) for k in TREMOR_MAP_COLS})
+        row.update(sara4_auto=out["sara4_auto"], status="ok", error="")
+    except Exception as e:
+        out = None
+        row.update(status="error", error=f"{type(e).__name__}: {e}")
+    row["elapsed_sec"] = round(time.perf_counter() - t0, 3)
+    return dict(row=row, metrics=out)
+
+# -------------------------
+# Batch driver
+# -------------------------
+def run_batch(paths: List[str], out_csv: str = "speech_batch_summary.csv",
+              out_jsonl: Optional[str] = None, workers: Optional[int] = None,
+              sr: Optional[int] = None, f0_engine: str = "pyin",
+              cache_dir: Optional[str] = None, cache_max_mb: float = DEFAULT_MAX_MB,
+              praat_mode: str = "concat", praat_timeout: float = 30.0,
+              profile_csv: Optional[str] = None, low_mem: bool = False) -> List[Dict]:
+    # profile_csv: per-stage profiling on every file, aggregated table written here
+    workers = workers or os.cpu_count() or 1
+    rows, profiles = [], []
+    jf = open(out_jsonl, "w", encoding="utf-8") if out_jsonl else None
+    try:
+        with open(out_csv, "w", newline="", encoding="utf-8") as cf, \
+             ProcessPoolExecutor(max_workers=workers) as pool:
+            writer = csv.DictWriter(cf, fieldnames=ROW_COLS, extrasaction="ignore")
+            writer.writeheader()
+            futures = {pool.submit(analyse_one, p, sr, f0_engine, cache_dir, cache_max_mb,
+                                   praat_mode, praat_timeout, bool(profile_csv), low_mem): p for p in paths}
+            for fut in as_completed(futures):
+                path = futures[fut]
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    # worker died (e.g. BrokenProcessPool / native crash)
+                    res = dict(row=dict(parse_record_name(path), path=path, status="error",
+                                        error=f"{type(e).__name__}: {e}"), metrics=None)
+                row = res["row"]
+                writer.writerow(row)
+                cf.flush()
+                if jf is not None:
+                    jf.write(json.dumps(to_jsonable(dict(row=row, metrics=res["metrics"])),
+                                        ensure_ascii=False) + "\n")
+                    jf.flush()
+                rows.append(row)
+                if res["metrics"] is not None and "profile" in res["metrics"]:
+                    profiles.append(res["metrics"]["profile"])
+                print(f"[{len(rows)}/{len(paths)}] {row['record_id']}: {row['status']}"
+                      + (f" ({row['error']})" if row["status"] != "ok" else ""))
+    finally:
+        if jf is not None:
+            jf.close()
+    if profile_csv and profiles:
+        table = profile_table(profiles)
+        table.to_csv(profile_csv, index=False)
+        print(f"=== PROFILE === {len(profiles)} files, "
+              f"{sum(p['input'].get('dur_sec', 0) for p in profiles):.0f}s audio (stage self times)")
+        print(table.round(3).to_string(index=False))
+    return rows
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speech Test pipeline (batch / corpus mode)")
+    parser.add_argument("inputs", nargs="+", help="directories and/or globs (e.g. SD/raw 'SD/raw/SD_*.wav')")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--sr", type=int, default=None, help="resample to this rate (default: native)")
+    parser.add_argument("--f0-engine", choices=sorted(F0_ENGINES), default="pyin",
+                        help="F0 estimator (pyin = reference, yin = fast)")
+    parser.add_argument("--praat-mode", choices=PRAAT_MODES, default="concat",
+                        help="perturbation input: voiced audio joined (concat), per segment, or full signal")
+    parser.add_argument("--praat-timeout", type=float, default=30.0, help="per-file Praat timeout (sec)")
+    parser.add_argument("--cache", default=None, help="per-stage feature cache directory (shared by workers)")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_MB, help="cache size bound (LRU eviction)")
+    parser.add_argument("--profile", nargs="?", const="speech_batch_profile.csv", default=None,
+                        help="per-stage profiling; aggregated stage table -> this CSV")
+    parser.add_argument("--low-mem", action="store_true",
+                        help="float32 low-memory mode per worker (pack more workers per node)")
+    parser.add_argument("--out", default="speech_batch_summary.csv", help="combined summary CSV")
+    parser.add_argument("--jsonl", default=None, help="optional per-recording metrics (JSON lines)")
+    args = parser.parse_args()
+
+    paths = sorted({p for spec in args.inputs for p in collect_inputs(spec)})
+    if not paths:
+        parser.error("no input recordings found")
+    t0 = time.perf_counter()
+    rows = run_batch(paths, out_csv=args.out, out_jsonl=args.jsonl, workers=args.workers, sr=args.sr,
+                     f0_engine=args.f0_engine, cache_dir=args.cache, cache_max_mb=args.cache_max_mb,
+                     praat_mode=args.praat_mode, praat_timeout=args.praat_timeout,
+                     profile_csv=args.profile, low_mem=args.low_mem)
+    n_ok = sum(r["status"] == "ok" for r in rows)
+    print(f"=== BATCH === {n_ok}/{len(rows)} ok in {time.perf_counter()-t0:.1f}s")
+    print("Saved:", args.out + (f", {args.jsonl}" if args.jsonl else "") + (f", {args.profile}" if args.profile else ""))
@@ -0,0 +1,289 @@
+# speech_bench.py
+# Synthetic-signal benchmark & accuracy suite for the speech DSP stages
+# - Generators with known ground truth:
+#   vowel with set jitter/shimmer, F0 with 3–7 Hz tremor of known depth,
+#   DDK pulse trains at a set rate, speech-plus-silence with known pause ratio & syllable rate
+# - Per stage (vad_segments, syllable_rate, f0_features, tremor_features, ddk_metrics, perturbation):
+#   wall time (best of --repeats calls), peak traced memory (tracemalloc), value vs truth
+# - Runs across durations x sample rates; --save / --compare a baseline JSON to catch speed & accuracy regressions
+#   (a time regression needs both the ratio and an absolute slowdown above --time-floor)
+# - --low-mem-check: whole run_pipeline on a synthetic recording (pauses + tremor vowel + DDK) in the default and
+#   low_mem modes -> wall time, peak traced memory, per-metric drift vs the float64 path (exit 1 over tolerance)
+
+import os, json, time, argparse, tempfile, tracemalloc
+from typing import List, Dict, Callable
+
+import numpy as np
+
+from speech_f0 import synth_vowel, F0_REF_SR, F0_HOP, F0_FPS
+from speech_pipeline import (vad_segments, pause_metrics, syllable_rate, f0_features, tremor_features,
+                             ddk_metrics, perturbation_features, hz_to_semitone, run_pipeline, PARSELMOUTH_OK)
+from speech_tremor import TREMOR_MAP_COLS
+
+# -------------------------
+# Generators (y, truth)
+# -------------------------
+def harmonic_wave(phase: np.ndarray, n_harm: int = 9) -> np.ndarray:
+    # phase in cycles; band-limited sawtooth-like glottal source
+    return sum(np.sin(2*np.pi*h*phase)/h for h in range(1, n_harm+1))
+
+def gen_perturbed_vowel(sr: int, dur: float, f0=140.0, jitter_pct=1.0, shimmer_pct=3.0,
+                        pulse_ms=1.0, seed=0):
+    # glottal pulse train: fixed-width Gaussian pulse at each epoch, periods T_i and amplitudes A_i
+    # iid Gaussian around 1/f0 and 1; truth = local jitter / shimmer of the generated sequences
+    # (Praat definitions). Fixed-width pulses keep Praat's cc pulse placement on the epochs.
+    rng = np.random.default_rng(seed)
+    n = int(dur*f0*1.2) + 2
+    a, b = jitter_pct*np.sqrt(np.pi)/200, shimmer_pct*np.sqrt(np.pi)/200   # E|x_i - x_{i-1}| = 2σ/√π
+    T = np.clip((1.0 + a*rng.standard_normal(n))/f0, 0.5/f0, 2.0/f0)
+    A = np.clip(1.0 + b*rng.standard_normal(n), 0.2, None)
+    ep = np.cumsum(T)
+    t = np.arange(int(sr*dur))/sr
+    i = np.clip(np.searchsorted(ep, t), 1, n-1)
+    near = np.where(t - ep[i-1] < ep[i] - t, i-1, i)               # nearest epoch
+    y = 0.2*A[near]*np.exp(-0.5*((t - ep[near])/(pulse_ms/1000))**2)
+    y += 1e-4*rng.standard_normal(len(t))
+    m = int(np.searchsorted(ep, dur))                              # epochs inside the signal
+    P, A = np.diff(ep[:m]), A[:m]
+    truth = dict(jitter_percent=100*np.mean(np.abs(np.diff(P)))/np.mean(P),
+                 shimmer_percent=100*np.mean(np.abs(np.diff(A)))/np.mean(A),
+                 f0_mean_hz=1.0/np.mean(P))
+    return y.astype(np.float32), truth
+
+def gen_tremor_vowel(sr: int, dur: float, f0=140.0, trem_hz=5.0, trem_depth=0.03, seed=0):
+    # continuous vowel, f0(t) = f0*(1 + depth*sin(2π trem_hz t))
+    y = synth_vowel(sr, dur, f0=f0, trem_hz=trem_hz, trem_depth=trem_depth, on_sec=dur+1.0, off_sec=0.0, seed=seed)
+    tk = np.arange(1 + (int(sr*dur)*F0_REF_SR//sr)//F0_HOP)*F0_HOP/F0_REF_SR
+    f0_true = f0*(1.0 + trem_depth*np.sin(2*np.pi*trem_hz*tk))
+    truth = dict(f0_hz=f0_true, f0_sd_st=float(np.std(hz_to_semitone(f0_true))),
+                 tremor_peak_hz=trem_hz, tremor_rms=f0*trem_depth/np.sqrt(2))
+    return y, truth
+
+def gen_ddk_train(sr: int, dur: float, rate=6.0, interval_sd_ms=10.0, duty=0.5, f0=140.0,
+                  noise=1e-3, seed=0):
+    # /pa/ repetitions: 5 ms noise burst + Hann-shaped vowel (duty x interval long),
+    # onsets with Gaussian interval jitter
+    rng = np.random.default_rng(seed)
+    n = int(sr*dur)
+    iv = np.clip(1.0/rate + interval_sd_ms/1000*rng.standard_normal(int(dur*rate*1.5) + 2), 0.06, None)
+    L = int(duty/rate*sr)
+    on = 0.25 + np.concatenate([[0.0], np.cumsum(iv)])
+    on = on[on + L/sr < dur - 0.1]
+    syl = np.hanning(L)*harmonic_wave(np.arange(L)*f0/sr)
+    B = int(0.005*sr)
+    syl[:B] += 0.5*rng.standard_normal(B)
+    syl = 0.2*syl/np.max(np.abs(syl))
+    y = noise*rng.standard_normal(n)
+    for s in (on*sr).astype(np.int64):
+        y[s:s+L] += syl
+    ivs = np.diff(on)
+    truth = dict(ddk_rate_sps=1.0/np.mean(ivs), ddk_interval_sd_ms=1000*np.std(ivs), n_syllables=len(on))
+    return y.astype(np.float32), truth
+
+def gen_speech_pauses(sr: int, dur: float, on_sec=1.2, off_sec=0.4, syl_rate=5.0, f0=140.0,
+                      noise=5e-4, seed=0):
+    # speech runs of on_sec (syl_rate syllables/sec, AM vowel) separated by off_sec silences
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr*dur))/sr
+    period = on_sec + off_sec
+    tr = t % period
+    gate = tr < on_sec
+    env = 0.3 + 0.7*np.sin(np.pi*tr*syl_rate)**2                    # one lobe per syllable
+    ph = np.cumsum(np.full(len(t), f0/sr))
+    y = 0.2*gate*env*harmonic_wave(ph)/2.0 + noise*rng.standard_normal(len(t))
+    n_full = int(dur//period + 1e-9)
+    tail = min(dur - n_full*period, on_sec)
+    n_syl = n_full*int(round(on_sec*syl_rate)) + int(np.floor(tail*syl_rate + 1e-9))
+    voiced_sec = float(gate.sum())/sr
+    truth = dict(pause_ratio=1.0 - voiced_sec/dur, speech_rate_sps=n_syl/voiced_sec)
+    return y.astype(np.float32), truth
+
+# -------------------------
+# Measurement
+# -------------------------
+def measure(fn: Callable, mem: bool = True, repeats: int = 3):
+    # best wall time of `repeats` calls (min: least scheduler / cache noise), then peak traced allocation
+    sec = np.inf
+    for _ in range(max(1, repeats)):
+        t0 = time.perf_counter()
+        out = fn()
+        sec = min(sec, time.perf_counter() - t0)
+    peak = np.nan
+    if mem:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]/2**20
+        tracemalloc.stop()
+    return out, sec, peak
+
+def cents_error(f0: np.ndarray, truth: np.ndarray) -> float:
+    n = min(len(f0), len(truth))
+    ok = np.isfinite(f0[:n]) & (f0[:n] > 0)
+    return float(np.median(1200*np.abs(np.log2(f0[:n][ok]/truth[:n][ok])))) if ok.any() else np.nan
+
+def bench_case(sr: int, dur: float, f0_engines=("pyin", "yin"), mem: bool = True, repeats: int = 3) -> List[Dict]:
+    rows = []
+
+    def add(stage, sec, peak, values: Dict, truth: Dict):
+        for k, v in values.items():
+            tv = truth.get(k, np.nan)
+            err = v - tv if np.isfinite(tv) else np.nan
+            rows.append(dict(stage=stage, sr=sr, dur_sec=dur, sec=round(sec, 4), peak_mib=round(peak, 2),
+                             metric=k, value=v, truth=tv, abs_err=abs(err),
+                             rel_err_pct=100*abs(err)/abs(tv) if np.isfinite(tv) and tv else np.nan))
+
+    # VAD / pauses / syllable rate
+    y, truth = gen_speech_pauses(sr, dur)
+    segs, sec, peak = measure(lambda: vad_segments(y, sr), mem, repeats)
+    add("vad_segments", sec, peak, dict(pause_ratio=pause_metrics(y, sr, segs)["pause_ratio"]), truth)
+    rate, sec, peak = measure(lambda: syllable_rate(y, sr, segs), mem, repeats)
+    add("syllable_rate", sec, peak, dict(speech_rate_sps=rate["speech_rate_sps"]), truth)
+
+    # F0 engines + tremor (on each engine's track)
+    y, truth = gen_tremor_vowel(sr, dur)
+    segs = vad_segments(y, sr)
+    for eng in f0_engines:
+        f0met, sec, peak = measure(lambda: f0_features(y, sr, engine=eng, segs=segs), mem, repeats)
+        add(f"f0_features[{eng}]", sec, peak,
+            dict(f0_sd_st=f0met["f0_sd_st"], median_err_cents=cents_error(f0met["f0_hz"], truth["f0_hz"])),
+            dict(truth, median_err_cents=0.0))
+        trem, sec, peak = measure(lambda: tremor_features(f0met["f0_hz"], sr_frames=F0_FPS), mem, repeats)
+        add(f"tremor_features[{eng}]", sec, peak, trem, truth)
+
+    # DDK
+    y, truth = gen_ddk_train(sr, dur)
+    ddk, sec, peak = measure(lambda: ddk_metrics(y, sr), mem, repeats)
+    add("ddk_metrics", sec, peak, ddk, truth)
+
+    # jitter / shimmer (whole signal, inline: no pool start-up in the timing)
+    if PARSELMOUTH_OK:
+        from speech_praat import PraatPool
+        y, truth = gen_perturbed_vowel(sr, dur)
+        pert, sec, peak = measure(lambda: perturbation_features(y, sr, mode="full", pool=PraatPool(0)), mem, repeats)
+        add("perturbation", sec, peak, {k: pert[k] for k in ("jitter_percent", "shimmer_percent")}, truth)
+    return rows
+
+def run_bench(durations=(5.0, 30.0), rates=(16000, 44100), f0_engines=("pyin", "yin"), mem=True,
+              repeats: int = 3) -> List[Dict]:
+    bench_case(min(rates), 1.0, f0_engines, mem=False, repeats=1)     # warm-up (imports, numba JIT, FFT plans)
+    rows = []
+    for sr in rates:
+        for dur in durations:
+            print(f"... sr={sr} dur={dur:g}s", flush=True)
+            rows += bench_case(sr, dur, f0_engines, mem, repeats)
+    return rows
+
+# -------------------------
+# Low-memory mode: whole pipeline, default vs low_mem
+# -------------------------
+def low_mem_check(sr: int, dur: float, f0_engine: str = "yin", rel_tol_pct: float = 1.0,
+                  abs_tol: float = 1e-3) -> Dict:
+    # one recording = speech with pauses, tremor vowel, DDK train (dur/3 each); Praat inline
+    y = np.concatenate([gen_speech_pauses(sr, dur/3)[0], gen_tremor_vowel(sr, dur/3)[0], gen_ddk_train(sr, dur/3)[0]])
+    import soundfile as sf
+    runs = {}
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "low_mem_check.wav")
+        sf.write(path, y, sr, subtype="FLOAT")
+        del y
+        for mode in (False, True):
+            out, sec, peak = measure(lambda: run_pipeline(path, save=False, f0_engine=f0_engine, praat_workers=0,
+                                                          low_mem=mode), repeats=1)
+            vals = dict(out["summary"], **{k: out["tremor"][k] for k in TREMOR_MAP_COLS},
+                        syllables=out["rate"]["syllables"], pause_count=out["pause"]["pause_count"],
+                        sara4_auto=out["sara4_auto"])
+            runs[mode] = dict(sec=sec, peak_mib=peak, vals=vals)
+    ref, low = runs[False], runs[True]
+    drift = []
+    for k, v in ref["vals"].items():
+        w = low["vals"][k]
+        a, b = float(v), float(w)
+        both_nan = np.isnan(a) and np.isnan(b)
+        d_abs = 0.0 if both_nan else abs(b - a)
+        d_rel = 0.0 if both_nan else (100*d_abs/abs(a) if a else np.nan)
+        ok = both_nan or d_abs <= abs_tol or (np.isfinite(d_rel) and d_rel <= rel_tol_pct)
+        drift.append(dict(metric=k, float64=a, low_mem=b, abs_diff=d_abs, rel_pct=d_rel,
+                          status="ok" if ok else "DRIFT"))
+    return dict(sr=sr, dur_sec=dur, f0_engine=f0_engine,
+                sec=ref["sec"], sec_low_mem=low["sec"],
+                peak_mib=ref["peak_mib"], peak_mib_low_mem=low["peak_mib"], drift=drift)
+
+# -------------------------
+# Regression check
+# -------------------------
+def compare(rows: List[Dict], baseline: List[Dict], time_tol=0.25, err_tol_pct=2.0,
+            time_floor=0.05) -> List[Dict]:
+    # slower than (1 + time_tol) x baseline and by more than time_floor sec (short stages are mostly noise),
+    # or error up by more than err_tol_pct points
+    # (relative error in %; absolute error where the truth is 0, e.g. cents)
+    key = lambda r: (r["stage"], r["sr"], r["dur_sec"], r["metric"])
+    err = lambda r: r["rel_err_pct"] if np.isfinite(r["rel_err_pct"]) else r["abs_err"]
+    base = {key(r): r for r in baseline}
+    out = []
+    for r in rows:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        slow = r["sec"]/max(b["sec"], 1e-6)
+        d_err = err(r) - err(b)
+        flags = ([f"time x{slow:.2f}"] if slow > 1 + time_tol and r["sec"] - b["sec"] > time_floor else []) + \
+                ([f"err +{d_err:.1f} pts"] if np.isfinite(d_err) and d_err > err_tol_pct else [])
+        out.append(dict(key=" ".join(map(str, key(r))), time_ratio=round(slow, 2),
+                        d_err=round(d_err, 2) if np.isfinite(d_err) else np.nan,
+                        status="REGRESSION: " + ", ".join(flags) if flags else "ok"))
+    return out
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speech DSP stage benchmark (synthetic ground truth)")
+    parser.add_argument("--durations", type=float, nargs="+", default=[5.0, 30.0], help="signal lengths (sec)")
+    parser.add_argument("--rates", type=int, nargs="+", default=[16000, 44100], help="sample rates (Hz)")
+    parser.add_argument("--f0-engines", nargs="+", default=["pyin", "yin"], help="F0 engines to benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="timed calls per stage (best is kept)")
+    parser.add_argument("--time-floor", type=float, default=0.05,
+                        help="--compare: ignore slowdowns smaller than this (sec)")
+    parser.add_argument("--no-mem", action="store_true", help="skip the tracemalloc pass (halves run time)")
+    parser.add_argument("--save", default=None, help="write results JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", default=None, help="baseline JSON to check for regressions")
+    parser.add_argument("--low-mem-check", action="store_true",
+                        help="whole pipeline, default vs low_mem: peak memory + metric drift (first F0 engine)")
+    parser.add_argument("--drift-tol-pct", type=float, default=1.0, help="--low-mem-check relative tolerance (%%)")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.filterwarnings("ignore")
+    import pandas as pd
+    if args.low_mem_check:
+        n_bad = 0
+        low_mem_check(min(args.rates), 3.0, args.f0_engines[0])     # warm-up (imports, FFT plans)
+        for sr in args.rates:
+            for dur in args.durations:
+                r = low_mem_check(sr, dur, args.f0_engines[0], rel_tol_pct=args.drift_tol_pct)
+                print(f"=== sr={sr} dur={dur:g}s f0={r['f0_engine']}: peak {r['peak_mib']:.1f} -> "
+                      f"{r['peak_mib_low_mem']:.1f} MiB (x{r['peak_mib']/r['peak_mib_low_mem']:.2f} less), "
+                      f"time {r['sec']:.2f} -> {r['sec_low_mem']:.2f} s ===")
+                dr = pd.DataFrame(r["drift"])
+                with pd.option_context("display.width", 200, "display.float_format", "{:.5g}".format):
+                    print(dr.to_string(index=False))
+                n_bad += int((dr["status"] != "ok").sum())
+        print(f"{n_bad} metric(s) over tolerance")
+        raise SystemExit(1 if n_bad else 0)
+    rows = run_bench(args.durations, args.rates, args.f0_engines, mem=not args.no_mem, repeats=args.repeats)
+    df = pd.DataFrame(rows)
+    with pd.option_context("display.width", 200, "display.max_rows", None, "display.float_format", "{:.4g}".format):
+        print(df.drop(columns=["abs_err"]).to_string(index=False))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(json.loads(df.to_json(orient="records")), f, indent=1)
+        print("Saved:", args.save)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = [{k: (np.nan if v is None else v) for k, v in r.items()} for r in json.load(f)]
+        cmp = pd.DataFrame(compare(rows, baseline, time_floor=args.time_floor))
+        print("=== vs", args.compare, "===")
+        print(cmp.to_string(index=False))
+        n_bad = int((cmp["status"] != "ok").sum()) if len(cmp) else 0
+        print(f"{n_bad} regression(s)")
+        raise SystemExit(1 if n_bad else 0)
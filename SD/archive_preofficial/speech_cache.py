@@ -0,0 +1,164 @@
+# speech_cache.py
+# Content-addressed, per-stage on-disk feature cache for speech_pipeline
+# - Key = sha256(audio file bytes) + stage name + stage parameters (+ CACHE_VERSION)
+#   -> changing sr / VAD thresholds / F0 range / engine gives a new key (old entries age out)
+# - Entry = one .npz per (audio, stage, params): arrays stored natively, scalars as a JSON blob
+# - Size-bounded LRU: hits touch the file mtime; an in-memory {path: (size, atime)} index (one directory walk,
+#   then kept up to date by get / put) tracks the total. Over max_mb, one eviction pass re-scans the disk
+#   (other workers write too) and removes least-recently-used entries down to EVICT_TO of the cap,
+#   so puts at the cap do not each re-walk the cache
+# Re-scoring (sara4_autoscore etc.) on a cached corpus never decodes audio or re-runs DSP.
+
+import os, io, json, time, hashlib, tempfile
+from typing import Callable, Dict, Optional
+
+from speech_profile import StageProfiler, profiled
+
+import numpy as np
+
+CACHE_VERSION = 1          # bump when a stage's output definition changes
+DEFAULT_MAX_MB = 2048
+EVICT_TO = 0.9             # low-water mark after an eviction pass (fraction of max_mb)
+
+def audio_digest(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(chunk), b""):
+            h.update(b)
+    return h.hexdigest()
+
+def params_digest(stage: str, params: Dict) -> str:
+    blob = json.dumps(dict(stage=stage, v=CACHE_VERSION, **params), sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+# -------------------------
+# Codec: dict of arrays / JSON-able values <-> npz
+# -------------------------
+def encode_entry(value: Dict) -> bytes:
+    arrays = {k: v for k, v in value.items() if isinstance(v, np.ndarray)}
+    meta = {k: (v.item() if isinstance(v, np.generic) else v)
+            for k, v in value.items() if not isinstance(v, np.ndarray)}
+    buf = io.BytesIO()
+    np.savez(buf, __meta__=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+    return buf.getvalue()
+
+def decode_entry(path: str) -> Dict:
+    with np.load(path, allow_pickle=False) as z:
+        out = json.loads(bytes(z["__meta__"]).decode())
+        out.update({k: z[k] for k in z.files if k != "__meta__"})
+    return out
+
+# -------------------------
+# Cache
+# -------------------------
+class FeatureCache:
+    def __init__(self, root: str = ".speech_cache", max_mb: float = DEFAULT_MAX_MB):
+        self.root = root
+        self.max_bytes = int(max_mb*2**20)
+        os.makedirs(root, exist_ok=True)
+        self._index = None   # path -> (size, atime); None until the first size() / evict()
+        self._size = 0
+        self._digests = {}   # (path, size, mtime) -> sha256, avoids re-hashing within a run
+        self.hits = self.misses = 0
+
+    def audio_key(self, path: str) -> str:
+        st = os.stat(path)
+        k = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        if k not in self._digests:
+            self._digests[k] = audio_digest(path)
+        return self._digests[k]
+
+    def _path(self, key: str, stage: str, params: Dict) -> str:
+        return os.path.join(self.root, stage, key[:2], f"{key}_{params_digest(stage, params)}.npz")
+
+    def get(self, key: str, stage: str, params: Dict) -> Optional[Dict]:
+        p = self._path(key, stage, params)
+        try:
+            out = decode_entry(p)
+            os.utime(p)                    # LRU touch
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._index is not None and p in self._index:
+            self._index[p] = (self._index[p][0], time.time())
+        return out
+
+    def put(self, key: str, stage: str, params: Dict, value: Dict):
+        p = self._path(key, stage, params)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        data = encode_entry(value)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(p), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, p)                 # atomic: concurrent workers never see partial files
+        if self._index is not None:
+            old = self._index.get(p)
+            self._size += len(data) - (old[0] if old else 0)     # replace: the old file is gone
+            self._index[p] = (len(data), time.time())
+        self.evict()
+
+    def entries(self):
+        for d, _, files in os.walk(self.root):
+            for f in files:
+                if f.endswith(".npz"):
+                    p = os.path.join(d, f)
+                    try:
+                        st = os.stat(p)
+                    except FileNotFoundError:
+                        continue
+                    yield p, st.st_size, st.st_mtime
+
+    def _scan(self):
+        self._index = {p: (s, t) for p, s, t in self.entries()}
+        self._size = sum(s for s, _ in self._index.values())
+
+    def size(self) -> int:
+        if self._index is None:
+            self._scan()
+        return self._size
+
+    def evict(self):
+        if self.size() <= self.max_bytes:
+            return
+        self._scan()
+        target = int(EVICT_TO*self.max_bytes)
+        for p, (s, _) in sorted(self._index.items(), key=lambda e: e[1][1]):
+            if self._size <= target:
+                break
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+            del self._index[p]
+            self._size -= s
+
+# -------------------------
+# Stage runner
+# -------------------------
+class StageRunner:
+    # run(stage, params, compute) -> cached dict or compute(); cache=None just computes
+    # keep(value) -> False skips storing a result (e.g. transient failures)
+    # profiler: each stage is timed (cached=True when served from the cache)
+    def __init__(self, cache: Optional[FeatureCache], audio_path: str, base_params: Dict,
+                 profiler: Optional[StageProfiler] = None):
+        self.cache = cache
+        self.base = base_params
+        self.profiler = profiler
+        self.key = cache.audio_key(audio_path) if cache is not None else None
+
+    def __call__(self, stage: str, params: Dict, compute: Callable[[], Dict],
+                 keep: Optional[Callable[[Dict], bool]] = None) -> Dict:
+        with profiled(self.profiler, stage) as rec:
+            if self.cache is None:
+                return compute()
+            params = dict(self.base, **params)
+            hit = self.cache.get(self.key, stage, params)
+            if rec is not None:
+                rec["cached"] = hit is not None
+            if hit is not None:
+                return hit
+            value = compute()
+            if keep is None or keep(value):
+                self.cache.put(self.key, stage, params, value)
+            return value
@@ -0,0 +1,200 @@
+# speech_f0.py
+# Pluggable F0 engines for speech_pipeline.f0_features
+# - "pyin": librosa.pyin over the whole signal (reference, slow), on a PYIN_SR view
+# - "yin" : vectorized YIN on a decimated signal, voiced (VAD) frames only
+# Both return an F0 track (Hz, NaN = unvoiced) on the same time grid, whatever the input rate:
+#   frame k is centered at t = k*F0_HOP/F0_REF_SR sec (F0_FPS frames/sec, 2048/44100 s window),
+#   i.e. the original hop-256 @ 44.1 kHz grid; this is the f0_hz contract consumed by tremor_features.
+# - compare_engines(): accuracy-vs-speed comparison against pyin (CLI below)
+
+import os, sys, time, argparse
+from math import gcd
+from typing import List, Tuple, Dict, Optional
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "common"))     # shared interval arrays (cmq_intervals.py)
+from cmq_intervals import as_intervals, contains
+
+F0_REF_SR = 44100     # the f0_hz grid is defined at this rate ...
+F0_HOP = 256          # ... hop (samples @ F0_REF_SR)
+F0_FRAME = 2048       # ... analysis window (samples @ F0_REF_SR)
+F0_FPS = F0_REF_SR/F0_HOP
+YIN_FS = 8000         # working rate for the fast engine (fmax 500 Hz -> plenty of headroom)
+PYIN_SR = 11025       # working rate for pyin (= F0_REF_SR/4 -> hop 64, window 512)
+YIN_BLOCK = 2048      # frames per vectorized block (bounds the FFT scratch memory)
+
+# -------------------------
+# Helpers
+# -------------------------
+def n_f0_frames(n_samples: int, sr: int) -> int:
+    # librosa center=True framing on the F0_REF_SR grid
+    return 1 + (n_samples*F0_REF_SR//sr)//F0_HOP
+
+def f0_frame_centers(n_frames: int, sr: int) -> np.ndarray:
+    # frame centers in samples @ sr
+    return np.round(np.arange(n_frames)*(F0_HOP*sr/F0_REF_SR)).astype(np.int64)
+
+def resample_to(y: np.ndarray, sr: int, target: int) -> Tuple[np.ndarray, int]:
+    # polyphase rate view for a stage
+    if sr == target:
+        return y, sr
+    from scipy.signal import resample_poly
+    g = gcd(int(sr), int(target))
+    return resample_poly(y, target//g, sr//g).astype(y.dtype, copy=False), target
+
+def decimate_to(y: np.ndarray, sr: int, target: int) -> Tuple[np.ndarray, int]:
+    # same, but never upsamples
+    return resample_to(y, sr, target) if sr > target else (y, sr)
+
+# -------------------------
+# Engines
+# -------------------------
+def pyin_track(y: np.ndarray, sr: int, fmin=50.0, fmax=500.0,
+               segs: Optional[List[Tuple[int,int]]] = None) -> np.ndarray:
+    # reference: full signal, segs ignored; PYIN_SR keeps window/hop exact on the F0 grid
+    import librosa
+    k = F0_REF_SR//PYIN_SR
+    x, fs = resample_to(y, sr, PYIN_SR)
+    f0, _, _ = librosa.pyin(x, fmin=fmin, fmax=fmax, frame_length=F0_FRAME//k,
+                            hop_length=F0_HOP//k, sr=fs)
+    n = n_f0_frames(len(y), sr)
+    return np.pad(f0[:n], (0, max(0, n - len(f0))), constant_values=np.nan)
+
+def yin_track(y: np.ndarray, sr: int, fmin=50.0, fmax=500.0,
+              segs: Optional[List[Tuple[int,int]]] = None,
+              threshold=0.15, work_sr: int = YIN_FS) -> np.ndarray:
+    n_frames = n_f0_frames(len(y), sr)
+    f0 = np.full(n_frames, np.nan)
+    centers = f0_frame_centers(n_frames, sr)
+    sel = np.ones(n_frames, dtype=bool) if segs is None else contains(as_intervals(segs), centers) >= 0
+    if not sel.any():
+        return f0
+
+    x, fs = decimate_to(np.asarray(y, dtype=np.float32), sr, work_sr)
+    W = int(round(F0_FRAME*fs/F0_REF_SR))          # integration window
+    min_lag = max(2, int(fs/fmax))
+    max_lag = min(int(np.ceil(fs/fmin)), W - 1)
+    N = W + max_lag
+    xp = np.pad(x, (W//2, N))
+    c = np.round(np.flatnonzero(sel)*(F0_HOP*fs/F0_REF_SR)).astype(np.int64)
+
+    # frames starting at center - W/2 (decimated samples); voiced frames only, in blocks
+    est = np.empty(len(c))
+    for i in range(0, len(c), YIN_BLOCK):
+        frames = xp[c[i:i+YIN_BLOCK, None] + np.arange(N)[None, :]]
+        est[i:i+YIN_BLOCK] = yin_frames(frames, fs, W, min_lag, max_lag, threshold)
+    est[(est < fmin) | (est > fmax)] = np.nan
+    f0[sel] = est
+    return f0
+
+def yin_frames(frames: np.ndarray, fs: int, W: int, min_lag: int, max_lag: int,
+                threshold: float) -> np.ndarray:
+    # difference function via FFT: d(tau) = E0 + E_tau - 2 r(tau)
+    N = frames.shape[1]
+    nfft = 1 << int(np.ceil(np.log2(N + W)))
+    Fx = np.fft.rfft(frames, nfft, axis=1)
+    Fw = np.fft.rfft(frames[:, :W], nfft, axis=1)
+    r = np.fft.irfft(np.conj(Fw)*Fx, nfft, axis=1)[:, :max_lag+1]
+    sq = np.cumsum(np.pad(frames.astype(np.float64)**2, ((0,0),(1,0))), axis=1)
+    E0 = sq[:, W][:, None]
+    Et = sq[:, W:W+max_lag+1] - sq[:, :max_lag+1]
+    d = np.maximum(E0 + Et - 2.0*r, 0.0)
+
+    # cumulative mean normalized difference
+    cmnd = np.ones_like(d)
+    cs = np.cumsum(d[:, 1:], axis=1)
+    cmnd[:, 1:] = d[:, 1:]*np.arange(1, max_lag+1)/np.maximum(cs, 1e-12)
+
+    # first dip below threshold, then walk down to its local minimum
+    lags = np.arange(max_lag+1)
+    below = cmnd < threshold
+    below[:, :min_lag] = False
+    voiced = below.any(axis=1)
+    first = np.argmax(below, axis=1)
+    rising = np.zeros_like(below)
+    rising[:, :-1] = cmnd[:, 1:] >= cmnd[:, :-1]
+    rising[:, -1] = True
+    rising &= lags[None, :] >= first[:, None]
+    tau = np.argmax(rising, axis=1)
+
+    # parabolic interpolation around tau
+    t = np.clip(tau, 1, max_lag-1)
+    rows = np.arange(len(t))
+    a, b, c = cmnd[rows, t-1], cmnd[rows, t], cmnd[rows, t+1]
+    den = a - 2*b + c
+    safe = np.abs(den) > 1e-12
+    shift = np.zeros_like(den)
+    shift[safe] = 0.5*(a[safe] - c[safe])/den[safe]
+    tau_f = t + np.clip(shift, -1, 1)
+    return np.where(voiced, fs/np.maximum(tau_f, 1e-9), np.nan)
+
+F0_ENGINES = dict(pyin=pyin_track, yin=yin_track)
+
+def estimate_f0(y: np.ndarray, sr: int, engine: str = "pyin", fmin=50.0, fmax=500.0,
+                segs: Optional[List[Tuple[int,int]]] = None) -> np.ndarray:
+    if engine not in F0_ENGINES:
+        raise ValueError(f"unknown F0 engine {engine!r} (choose from {sorted(F0_ENGINES)})")
+    return F0_ENGINES[engine](y, sr, fmin=fmin, fmax=fmax, segs=segs)
+
+# -------------------------
+# Accuracy vs speed
+# -------------------------
+def synth_vowel(sr: int, dur: float, f0=140.0, trem_hz=5.0, trem_depth=0.04,
+                on_sec=0.8, off_sec=0.3, seed=0) -> np.ndarray:
+    # harmonic vowel with tremor, gated into speech / silence runs
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr*dur))/sr
+    f = f0*(1.0 + trem_depth*np.sin(2*np.pi*trem_hz*t))
+    ph = 2*np.pi*np.cumsum(f)/sr
+    y = sum(np.sin(h*ph)/h for h in range(1, 10))
+    gate = (t % (on_sec+off_sec)) < on_sec
+    y = 0.2*y*gate/np.max(np.abs(y)) + 0.002*rng.standard_normal(len(t))
+    return y.astype(np.float32)
+
+def compare_engines(signals: Dict[str, Tuple[np.ndarray, int]], engines=("pyin", "yin"),
+                    reference="pyin") -> List[Dict]:
+    from speech_pipeline import vad_segments
+    rows = []
+    for name, (y, sr) in signals.items():
+        segs = vad_segments(y, sr)
+        tracks, times = {}, {}
+        for eng in engines:
+            t0 = time.perf_counter()
+            tracks[eng] = estimate_f0(y, sr, eng, segs=segs)
+            times[eng] = time.perf_counter() - t0
+        ref = tracks[reference]
+        for eng in engines:
+            f = tracks[eng]
+            both = np.isfinite(ref) & np.isfinite(f)
+            cents = 1200*np.abs(np.log2(f[both]/ref[both])) if both.any() else np.array([])
+            vref, vest = np.isfinite(ref), np.isfinite(f)
+            rows.append(dict(
+                signal=name, engine=eng, sec=round(times[eng], 3),
+                speedup=round(times[reference]/max(times[eng], 1e-9), 1),
+                median_err_cents=round(float(np.median(cents)), 2) if len(cents) else np.nan,
+                gross_err_pct=round(100*float(np.mean(cents > 50)), 2) if len(cents) else np.nan,
+                voicing_agree_pct=round(100*float(np.mean(vref == vest)), 2),
+            ))
+    return rows
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="F0 engine accuracy-vs-speed comparison (reference: pyin)")
+    parser.add_argument("audio", nargs="*", help="audio files (default: synthetic vowels)")
+    parser.add_argument("--sr", type=int, default=None, help="target sample rate (default: native)")
+    parser.add_argument("--dur", type=float, default=10.0, help="synthetic signal length (sec)")
+    args = parser.parse_args()
+
+    if args.audio:
+        from speech_pipeline import load_audio
+        signals = {p: load_audio(p, sr=args.sr) for p in args.audio}
+    else:
+        sr = args.sr or 44100
+        signals = {f"vowel_{f0:.0f}Hz": (synth_vowel(sr, args.dur, f0=f0), sr)
+                   for f0 in (110.0, 220.0)}
+    import pandas as pd
+    print(pd.DataFrame(compare_engines(signals)).to_string(index=False))
@@ -0,0 +1,353 @@
+# speech_live.py
+# Real-time recorder with live incremental speech metrics (replaces the blocking sd.rec + sd.wait of draft/ST1.py)
+# - Audio callback only copies each block into a lock-protected ring buffer (no DSP in the callback)
+# - An analysis thread drains the ring every update_sec and feeds speech_stream.StreamAnalyzer
+#   (same accumulators as --stream), so the final summary is ready at stop() with no second pass and equals
+#   stream_pipeline whatever update_sec is (block-invariant accumulators)
+# - Live metrics while the patient speaks: VAD / pause ratio, running F0 mean/SD (semitones), speech rate
+#   (causal estimates: running min/max normalisation instead of whole-recording; final summary is exact);
+#   running counts and a VAD window trimmed to what pending F0 frames / onset peaks still need (O(new frames))
+# - FileInputStream: file-backed fake input device with the sounddevice.InputStream callback API
+#   (test without a microphone: --fake-input recording.wav [--speed 4]); a file can wait, so the fake input
+#   blocks while the ring is full instead of overrunning it. A microphone cannot: overruns > 0 mark the
+#   result invalid (mode.valid = False, CLI exit status 2)
+
+import sys, time, argparse, threading
+from typing import Dict, Optional, Callable
+
+import numpy as np
+import soundfile as sf
+
+from speech_f0 import F0_REF_SR, F0_HOP
+from speech_stream import StreamAnalyzer
+from speech_pipeline import hz_to_semitone, save_outputs, SYLLABLE_MIN_GAP_SEC
+
+# --- Optional deps (graceful fallback)
+SOUNDDEVICE_OK = True
+try:
+    import sounddevice as sd
+except Exception:
+    SOUNDDEVICE_OK = False
+
+# -------------------------
+# Ring buffer
+# -------------------------
+class RingBuffer:
+    # single producer (audio callback) / single consumer (analysis thread); fixed float32 storage
+    def __init__(self, capacity: int):
+        self.buf = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.w = self.r = 0            # absolute write / read counters
+        self.overruns = 0              # samples lost because the consumer fell behind
+        self.lock = threading.Lock()
+        self.drained = threading.Condition(self.lock)
+
+    def write(self, x: np.ndarray):
+        n = len(x)
+        with self.lock:
+            if n > self.capacity:
+                x = x[-self.capacity:]
+                n = self.capacity
+            i = self.w % self.capacity
+            k = min(n, self.capacity - i)
+            self.buf[i:i+k] = x[:k]
+            self.buf[:n-k] = x[k:]
+            self.w += n
+            if self.w - self.r > self.capacity:
+                self.overruns += self.w - self.r - self.capacity
+                self.r = self.w - self.capacity
+
+    def read(self) -> np.ndarray:
+        with self.lock:
+            n = self.w - self.r
+            i = self.r % self.capacity
+            k = min(n, self.capacity - i)
+            out = np.concatenate([self.buf[i:i+k], self.buf[:n-k]])
+            self.r = self.w
+            self.drained.notify_all()
+        return out
+
+    def wait_room(self, n: int, stop: threading.Event):
+        # producer side for inputs that can wait (files): block until n samples fit
+        n = min(n, self.capacity)
+        with self.lock:
+            while self.capacity - (self.w - self.r) < n and not stop.is_set():
+                self.drained.wait(0.1)
+
+# -------------------------
+# Fake input device
+# -------------------------
+class FileInputStream:
+    # sounddevice.InputStream look-alike: callback(indata, frames, time, status) per block, real-time paced
+    def __init__(self, path: str, blocksize: int = 1024, callback: Optional[Callable] = None,
+                 speed: float = 1.0, finished_callback: Optional[Callable] = None,
+                 wait_room: Optional[Callable[[int, threading.Event], None]] = None):
+        self.path, self.blocksize, self.callback = path, blocksize, callback
+        self.speed, self.finished_callback, self.wait_room = speed, finished_callback, wait_room
+        self.samplerate = int(sf.info(path).samplerate)
+        self.channels = 1
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        t0 = time.perf_counter()
+        n = 0
+        for blk in sf.blocks(self.path, blocksize=self.blocksize, dtype="float32", always_2d=True):
+            if self.wait_room is not None:
+                self.wait_room(len(blk), self._stop)
+            if self._stop.is_set():
+                break
+            self.callback(blk.mean(axis=1, keepdims=True), len(blk), None, None)
+            n += len(blk)
+            if self.speed > 0:
+                lag = t0 + n/(self.samplerate*self.speed) - time.perf_counter()
+                if lag > 0:
+                    time.sleep(lag)
+        if self.finished_callback is not None:
+            self.finished_callback()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+# -------------------------
+# Live metrics
+# -------------------------
+class LiveMetrics:
+    # causal, incremental view over the StreamAnalyzer accumulators (only new frames are touched)
+    def __init__(self, an: StreamAnalyzer, rms_th=0.02, zcr_th=0.1, flux_mul=0.5, min_syl_sec=SYLLABLE_MIN_GAP_SEC):
+        self.an = an
+        self.rms_th, self.zcr_th, self.flux_mul = rms_th, zcr_th, flux_mul
+        self.hop = an.vad.hop
+        self.shift = 1 + an.vad.n_fft//(2*self.hop)     # onset raw index j -> VAD frame j+shift-1
+        self.dist = max(1, int(round(min_syl_sec*an.sr/self.hop)))
+        self.lo = np.full(3, np.inf); self.hi = np.full(3, -np.inf)
+        self.voiced = np.zeros(0, dtype=bool)           # VAD frames v0.. still needed by F0 / onset peaks
+        self.v0 = self.n_frames = self.n_voiced = 0     # running counts: per-update cost ~ new frames only
+        self.voiced_now = False
+        self.n_vad = self.n_onset = self.n_f0 = 0       # list items consumed so far
+        self.k_f0 = 0                                   # F0 frames consumed so far
+        self.onset_tail = np.zeros(0, dtype=np.float32)
+        self.onset_base = 0
+        self.pending_peaks = np.zeros(0, dtype=np.int64)
+        self.syllables = 0
+        self.f0_n, self.f0_mean, self.f0_m2 = 0, 0.0, 0.0
+        self.f0_min, self.f0_max = np.inf, -np.inf
+        self.segments = 0
+
+    def _update_vad(self):
+        vad = self.an.vad
+        new = [np.concatenate(v[self.n_vad:]) if len(v) > self.n_vad else np.zeros(0, np.float32)
+               for v in (vad.rms, vad.zcr, vad.flux)]
+        self.n_vad = len(vad.rms)
+        if not len(new[0]):
+            return
+        F = np.vstack(new)
+        self.lo = np.minimum(self.lo, F.min(axis=1)); self.hi = np.maximum(self.hi, F.max(axis=1))
+        rms_n, zcr_n, flux_n = (F - self.lo[:, None])/(self.hi - self.lo + 1e-9)[:, None]
+        v = ((rms_n > self.rms_th) & (zcr_n < 1.0 - self.zcr_th)) | (flux_n > self.flux_mul*rms_n)
+        self.segments += int(np.sum(np.diff(np.concatenate([[self.voiced_now], v]).astype(np.int8)) == 1))
+        self.voiced = np.concatenate([self.voiced, v])
+        self.n_frames += len(v); self.n_voiced += int(v.sum()); self.voiced_now = bool(v[-1])
+
+    def _update_rate(self):
+        from scipy.signal import find_peaks
+        vad = self.an.vad
+        if len(vad.onset) <= self.n_onset:
+            return
+        new = np.concatenate(vad.onset[self.n_onset:])
+        self.n_onset = len(vad.onset)
+        ext = np.concatenate([self.onset_tail, new])
+        pk, _ = find_peaks(ext, distance=self.dist)
+        pk = pk[pk >= len(self.onset_tail) - 1]
+        frames = np.concatenate([self.pending_peaks, self.onset_base + pk + self.shift - 1])
+        ready = frames < self.n_frames
+        self.syllables += int(np.sum(self.voiced[frames[ready] - self.v0]))
+        self.pending_peaks = frames[~ready]
+        self.onset_tail = ext[-self.dist:]
+        self.onset_base += len(ext) - len(self.onset_tail)
+
+    def _update_f0(self):
+        acc = self.an.f0acc
+        if len(acc.f0) <= self.n_f0:
+            return
+        f0 = np.concatenate(acc.f0[self.n_f0:])
+        self.n_f0 = len(acc.f0)
+        k = self.k_f0 + np.arange(len(f0))
+        self.k_f0 += len(f0)
+        fr = (k*(F0_HOP*self.an.sr/F0_REF_SR)//self.hop).astype(np.int64)
+        ok = np.isfinite(f0) & (fr < self.n_frames)
+        ok[ok] = self.voiced[fr[ok] - self.v0]
+        st = hz_to_semitone(f0[ok].astype(np.float64))
+        if not len(st):
+            return
+        # running mean / variance (Welford, merged per block)
+        n_b, mean_b = len(st), float(st.mean())
+        n = self.f0_n + n_b
+        d = mean_b - self.f0_mean
+        self.f0_m2 += float(np.sum((st - mean_b)**2)) + d*d*self.f0_n*n_b/n
+        self.f0_mean += d*n_b/n
+        self.f0_n = n
+        self.f0_min, self.f0_max = min(self.f0_min, st.min()), max(self.f0_max, st.max())
+
+    def _trim(self):
+        # drop VAD flags below the first frame a later F0 frame or onset peak can look up
+        need = min(int(self.k_f0*(F0_HOP*self.an.sr/F0_REF_SR)//self.hop), self.onset_base + self.shift - 2,
+                   int(self.pending_peaks.min()) if len(self.pending_peaks) else self.n_frames, self.n_frames)
+        cut = need - self.v0
+        if cut > 0:
+            self.voiced = self.voiced[cut:]
+            self.v0 += cut
+
+    def update(self) -> Dict:
+        self._update_vad(); self._update_rate(); self._update_f0(); self._trim()
+        sr = self.an.sr
+        voiced_sec = self.n_voiced*self.hop/sr
+        total_sec = self.an.n/sr
+        return dict(
+            t_sec=round(total_sec, 2),
+            voiced_now=self.voiced_now,
+            pause_ratio=(max(0.0, total_sec - voiced_sec)/total_sec if total_sec > 0 else 0.0),
+            segments=self.segments,
+            f0_mean_st=(self.f0_mean if self.f0_n else float("nan")),
+            f0_sd_st=(float(np.sqrt(self.f0_m2/self.f0_n)) if self.f0_n else float("nan")),
+            f0_range_st=(self.f0_max - self.f0_min if self.f0_n else float("nan")),
+            syllables=self.syllables,
+            speech_rate_sps=(self.syllables/voiced_sec if voiced_sec > 0 else 0.0),
+        )
+
+# -------------------------
+# Recorder
+# -------------------------
+class LiveRecorder:
+    # start() -> live metrics via on_update(dict) every update_sec -> stop() returns the final results
+    def __init__(self, sr: int = 16000, device=None, fake_input: Optional[str] = None, speed: float = 1.0,
+                 block_sec: float = 0.05, ring_sec: float = 10.0, update_sec: float = 0.5,
+                 out_wav: Optional[str] = None, on_update: Optional[Callable[[Dict], None]] = None):
+        if fake_input:
+            self.sr = int(sf.info(fake_input).samplerate)
+        elif not SOUNDDEVICE_OK:
+            raise RuntimeError("sounddevice not available (use fake_input=...)")
+        else:
+            self.sr = sr
+        self.fake_input, self.device, self.speed = fake_input, device, speed
+        self.blocksize = int(block_sec*self.sr)
+        self.ring = RingBuffer(int(ring_sec*self.sr))
+        self.update_sec, self.out_wav, self.on_update = update_sec, out_wav, on_update
+        self.an = StreamAnalyzer(self.sr)
+        self.live = LiveMetrics(self.an)
+        self.status_flags = 0
+        self.ended = threading.Event()          # fake input reached end of file
+        self._stop = threading.Event()
+        self._stream = self._worker = self._wav = None
+
+    def _callback(self, indata, frames, time_info, status):
+        # audio thread: copy only
+        if status:
+            self.status_flags += 1
+        self.ring.write(indata[:, 0])
+
+    def _drain(self):
+        x = self.ring.read()
+        if len(x):
+            if self._wav is not None:
+                self._wav.write(x)
+            self.an.push(x)
+
+    def _run(self):
+        while not self._stop.wait(self.update_sec):
+            self._drain()
+            m = self.live.update()
+            if self.on_update is not None:
+                self.on_update(m)
+
+    def start(self):
+        if self.out_wav:
+            self._wav = sf.SoundFile(self.out_wav, "w", samplerate=self.sr, channels=1, subtype="PCM_16")
+        if self.fake_input:
+            self._stream = FileInputStream(self.fake_input, self.blocksize, self._callback,
+                                           speed=self.speed, finished_callback=self.ended.set,
+                                           wait_room=self.ring.wait_room)
+        else:
+            self._stream = sd.InputStream(samplerate=self.sr, channels=1, dtype="float32", device=self.device,
+                                          blocksize=self.blocksize, callback=self._callback,
+                                          finished_callback=self.ended.set)
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+        self._stream.start()
+
+    def stop(self) -> Dict:
+        self._stream.stop(); self._stream.close()
+        self._stop.set(); self._worker.join()
+        self._drain()
+        live = self.live.update()
+        if self._wav is not None:
+            self._wav.close()
+        out = self.an.finish()
+        out["live"] = live
+        out["mode"] = dict(live=True, sr=self.sr, fake_input=self.fake_input, valid=self.ring.overruns == 0,
+                           overrun_samples=self.ring.overruns, status_flags=self.status_flags)
+        return out
+
+def print_live(m: Dict):
+    print(f"\r[{m['t_sec']:6.1f}s] {'SPEECH' if m['voiced_now'] else 'pause '} "
+          f"pause={m['pause_ratio']:.2f} F0sd={m['f0_sd_st']:.2f}st "
+          f"rate={m['speech_rate_sps']:.2f}/s syl={m['syllables']}", end="", flush=True)
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speech Test live recorder (incremental metrics)")
+    parser.add_argument("--seconds", type=float, default=None, help="stop after N sec (default: Enter / end of file)")
+    parser.add_argument("--sr", type=int, default=16000, help="microphone sampling rate")
+    parser.add_argument("--device", default=None, help="sounddevice input device")
+    parser.add_argument("--fake-input", default=None, help="play this file as the input device (no microphone)")
+    parser.add_argument("--speed", type=float, default=1.0, help="fake input pacing (2 = twice real time, 0 = no pacing)")
+    parser.add_argument("--update-sec", type=float, default=0.5, help="live metric refresh interval")
+    parser.add_argument("--out", default="output.wav", help="recorded audio (written while recording)")
+    parser.add_argument("--no-save", action="store_true", help="skip speech_summary.csv / speech_metrics.json")
+    args = parser.parse_args()
+
+    rec = LiveRecorder(sr=args.sr, device=args.device, fake_input=args.fake_input, speed=args.speed,
+                       update_sec=args.update_sec, out_wav=args.out, on_update=print_live)
+    print("Recording started..." + ("" if args.seconds or args.fake_input else " (Enter to stop)"))
+    rec.start()
+    try:
+        if args.seconds:
+            rec.ended.wait(args.seconds)
+        elif args.fake_input:
+            rec.ended.wait()
+        else:
+            input()
+    except KeyboardInterrupt:
+        pass
+    t0 = time.perf_counter()
+    result = rec.stop()
+    print(f"\nRecording finished! ({result['live']['t_sec']:.1f}s, final summary in "
+          f"{(time.perf_counter()-t0)*1000:.0f} ms, overruns {result['mode']['overrun_samples']})")
+    if not result["mode"]["valid"]:
+        print(f"WARNING: {result['mode']['overrun_samples']} samples dropped (analysis fell behind the input); "
+              "summary is NOT valid")
+    print("=== SUMMARY ===")
+    for k,v in result["summary"].items():
+        print(f"{k}: {v}")
+    print("SARA4(auto):", result["sara4_auto"])
+    if not args.no_save:
+        save_outputs(result["summary"], result)
+        print("Saved:", args.out + ", speech_summary.csv, speech_metrics.json")
+    if not result["mode"]["valid"]:
+        sys.exit(2)
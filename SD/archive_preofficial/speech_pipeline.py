@@ -4,92 +4,224 @@
 # - VAD & pauses
 # - F0 (pyin) -> SD/range/slope
 # - Jitter/Shimmer/HNR (Praat via parselmouth; optional)
-# - Tremor (3–7 Hz)
+# - Tremor (3–7 Hz) + time-resolved tremor map (speech_tremor.py)
 # - Syllable rate & DDK
 # - Auto-map to SARA 4 (0–6)
 # - Export CSV/JSON
+# - low_mem=True: float32 / complex64 end to end (SOS filters, blocked spectral features, no full-length
+#   float64 copies) for packing more workers per node; drift vs the float64 path in speech_bench --low-mem-check
 
-import os, json, math, argparse
+import os, sys, json, math, argparse
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from functools import cached_property
+from typing import List, Tuple, Dict, Optional
 
 import numpy as np
-import pandas as pd
-import soundfile as sf
+# librosa / scipy.signal / pandas are imported inside the functions that use them:
+# --help and fully cached runs never pay their import time (see speech_worker.py)
 
-import librosa
-from scipy.signal import butter, filtfilt, hilbert, find_peaks
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "common"))     # shared interval arrays (cmq_intervals.py)
+from cmq_intervals import as_intervals, to_pairs, runs, merge_gaps, min_length, complement, contains, lengths
 
-# --- Optional deps (graceful fallback)
-PARSELMOUTH_OK = True
-try:
-    import parselmouth  # Praat bridge
-except Exception:
-    PARSELMOUTH_OK = False
+from speech_f0 import estimate_f0, decimate_to, F0_ENGINES, F0_FPS
+from speech_cache import FeatureCache, StageRunner
+from speech_profile import StageProfiler, profiled, profile_table
+
+from speech_praat import PARSELMOUTH_OK, PRAAT_MODES, PraatPool, get_pool, voiced_perturbation
+from speech_score import sara4_batch, SARA4_COLS
+from speech_tremor import tremor_map, tremor_map_summary, amplitude_contour, TREMOR_MAP_PARAMS
+
+# Stage working rates: stages only see a decimated (polyphase) view of the native signal
+DDK_SR = 4000         # DDK band is 80–1000 Hz
+DDK_PADLEN = 27       # (b)filtfilt default edge padding of the order-4 DDK band-pass (3*9 taps)
+F0_RANGE = dict(fmin=50, fmax=500)
+SYLLABLE_MIN_GAP_SEC = 0.06   # onset peaks >= 60 ms apart at any sr (the original distance=3 frames at librosa's
+                              # hop 512 was 96 ms @ 16 kHz / 35 ms @ 44.1 kHz -> speech rates differ from it)
 
 # -------------------------
 # I/O
 # -------------------------
-def load_audio(path: str, sr: int = 44100):
+def import_dsp():
+    # the heavy modules the stages import lazily; run_pipeline(profiler=...) times this on its own,
+    # untraced, so a cold process does not charge the import to "load" / the first stages
+    import librosa, scipy.signal, scipy.fft, scipy.ndimage
+    librosa.load, librosa.filters.mel, librosa.onset.onset_strength      # librosa submodules load lazily
+
+def load_audio(path: str, sr: Optional[int] = None):
+    # sr=None keeps the native rate (browser / ST1 recordings are 16 kHz)
+    import librosa
     y, fs = librosa.load(path, sr=sr, mono=True)
-    y = np.clip(y, -1.0, 1.0)
-    return y, sr
+    np.clip(y, -1.0, 1.0, out=y)
+    return y, int(fs)
 
-def save_outputs(summary_dict: dict, all_metrics: dict):
-    pd.DataFrame([summary_dict]).to_csv("speech_summary.csv", index=False)
-    with open("speech_metrics.json", "w", encoding="utf-8") as f:
-        json.dump(all_metrics, f, ensure_ascii=False, indent=2)
+def to_jsonable(obj):
+    # numpy arrays / scalars -> plain python (json.dump can't handle them)
+    if isinstance(obj, dict):
+        return {k: to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+def save_outputs(summary_dict: dict, all_metrics: dict, out_dir: str = "."):
+    import pandas as pd
+    pd.DataFrame([summary_dict]).to_csv(os.path.join(out_dir, "speech_summary.csv"), index=False)
+    with open(os.path.join(out_dir, "speech_metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(to_jsonable(all_metrics), f, ensure_ascii=False, indent=2)
+
+# -------------------------
+# Shared analysis context (frame + FFT once per recording)
+# -------------------------
+class AnalysisContext:
+    # Frames the signal and computes the power spectrogram once; everything else
+    # (RMS, ZCR, flux, mel, onset envelope) is derived lazily from that, on one hop grid.
+    # low_mem: RMS / ZCR / flux / mel in one pass over blocks of frames (float32), the full
+    # spectrogram is never held; S is still available on request.
+    def __init__(self, y: np.ndarray, sr: int, frame_ms=30, hop_ms=10, n_mels=64,
+                 low_mem: bool = False, block: int = 1024):
+        self.y, self.sr = y, sr
+        self.low_mem, self.block = low_mem, block
+        self.n_fft = int(sr*frame_ms/1000)
+        self.hop = int(sr*hop_ms/1000)
+        from scipy.fft import next_fast_len
+        self.n_fft_pad = next_fast_len(self.n_fft, real=True)   # zero-padded FFT size
+        self.n_mels = n_mels
+
+    @property
+    def frame_rate(self) -> float:
+        return self.sr/self.hop
+
+    @cached_property
+    def frames(self) -> np.ndarray:
+        # centered frames (same grid as librosa.stft(center=True)); strided view, no copy
+        import librosa
+        yp = np.pad(self.y, self.n_fft//2)
+        return librosa.util.frame(yp, frame_length=self.n_fft, hop_length=self.hop)
+
+    @property
+    def window(self) -> np.ndarray:
+        from scipy.signal import get_window
+        return get_window("hann", self.n_fft, fftbins=True).astype(self.y.dtype)
+
+    @cached_property
+    def S(self) -> np.ndarray:
+        return np.abs(np.fft.rfft(self.frames*self.window[:, None], n=self.n_fft_pad, axis=0))**2
+
+    def mel_basis(self) -> np.ndarray:
+        import librosa
+        return librosa.filters.mel(sr=self.sr, n_fft=self.n_fft_pad, n_mels=self.n_mels)
+
+    @cached_property
+    def blocked(self) -> Dict[str, np.ndarray]:
+        # low_mem pass: per block of frames -> rms, zcr, flux (carrying the last column), mel
+        from scipy.fft import rfft
+        frames, win, fb = self.frames, self.window[:, None], self.mel_basis()
+        n = frames.shape[1]
+        out = dict(rms=np.empty(n, self.y.dtype), zcr=np.empty(n), flux=np.zeros(n, self.y.dtype),
+                   mel=np.empty((self.n_mels, n), self.y.dtype))
+        prev = None
+        for a in range(0, n, self.block):
+            F = frames[:, a:a + self.block]
+            b = a + F.shape[1]
+            out["rms"][a:b] = np.sqrt(np.mean(np.square(F), axis=0))
+            neg = np.signbit(F)
+            out["zcr"][a:b] = np.mean(neg[1:] != neg[:-1], axis=0)
+            X = rfft(F*win, n=self.n_fft_pad, axis=0)             # complex64 for float32 frames
+            S = np.square(X.real) + np.square(X.imag)
+            del X
+            d = np.diff(S, axis=1) if prev is None else np.diff(S, axis=1, prepend=prev)
+            out["flux"][b - d.shape[1]:b] = np.maximum(d, 0).sum(axis=0)
+            out["mel"][:, a:b] = fb @ S
+            prev = S[:, -1:]
+        self.__dict__.pop("frames", None)                         # drops the padded copy of y
+        return out
+
+    @cached_property
+    def rms(self) -> np.ndarray:
+        if self.low_mem:
+            return self.blocked["rms"]
+        return np.sqrt(np.mean(self.frames**2, axis=0))
+
+    @cached_property
+    def zcr(self) -> np.ndarray:
+        if self.low_mem:
+            return self.blocked["zcr"]
+        neg = np.signbit(self.frames)
+        return np.mean(neg[1:] != neg[:-1], axis=0)
+
+    @cached_property
+    def flux(self) -> np.ndarray:
+        if self.low_mem:
+            return self.blocked["flux"]
+        flux = np.maximum(np.diff(self.S, axis=1), 0).sum(axis=0)
+        return np.hstack([[0], flux])
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        if self.low_mem:
+            return self.blocked["mel"]
+        return self.mel_basis() @ self.S
+
+    @cached_property
+    def onset_env(self) -> np.ndarray:
+        import librosa
+        return librosa.onset.onset_strength(S=librosa.power_to_db(self.mel), sr=self.sr,
+                                            n_fft=self.n_fft, hop_length=self.hop)
+
+def get_context(y: np.ndarray, sr: int, ctx: Optional[AnalysisContext] = None, **kw) -> AnalysisContext:
+    return ctx if ctx is not None else AnalysisContext(y, sr, **kw)
 
 # -------------------------
 # VAD & Pauses
 # -------------------------
-def stft_feats(y, sr, frame_ms=30, hop_ms=10):
-    n_fft = int(sr*frame_ms/1000)
-    hop = int(sr*hop_ms/1000)
-    S = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop))**2
-    rms = librosa.feature.rms(S=S).flatten()
-    zcr = librosa.feature.zero_crossing_rate(y, frame_length=n_fft, hop_length=hop).flatten()
-    flux = np.diff(S, axis=1); flux = np.maximum(flux, 0).sum(axis=0)
-    flux = np.hstack([[0], flux])
-    return S, rms, zcr, flux, hop
+def stft_feats(y, sr, frame_ms=30, hop_ms=10, ctx: Optional[AnalysisContext] = None):
+    ctx = get_context(y, sr, ctx, frame_ms=frame_ms, hop_ms=hop_ms)
+    return ctx.S, ctx.rms, ctx.zcr, ctx.flux, ctx.hop
 
 def vad_segments(y: np.ndarray, sr: int, frame_ms=30, hop_ms=10,
-                 rms_th=0.02, zcr_th=0.1, flux_mul=0.5) -> List[Tuple[int,int]]:
-    S, rms, zcr, flux, hop = stft_feats(y, sr, frame_ms, hop_ms)
+                 rms_th=0.02, zcr_th=0.1, flux_mul=0.5,
+                 ctx: Optional[AnalysisContext] = None, low_mem: bool = False,
+                 merge_gap_ms: float = 0, min_speech_ms: float = 0) -> List[Tuple[int,int]]:
+    # merge_gap_ms / min_speech_ms: hangover (bridge shorter pauses) / drop shorter voiced runs (0 = off)
+    ctx = get_context(y, sr, ctx, frame_ms=frame_ms, hop_ms=hop_ms, low_mem=low_mem)
+    return vad_from_features(ctx.rms, ctx.zcr, ctx.flux, ctx.hop, rms_th, zcr_th, flux_mul,
+                             merge_gap=int(round(merge_gap_ms/hop_ms)), min_len=int(round(min_speech_ms/hop_ms)))
+
+def vad_from_features(rms: np.ndarray, zcr: np.ndarray, flux: np.ndarray, hop: int,
+                      rms_th=0.02, zcr_th=0.1, flux_mul=0.5,
+                      merge_gap: int = 0, min_len: int = 0) -> List[Tuple[int,int]]:
+    # merge_gap / min_len in frames (see cmq_intervals.py)
     # normalize
     def norm(v):
         return (v - v.min())/(v.max()-v.min()+1e-9)
     rms_n, zcr_n, flux_n = norm(rms), norm(zcr), norm(flux)
 
     voiced = ((rms_n > rms_th) & (zcr_n < 1.0 - zcr_th)) | (flux_n > flux_mul*rms_n)
-    segs = []
-    start = None
-    for i, v in enumerate(voiced):
-        if v and start is None:
-            start = i
-        if (not v) and (start is not None):
-            segs.append((start, i))
-            start = None
-    if start is not None:
-        segs.append((start, len(voiced)))
-    return [(s*hop, e*hop) for s,e in segs]
-
-def pause_metrics(y: np.ndarray, sr: int, segs: List[Tuple[int,int]]) -> Dict:
-    dur_total = len(y)/sr
-    voiced_dur = sum((e-s)/sr for s,e in segs)
+    iv = runs(voiced)
+    if merge_gap > 0:
+        iv = merge_gaps(iv, merge_gap)
+    if min_len > 0:
+        iv = min_length(iv, min_len)
+    return to_pairs(iv*hop)
+
+def pause_metrics(y: np.ndarray, sr: int, segs: List[Tuple[int,int]],
+                  n_samples: Optional[int] = None) -> Dict:
+    n = len(y) if n_samples is None else n_samples
+    iv = as_intervals(segs)
+    dur_total = n/sr
+    voiced_dur = float(lengths(iv).sum())/sr
     pause_dur = max(0.0, dur_total - voiced_dur)
-    pauses = []
-    last_end = 0
-    for (s,e) in segs:
-        if s>last_end: pauses.append((last_end, s))
-        last_end = e
-    if last_end < len(y): pauses.append((last_end, len(y)))
-    pauses_sec = [(e-s)/sr for s,e in pauses if (e-s)/sr > 0.05]
+    pauses_sec = lengths(complement(iv, 0, n))/sr
+    pauses_sec = pauses_sec[pauses_sec > 0.05]
     return dict(
         total_sec=dur_total,
         pause_ratio=(pause_dur/dur_total if dur_total>0 else 0.0),
-        pause_mean=float(np.mean(pauses_sec)) if pauses_sec else 0.0,
-        pause_median=float(np.median(pauses_sec)) if pauses_sec else 0.0,
+        pause_mean=float(np.mean(pauses_sec)) if len(pauses_sec) else 0.0,
+        pause_median=float(np.median(pauses_sec)) if len(pauses_sec) else 0.0,
         pause_count=len(pauses_sec)
     )
 
@@ -101,8 +233,14 @@ def hz_to_semitone(f0_hz: np.ndarray, ref=440.0) -> np.ndarray:
     f[f<=0] = np.nan
     return 12.0*np.log2(f/ref)
 
-def f0_features(y: np.ndarray, sr: int) -> Dict:
-    f0, _, _ = librosa.pyin(y, fmin=50, fmax=500, frame_length=2048, hop_length=256)
+def f0_features(y: np.ndarray, sr: int, engine: str = "pyin",
+                segs: Optional[List[Tuple[int,int]]] = None) -> Dict:
+    # engine: "pyin" (reference) or "yin" (fast, voiced segs only) -- see speech_f0.py
+    f0 = estimate_f0(y, sr, engine, fmin=50, fmax=500, segs=segs)
+    return dict(f0_stats(f0), f0_engine=engine)
+
+def f0_stats(f0: np.ndarray) -> Dict:
+    # f0: raw track on the F0_FPS grid (NaN = unvoiced)
     idx = np.arange(len(f0))
     m = np.isfinite(f0)
     f0_interp = np.interp(idx, idx[m], f0[m]) if m.any() else np.zeros_like(f0)
@@ -112,9 +250,13 @@ def f0_features(y: np.ndarray, sr: int) -> Dict:
     f0_range_st = float(np.nanmax(st_valid)-np.nanmin(st_valid)) if len(st_valid) else float("nan")
     # slope (semitone/sec)
     if len(st) > 2:
-        t = np.arange(len(st)) / (sr/256.0)
-        m2 = np.isfinite(st)
-        slope = float(np.polyfit(t[m2], st[m2], 1)[0]) if m2.any() else float("nan")
+        # least-squares line, closed form (polyfit's Vandermonde copies dominated long streams' peak memory)
+        t = np.flatnonzero(np.isfinite(st)) / F0_FPS
+        if len(t) > 1:
+            t -= t.mean()
+            slope = float(t @ (st_valid - st_valid.mean()) / (t @ t))
+        else:
+            slope = float("nan")
     else:
         slope = float("nan")
     return dict(f0_hz=f0_interp, f0_sd_st=f0_sd_st, f0_range_st=f0_range_st, f0_slope_stps=slope)
@@ -122,28 +264,16 @@ def f0_features(y: np.ndarray, sr: int) -> Dict:
 # -------------------------
 # Perturbation: Jitter/Shimmer/HNR (optional)
 # -------------------------
-def perturbation_features(y: np.ndarray, sr: int) -> Dict:
-    if not PARSELMOUTH_OK:
-        return dict(jitter_percent=np.nan, shimmer_percent=np.nan, hnr_db=np.nan, note="parselmouth not available")
-    try:
-        snd = parselmouth.Sound(y, sampling_frequency=sr)
-        point_proc = parselmouth.praat.call(snd, "To PointProcess (periodic, cc)", 50, 500)
-        jitter_local = parselmouth.praat.call(point_proc, "Get jitter (local)", 0, 0, 50, 500, 1.3)
-        shimmer_local = parselmouth.praat.call([snd, point_proc], "Get shimmer (local)", 0, 0, 50, 500, 1.3, 1.6)
-        hnr = parselmouth.praat.call(snd, "To Harmonicity (cc)", 0.01, 50, 0.1, 1.0)
-        hnr_mean_db = parselmouth.praat.call(hnr, "Get mean", 0, 0)
-        return dict(
-            jitter_percent=float(jitter_local*100.0),
-            shimmer_percent=float(shimmer_local*100.0),
-            hnr_db=float(hnr_mean_db)
-        )
-    except Exception as e:
-        return dict(jitter_percent=np.nan, shimmer_percent=np.nan, hnr_db=np.nan, error=str(e))
+def perturbation_features(y: np.ndarray, sr: int, segs: Optional[List[Tuple[int,int]]] = None,
+                          mode: str = "full", pool: Optional[PraatPool] = None) -> Dict:
+    # mode: "full" (whole signal), "concat" / "segments" (VAD-voiced audio only) -- see speech_praat.py
+    return voiced_perturbation(y, sr, segs=segs, mode=mode, pool=pool, **F0_RANGE)
 
 # -------------------------
 # Tremor (3–7 Hz band)
 # -------------------------
 def bandpass(series: np.ndarray, sr_hz: float, lo=3.0, hi=7.0, order=4):
+    from scipy.signal import butter, filtfilt
     nyq = 0.5*sr_hz
     b,a = butter(order, [lo/nyq, hi/nyq], btype='band')
     return filtfilt(b,a, series)
@@ -166,31 +296,63 @@ def tremor_features(f0_curve: np.ndarray, sr_frames: float) -> Dict:
         peak_freq, rms = float('nan'), 0.0
     return dict(tremor_peak_hz=peak_freq, tremor_rms=rms)
 
+def tremor_analysis(f0: np.ndarray, f0_hz: np.ndarray, amp: Optional[np.ndarray]) -> Dict:
+    # tremor_features (whole recording) + tremor_map_* summaries as scalars, per-window map as arrays
+    tmap = tremor_map(f0, F0_FPS, amp=amp, **TREMOR_MAP_PARAMS)
+    return dict(tremor_features(f0_hz, sr_frames=F0_FPS), **tremor_map_summary(tmap), **tmap)
+
 # -------------------------
 # Syllable rate (approx) & DDK
 # -------------------------
-def syllable_rate(y: np.ndarray, sr: int, segs: List[Tuple[int,int]]) -> Dict:
-    # onset strength를 간이 음절핵 근사로 사용
-    env = np.abs(librosa.onset.onset_strength(y=y, sr=sr))
-    # 최소 간격(대략 60ms) 제한
-    peaks, _ = find_peaks(env, distance=3)
-    # 유성 구간 마스크
-    hop = 512
-    mask = np.zeros_like(env, dtype=bool)
-    for s,e in segs:
-        mask[(s//hop):(e//hop)] = True
-    syllables = int(np.sum(mask[peaks]))
-    voiced_sec = sum((e-s)/sr for s,e in segs)
+def syllable_rate(y: np.ndarray, sr: int, segs: List[Tuple[int,int]],
+                  ctx: Optional[AnalysisContext] = None, low_mem: bool = False) -> Dict:
+    ctx = get_context(y, sr, ctx, low_mem=low_mem)
+    return syllables_from_onset(ctx.onset_env, ctx.hop, sr, segs)
+
+def syllables_from_onset(onset_env: np.ndarray, hop: int, sr: int, segs: List[Tuple[int,int]]) -> Dict:
+    # onset strength를 간이 음절핵 근사로 사용 (VAD와 같은 hop 격자)
+    from scipy.signal import find_peaks
+    env = np.abs(onset_env)
+    # 최소 간격 60ms 제한 (SYLLABLE_MIN_GAP_SEC; sr과 무관)
+    peaks, _ = find_peaks(env, distance=max(1, int(round(SYLLABLE_MIN_GAP_SEC*sr/hop))))
+    # 유성 구간 (hop 격자) 안의 peak 수
+    iv = as_intervals(segs)
+    syllables = int(np.count_nonzero(contains(min_length(iv//hop, 1), peaks) >= 0))
+    voiced_sec = float(lengths(iv).sum())/sr
     rate = syllables/voiced_sec if voiced_sec>0 else 0.0
     return dict(syllables=syllables, speech_rate_sps=float(rate))
 
-def ddk_metrics(y: np.ndarray, sr: int) -> Dict:
-    # DDK용 간단 필터 + Hilbert env → peak 간격
-    b,a = butter(4, [80/(sr/2), 1000/(sr/2)], btype='band')
-    yb = filtfilt(b,a,y)
-    env = np.abs(hilbert(yb))
+def hilbert_envelope(x: np.ndarray) -> np.ndarray:
+    # |analytic signal| in the input precision (float32 -> complex64), spectrum edited in place
+    from scipy.fft import fft, ifft, next_fast_len
+    n = len(x)
+    N = next_fast_len(n)
+    X = fft(x, N)
+    X[1:(N + 1)//2] *= 2
+    X[N//2 + 1:] = 0
+    return np.abs(ifft(X, overwrite_x=True)[:n])
+
+def ddk_metrics(y: np.ndarray, sr: int, low_mem: bool = False) -> Dict:
+    # DDK용 간단 필터 + Hilbert env → peak 간격 (DDK_SR 저속 뷰에서 계산)
+    from scipy.signal import butter, filtfilt, sosfiltfilt, hilbert, find_peaks
+    from scipy.fft import next_fast_len
+    y, sr = decimate_to(y, sr, DDK_SR)
+    if len(y) <= DDK_PADLEN:              # too short for the zero-phase band-pass -> no peaks
+        return ddk_from_peaks(np.zeros(0, dtype=np.int64), sr)
+    if low_mem:
+        sos = butter(4, [80/(sr/2), 1000/(sr/2)], btype='band', output='sos')
+        y = sosfiltfilt(sos.astype(np.float32), y.astype(np.float32, copy=False))
+        env = hilbert_envelope(y)
+        del y
+    else:
+        b,a = butter(4, [80/(sr/2), 1000/(sr/2)], btype='band')
+        yb = filtfilt(b,a,y)
+        env = np.abs(hilbert(yb, N=next_fast_len(len(yb))))[:len(yb)]
     thr = np.percentile(env, 70)
     peaks, _ = find_peaks(env, height=thr, distance=int(0.05*sr))
+    return ddk_from_peaks(peaks, sr)
+
+def ddk_from_peaks(peaks: np.ndarray, sr: int) -> Dict:
     if len(peaks) < 3:
         return dict(ddk_rate_sps=0.0, ddk_interval_sd_ms=np.nan)
     intervals = np.diff(peaks)/sr
@@ -214,35 +376,11 @@ class SpeechSummary:
     ddk_interval_sd_ms: float
 
 def sara4_autoscore(s: SpeechSummary) -> int:
-    score = 0
-    if s.speech_rate < 4.5: score += 1
-    if s.pause_ratio > 0.25: score += 1
-    if s.f0_sd_st > 1.0: score += 1
-    if not math.isnan(s.jitter_percent) and s.jitter_percent > 1.0: score += 1
-    if not math.isnan(s.shimmer_percent) and s.shimmer_percent > 3.0: score += 1
-    if (not math.isnan(s.tremor_peak_hz)) and (3.0 <= s.tremor_peak_hz <= 7.0) and (s.tremor_rms > 0.05):
-        score += 1
-    return min(score, 6)
-
-# -------------------------
-# Pipeline
-# -------------------------
-def run_pipeline(audio_path: str, sr: int = 44100) -> Dict:
-    y, sr = load_audio(audio_path, sr=sr)
-
-    # 기본 노이즈 억제(아주 약하게): DC 제거 + 하이패스
-    y = y - np.mean(y)
-    b,a = butter(2, 40/(sr/2), btype='highpass')
-    y = filtfilt(b,a,y)
-
-    segs = vad_segments(y, sr)
-    pmet = pause_metrics(y, sr, segs)
-    f0met = f0_features(y, sr)
-    pert = perturbation_features(y, sr)
-    trem = tremor_features(f0met['f0_hz'], sr_frames=sr/256.0)
-    rate = syllable_rate(y, sr, segs)
-    ddk  = ddk_metrics(y, sr)
+    # scalar view of speech_score.sara4_batch (cohorts: call sara4_batch on the summary table)
+    return int(sara4_batch(**{k: [getattr(s, k)] for k in SARA4_COLS})[0])
 
+def assemble_results(pmet: Dict, f0met: Dict, pert: Dict, trem: Dict, rate: Dict, ddk: Dict,
+                     tmap: Optional[Dict] = None) -> Dict:
     summary = SpeechSummary(
         pause_ratio=pmet['pause_ratio'],
         speech_rate=rate['speech_rate_sps'],
@@ -260,7 +398,106 @@ def run_pipeline(audio_path: str, sr: int = 44100) -> Dict:
         pause=pmet, f0=f0met, perturbation=pert, tremor=trem,
         rate=rate, ddk=ddk, summary=summary.__dict__, sara4_auto=sara4
     )
-    save_outputs(summary.__dict__, out)
+    if tmap is not None:
+        out["tremor_map"] = tmap   # per-window arrays (t, f0_peak_hz, f0_rms_hz, ...); summary stats in tremor
+    return out
+
+# -------------------------
+# Pipeline
+# -------------------------
+VAD_PARAMS = dict(frame_ms=30, hop_ms=10, rms_th=0.02, zcr_th=0.1, flux_mul=0.5)
+
+class PreparedSignal:
+    # load + light noise suppression on first access, so fully cached runs never decode audio
+    # low_mem: stays float32 (in-place DC removal, float32 SOS high-pass instead of a float64 filtfilt copy)
+    def __init__(self, audio_path: str, sr: Optional[int] = None, profiler: Optional[StageProfiler] = None,
+                 low_mem: bool = False):
+        self.audio_path, self.req_sr, self.profiler, self.low_mem = audio_path, sr, profiler, low_mem
+
+    @cached_property
+    def _data(self):
+        with profiled(self.profiler, "load"):
+            y, sr = load_audio(self.audio_path, sr=self.req_sr)
+        if self.profiler is not None:
+            self.profiler.set_input(n_samples=len(y), sr=sr)
+        with profiled(self.profiler, "highpass"):
+            # 기본 노이즈 억제(아주 약하게): DC 제거 + 하이패스
+            from scipy.signal import butter, filtfilt, sosfiltfilt
+            if self.low_mem:
+                y -= np.mean(y)
+                sos = butter(2, 40/(sr/2), btype='highpass', output='sos')
+                y = sosfiltfilt(sos.astype(y.dtype), y)
+            else:
+                y = y - np.mean(y)
+                b,a = butter(2, 40/(sr/2), btype='highpass')
+                y = filtfilt(b,a,y)
+        return y, sr
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._data[0]
+
+    @property
+    def sr(self) -> int:
+        return self._data[1]
+
+    @cached_property
+    def ctx(self) -> AnalysisContext:
+        return AnalysisContext(self.y, self.sr, frame_ms=VAD_PARAMS["frame_ms"], hop_ms=VAD_PARAMS["hop_ms"],
+                               low_mem=self.low_mem)
+
+    def release_context(self):
+        self.__dict__.pop("ctx", None)   # drop the spectrogram before the remaining stages
+
+def run_pipeline(audio_path: str, sr: Optional[int] = None, save: bool = True,
+                 f0_engine: str = "pyin", cache: Optional[FeatureCache] = None,
+                 praat_mode: str = "concat", praat_workers: int = 1, praat_timeout: float = 30.0,
+                 profiler: Optional[StageProfiler] = None, low_mem: bool = False) -> Dict:
+    # cache: per-stage feature cache, keyed by audio hash + stage params (see speech_cache.py)
+    # praat_*: voiced-only Praat stage in a killable worker pool (workers=0 -> inline, no timeout)
+    # profiler: per-stage wall/CPU/peak memory -> out["profile"] (see speech_profile.py)
+    # low_mem: float32 path (own cache keys; default-mode keys unchanged)
+    prof = profiler
+    if prof is not None:
+        with prof.stage("import", mem=False):
+            import_dsp()
+    sig = PreparedSignal(audio_path, sr, profiler=prof, low_mem=low_mem)
+    stage = StageRunner(cache, audio_path, dict(sr=sr or "native", highpass_hz=40,
+                                                **(dict(dtype="float32") if low_mem else {})), profiler=prof)
+
+    vad = stage("vad", VAD_PARAMS, lambda: dict(
+        segs=np.array(vad_segments(sig.y, sig.sr, ctx=sig.ctx, **VAD_PARAMS), dtype=np.int64).reshape(-1, 2),
+        n_samples=len(sig.y), sr=sig.sr))
+    segs = [(int(s), int(e)) for s, e in vad["segs"]]
+    fs = int(vad["sr"])
+    if prof is not None:
+        prof.set_input(n_samples=int(vad["n_samples"]), sr=fs)
+    with profiled(prof, "pause"):
+        pmet = pause_metrics(None, fs, segs, n_samples=int(vad["n_samples"]))
+    rate = stage("rate", VAD_PARAMS, lambda: syllable_rate(sig.y, sig.sr, segs, ctx=sig.ctx))
+    sig.release_context()
+    f0 = stage("f0", dict(VAD_PARAMS, engine=f0_engine, **F0_RANGE),
+               lambda: dict(f0=estimate_f0(sig.y, sig.sr, f0_engine, segs=segs, **F0_RANGE)))["f0"]
+    with profiled(prof, "f0_stats"):
+        f0met = dict(f0_stats(f0), f0_engine=f0_engine)
+    pert = stage("perturbation", dict(VAD_PARAMS, mode=praat_mode, **F0_RANGE),
+                 lambda: perturbation_features(sig.y, sig.sr, segs=segs, mode=praat_mode,
+                                               pool=get_pool(praat_workers, praat_timeout)),
+                 keep=lambda v: PARSELMOUTH_OK and not v.get("timeouts"))   # never cache a timeout
+                                                                            # or a missing parselmouth
+    tv = stage("tremor", dict(VAD_PARAMS, engine=f0_engine, **F0_RANGE, **TREMOR_MAP_PARAMS),
+               lambda: tremor_analysis(f0, f0met['f0_hz'], stage("amp", dict(n_frames=len(f0)), lambda: dict(
+                   amp=amplitude_contour(sig.y, sig.sr, len(f0), block=2**16 if low_mem else None)))["amp"]))
+    tmap = {k: v for k, v in tv.items() if isinstance(v, np.ndarray)}
+    trem = {k: v for k, v in tv.items() if k not in tmap}
+    ddk  = stage("ddk", dict(ddk_sr=DDK_SR, band_hz=[80, 1000]), lambda: ddk_metrics(sig.y, sig.sr, low_mem=low_mem))
+
+    with profiled(prof, "score"):
+        out = assemble_results(pmet, f0met, pert, trem, rate, ddk, tmap)
+    if prof is not None:
+        out["profile"] = prof.report()
+    if save:
+        save_outputs(out["summary"], out)
     return out
 
 # -------------------------
@@ -269,12 +506,41 @@ def run_pipeline(audio_path: str, sr: int = 44100) -> Dict:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Speech Test pipeline (single-file MVP)")
     parser.add_argument("audio", help="input audio file (wav/mp3)")
-    parser.add_argument("--sr", type=int, default=44100, help="target sample rate")
+    parser.add_argument("--sr", type=int, default=None, help="resample to this rate (default: native)")
+    parser.add_argument("--f0-engine", choices=sorted(F0_ENGINES), default="pyin",
+                        help="F0 estimator (pyin = reference, yin = fast)")
+    parser.add_argument("--stream", action="store_true",
+                        help="bounded-memory block streaming (native sr, yin F0, no perturbation)")
+    parser.add_argument("--praat-mode", choices=PRAAT_MODES, default="concat",
+                        help="perturbation input: voiced audio joined (concat), per segment, or full signal")
+    parser.add_argument("--praat-workers", type=int, default=1, help="Praat worker processes (0 = inline)")
+    parser.add_argument("--praat-timeout", type=float, default=30.0, help="per-job Praat timeout (sec)")
+    parser.add_argument("--profile", action="store_true",
+                        help="per-stage wall/CPU time and peak memory (printed + in speech_metrics.json)")
+    parser.add_argument("--cache", default=None, help="per-stage feature cache directory (e.g. .speech_cache)")
+    parser.add_argument("--cache-max-mb", type=float, default=2048, help="cache size bound (LRU eviction)")
+    parser.add_argument("--low-mem", action="store_true",
+                        help="float32 / blocked low-memory mode (small metric drift, see readme)")
     args = parser.parse_args()
 
-    result = run_pipeline(args.audio, sr=args.sr)
+    if args.stream:
+        from speech_stream import stream_pipeline
+        result = stream_pipeline(args.audio)
+        save_outputs(result["summary"], result)
+    else:
+        cache = FeatureCache(args.cache, max_mb=args.cache_max_mb) if args.cache else None
+        result = run_pipeline(args.audio, sr=args.sr, f0_engine=args.f0_engine, cache=cache,
+                              praat_mode=args.praat_mode, praat_workers=args.praat_workers,
+                              praat_timeout=args.praat_timeout,
+                              profiler=StageProfiler() if args.profile else None, low_mem=args.low_mem)
     print("=== SUMMARY ===")
     for k,v in result["summary"].items():
         print(f"{k}: {v}")
     print("SARA4(auto):", result["sara4_auto"])
+    if "profile" in result:
+        rep = result["profile"]
+        print(f"=== PROFILE === {rep['input'].get('dur_sec', float('nan')):.1f}s audio @ {rep['input'].get('sr')} Hz, "
+              f"{rep['total_sec']:.2f}s total (x{rep['rtf']:.3f} real time)")
+        print(profile_table([rep])[["stage", "cached_pct", "mean_sec", "cpu_mean_sec", "peak_max_mib", "share_pct"]]
+              .round(3).to_string(index=False))
     print("Saved: speech_summary.csv, speech_metrics.json")
@@ -0,0 +1,164 @@
+# speech_praat.py
+# Voiced-only, pooled and time-bounded Praat perturbation (jitter / shimmer / HNR)
+# - Only VAD-voiced audio is analysed:
+#   "concat"   : voiced segments joined with short silent gaps (> Praat's 20 ms period ceiling,
+#                so no period spans a join) -> one Praat job
+#   "segments" : each voiced segment is its own job, results duration-weighted
+# - Jobs run in a worker process pool with a per-job timeout; a hung/crashed job is killed
+#   (pool restarted) and reported as NaN instead of blocking the pipeline
+# - Reports how much audio was actually analysed
+
+import time, atexit
+import importlib.util
+import multiprocessing as mp
+from typing import List, Tuple, Dict, Optional
+
+import numpy as np
+
+# --- Optional deps (graceful fallback); the Praat bridge itself is imported by the worker on first use
+PARSELMOUTH_OK = importlib.util.find_spec("parselmouth") is not None
+
+PRAAT_MODES = ("concat", "segments", "full")
+JOIN_GAP_SEC = 0.03       # silent gap between concatenated segments (> PERIOD_CEIL)
+MIN_SEG_SEC = 0.1         # shorter voiced runs carry too few periods for jitter/shimmer
+PERIOD_FLOOR, PERIOD_CEIL = 0.0001, 0.02   # Praat's standard jitter/shimmer period range (sec)
+
+NAN_RESULT = dict(jitter_percent=np.nan, shimmer_percent=np.nan, hnr_db=np.nan)
+
+# -------------------------
+# Praat measures (runs inside a worker)
+# -------------------------
+def praat_measures(y: np.ndarray, sr: int, fmin=50, fmax=500) -> Dict:
+    try:
+        import parselmouth  # Praat bridge
+        snd = parselmouth.Sound(y, sampling_frequency=sr)
+        point_proc = parselmouth.praat.call(snd, "To PointProcess (periodic, cc)", fmin, fmax)
+        jitter_local = parselmouth.praat.call(point_proc, "Get jitter (local)", 0, 0,
+                                              PERIOD_FLOOR, PERIOD_CEIL, 1.3)
+        shimmer_local = parselmouth.praat.call([snd, point_proc], "Get shimmer (local)", 0, 0,
+                                               PERIOD_FLOOR, PERIOD_CEIL, 1.3, 1.6)
+        hnr = parselmouth.praat.call(snd, "To Harmonicity (cc)", 0.01, fmin, 0.1, 1.0)
+        hnr_mean_db = parselmouth.praat.call(hnr, "Get mean", 0, 0)
+        return dict(
+            jitter_percent=float(jitter_local*100.0),
+            shimmer_percent=float(shimmer_local*100.0),
+            hnr_db=float(hnr_mean_db)
+        )
+    except Exception as e:
+        return dict(NAN_RESULT, error=str(e))
+
+# -------------------------
+# Voiced audio
+# -------------------------
+def voiced_chunks(y: np.ndarray, sr: int, segs: List[Tuple[int,int]],
+                  min_sec: float = MIN_SEG_SEC) -> List[np.ndarray]:
+    return [y[s:e] for s, e in segs if (e - s) >= min_sec*sr]
+
+def concat_voiced(chunks: List[np.ndarray], sr: int, gap_sec: float = JOIN_GAP_SEC) -> np.ndarray:
+    if not chunks:
+        return np.zeros(0, dtype=np.float64)
+    gap = np.zeros(int(gap_sec*sr), dtype=chunks[0].dtype)
+    parts = []
+    for c in chunks:
+        parts += [c, gap]
+    return np.concatenate(parts[:-1])
+
+# -------------------------
+# Pool
+# -------------------------
+class PraatPool:
+    # process pool with per-job timeouts; workers=0 runs inline (no timeout possible)
+    def __init__(self, workers: int = 1, timeout: float = 30.0):
+        self.workers, self.timeout = workers, timeout
+        self._pool = None
+
+    def _get(self):
+        if self._pool is None:
+            self._pool = mp.get_context().Pool(self.workers)
+        return self._pool
+
+    def restart(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def map(self, jobs: List[Tuple[np.ndarray, int]], fmin=50, fmax=500) -> List[Dict]:
+        if self.workers <= 0 or not PARSELMOUTH_OK:
+            return [praat_measures(y, sr, fmin, fmax) if PARSELMOUTH_OK else
+                    dict(NAN_RESULT, error="parselmouth not available") for y, sr in jobs]
+        pool = self._get()
+        pending = [pool.apply_async(praat_measures, (y, sr, fmin, fmax)) for y, sr in jobs]
+        out, killed = [], False
+        for job in pending:
+            if killed:
+                out.append(dict(NAN_RESULT, error="timeout")); continue
+            try:
+                out.append(job.get(timeout=self.timeout))
+            except mp.TimeoutError:
+                # Praat can't be interrupted in-process: kill the pool, fail the rest gracefully
+                self.restart()
+                killed = True
+                out.append(dict(NAN_RESULT, error="timeout"))
+            except Exception as e:
+                out.append(dict(NAN_RESULT, error=f"{type(e).__name__}: {e}"))
+        return out
+
+_POOLS = {}
+
+def get_pool(workers: int = 1, timeout: float = 30.0) -> PraatPool:
+    # one pool per (workers, timeout) per process, reused across files
+    key = (workers, timeout)
+    if key not in _POOLS:
+        _POOLS[key] = PraatPool(workers, timeout)
+    return _POOLS[key]
+
+@atexit.register
+def _close_pools():
+    for p in _POOLS.values():
+        p.restart()
+
+# -------------------------
+# Stage
+# -------------------------
+def voiced_perturbation(y: np.ndarray, sr: int, segs: Optional[List[Tuple[int,int]]] = None,
+                        mode: str = "concat", pool: Optional[PraatPool] = None,
+                        fmin=50, fmax=500) -> Dict:
+    if not PARSELMOUTH_OK:
+        return dict(NAN_RESULT, note="parselmouth not available", analysed_sec=0.0)
+    if mode not in PRAAT_MODES:
+        raise ValueError(f"unknown perturbation mode {mode!r} (choose from {PRAAT_MODES})")
+    pool = pool or get_pool()
+    t0 = time.perf_counter()
+    if mode == "full" or segs is None:
+        chunks = [y]
+    else:
+        chunks = voiced_chunks(y, sr, segs)
+    if not chunks:
+        return dict(NAN_RESULT, note="no voiced segments", mode=mode, analysed_sec=0.0, n_jobs=0)
+
+    if mode == "segments":
+        res = pool.map([(c, sr) for c in chunks], fmin, fmax)
+        w = np.array([len(c) for c in chunks], dtype=float)
+        out = {}
+        for k in NAN_RESULT:
+            v = np.array([r[k] for r in res], dtype=float)
+            ok = np.isfinite(v)
+            out[k] = float(np.sum(v[ok]*w[ok])/np.sum(w[ok])) if ok.any() else np.nan
+    else:
+        res = pool.map([(concat_voiced(chunks, sr) if mode == "concat" else chunks[0], sr)], fmin, fmax)
+        out = {k: res[0][k] for k in NAN_RESULT}
+
+    errors = [r["error"] for r in res if "error" in r]
+    out.update(mode=mode, n_jobs=len(res), analysed_sec=float(sum(len(c) for c in chunks)/sr),
+               total_sec=float(len(y)/sr), timeouts=sum(e == "timeout" for e in errors),
+               elapsed_sec=round(time.perf_counter() - t0, 3))
+    if errors:
+        out["error"] = errors[0]
+    return out
@@ -0,0 +1,118 @@
+# speech_profile.py
+# Opt-in per-stage instrumentation for speech_pipeline.run_pipeline
+# - StageProfiler: `with prof.stage("vad"): ...` records wall time, CPU time (this process) and
+#   peak traced allocation above the stage's starting point (tracemalloc)
+# - Stages may nest (e.g. load inside the first uncached stage): self_sec / cpu_sec exclude child
+#   stages, so self times add up to the total (wall_sec is inclusive)
+# - stage(..., mem=False): timed but not traced (e.g. the cold-process module import, which tracemalloc
+#   slows several-fold)
+# - on_stage(name, record) hook for live budgets / logging; report() goes into the metrics JSON
+# - profile_table(): aggregated per-stage table across a batch (latency budgets)
+# Praat runs in a worker process: its CPU time is not in cpu_sec (wall time is).
+
+import time, tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Optional, Callable
+
+import numpy as np
+
+class StageProfiler:
+    def __init__(self, mem: bool = True, on_stage: Optional[Callable[[str, Dict], None]] = None):
+        self.mem = mem
+        self.on_stage = on_stage
+        self.records: List[Dict] = []
+        self.input: Dict = {}
+        self._stack: List[Dict] = []
+        self._own_tracing = False
+
+    def set_input(self, **info):
+        # input length / sample rate (n_samples, sr, ...) as soon as they are known
+        self.input.update(info)
+        if "n_samples" in self.input and "sr" in self.input:
+            self.input["dur_sec"] = self.input["n_samples"]/self.input["sr"]
+
+    def _fold_peak(self):
+        # peak since the last reset belongs to every open stage
+        peak = tracemalloc.get_traced_memory()[1]
+        for r in self._stack:
+            if "_peak" in r:
+                r["_peak"] = max(r["_peak"], peak)
+
+    @contextmanager
+    def stage(self, name: str, mem: Optional[bool] = None, **extra):
+        mem = self.mem if mem is None else mem
+        if mem and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+        rec = dict(stage=name, depth=len(self._stack), **extra)
+        if mem:
+            self._fold_peak()
+            tracemalloc.reset_peak()
+            rec["_base"] = rec["_peak"] = tracemalloc.get_traced_memory()[0]
+        rec["_children"], rec["_children_cpu"] = 0.0, 0.0
+        self._stack.append(rec)
+        t0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+            if mem:
+                self._fold_peak()
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]["_children"] += wall
+                self._stack[-1]["_children_cpu"] += cpu
+            rec.update(wall_sec=wall, self_sec=wall - rec.pop("_children"), cpu_sec=cpu - rec.pop("_children_cpu"))
+            if mem:
+                rec["peak_mib"] = (rec.pop("_peak") - rec.pop("_base"))/2**20
+            self.records.append(rec)
+            if self.on_stage is not None:
+                self.on_stage(name, rec)
+
+    def close(self):
+        if self._own_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._own_tracing = False
+
+    def report(self) -> Dict:
+        self.close()
+        total = sum(r["self_sec"] for r in self.records)
+        return dict(input=dict(self.input), total_sec=total,
+                    rtf=(total/self.input["dur_sec"] if self.input.get("dur_sec") else np.nan),
+                    stages=[dict(r) for r in self.records])
+
+def profiled(prof: Optional[StageProfiler], name: str, **extra):
+    # prof.stage(...) or a no-op when profiling is off
+    return prof.stage(name, **extra) if prof is not None else nullcontext()
+
+# -------------------------
+# Batch aggregation
+# -------------------------
+def profile_table(reports: List[Dict]):
+    # one row per stage: calls, cached share, self time mean/p50/p95/max, CPU, peak MiB, sec per audio sec
+    import pandas as pd
+    rows = []
+    for rep in reports:
+        dur = rep.get("input", {}).get("dur_sec", np.nan)
+        for r in rep.get("stages", []):
+            rows.append(dict(stage=r["stage"], cached=bool(r.get("cached", False)), self_sec=r["self_sec"],
+                             cpu_sec=r["cpu_sec"], peak_mib=r.get("peak_mib", np.nan),
+                             sec_per_audio_sec=r["self_sec"]/dur if dur else np.nan))
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    order = list(dict.fromkeys(df["stage"]))
+    g = df.groupby("stage", sort=False)
+    out = pd.DataFrame(dict(
+        calls=g.size(),
+        cached_pct=100*g["cached"].mean(),
+        mean_sec=g["self_sec"].mean(),
+        p50_sec=g["self_sec"].median(),
+        p95_sec=g["self_sec"].quantile(0.95),
+        max_sec=g["self_sec"].max(),
+        cpu_mean_sec=g["cpu_sec"].mean(),
+        peak_max_mib=g["peak_mib"].max(),
+        sec_per_audio_sec=g["sec_per_audio_sec"].mean(),
+    )).loc[order]
+    out["share_pct"] = 100*g["self_sec"].sum().loc[order]/df["self_sec"].sum()
+    return out.reset_index()
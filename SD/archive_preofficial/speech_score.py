@@ -0,0 +1,151 @@
+# speech_score.py
+# Array-native SARA speech scoring (one vectorized pass over a cohort)
+# - sara_speech_batch(): sara_speech_from_four for every row -> z-scores, impairment index,
+#   discrete SARA 0–6 and continuous SARA
+# - sara4_batch(): sara4_autoscore thresholds for every row of speech summaries
+# - Input: DataFrame (column names below) or column arrays; NaN handling identical to the scalar
+#   Python versions (min/max ignore a NaN second argument, comparisons with NaN are False)
+# - sara_speech_from_four() stays the scalar API (thin wrapper, same dict as before)
+# CLI: re-score speech_batch / speech_asr CSVs without re-running any DSP or ASR.
+
+import time, argparse
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+# pandas is only needed for DataFrame in/out (imported there): sara4_batch on arrays stays import-light
+
+SARA_SPEECH_COLS = ["duration_sec", "silence_ratio", "tempo_bpm", "intelligibility_pct"]
+SARA4_COLS = ["speech_rate", "pause_ratio", "f0_sd_st", "jitter_percent", "shimmer_percent",
+              "tremor_peak_hz", "tremor_rms"]
+
+# sara_speech_from_four defaults (weights / cuts to be calibrated later)
+SPEECH_NORMS = dict(mu_sil=0.20, sd_sil=0.10, mu_tmp=105.0, sd_tmp=10.0, mu_int=95.0, sd_int=5.0)
+SPEECH_WEIGHTS = (0.60, 0.25, 0.15)            # intelligibility, silence, tempo deviation
+SPEECH_CUTS = (0.25, 0.75, 1.25, 1.75, 2.50, 3.50)
+MIN_DURATION_SEC = 4.0
+
+# sara4_autoscore thresholds
+SARA4_THRESHOLDS = dict(speech_rate=4.5, pause_ratio=0.25, f0_sd_st=1.0, jitter_percent=1.0,
+                        shimmer_percent=3.0, tremor_lo_hz=3.0, tremor_hi_hz=7.0, tremor_rms=0.05)
+
+def _columns(data, names: Sequence[str], kw: Dict) -> Dict[str, np.ndarray]:
+    # DataFrame / mapping of columns and/or keyword arrays -> float arrays of one length
+    src = {} if data is None else data
+    cols = {n: np.asarray(kw[n] if kw.get(n) is not None else src[n], dtype=float) for n in names}
+    return dict(zip(names, np.broadcast_arrays(*cols.values())))
+
+def _clamp(x: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    # scalar clamp: max(lo, min(hi, x)); min(hi, nan) -> hi
+    return np.where(np.isnan(x), hi, np.clip(x, lo, hi))
+
+# -------------------------
+# sara_speech_from_four
+# -------------------------
+def sara_speech_arrays(c: Dict[str, np.ndarray], weights, cuts, min_duration_sec, nm) -> Dict[str, np.ndarray]:
+    # c: column arrays; weights / cuts may carry a trailing candidate axis (weights (3, K), cuts (K, 6))
+    # with columns shaped (N, 1) -> (N, K) scores (calibration search)
+    ok = ~(c["duration_sec"] < min_duration_sec)
+    z_sil = _clamp((c["silence_ratio"] - nm["mu_sil"])/(nm["sd_sil"] or 1e-9), -3.0, 3.0)
+    z_tmp = _clamp(np.abs((c["tempo_bpm"] - nm["mu_tmp"])/(nm["sd_tmp"] or 1e-9)), 0.0, 3.0)
+    z_int = (nm["mu_int"] - c["intelligibility_pct"])/(nm["sd_int"] or 1e-9)
+    z_int = _clamp(np.where(np.isnan(z_int), 0.0, np.maximum(0.0, z_int)), 0.0, 3.0)   # max(0.0, nan) -> 0.0
+    w_int, w_sil, w_tmp = weights
+    imp = w_int*z_int + w_sil*z_sil + w_tmp*z_tmp
+    sara = (imp[..., None] >= np.asarray(cuts, dtype=float)).sum(axis=-1)
+    cont = 6.0/(1.0 + np.exp(-1.1*imp))
+    # rows failing the duration gate: ok=False, scores NaN
+    return dict(ok=ok, z_intelligibility=np.where(ok, z_int, np.nan), z_silence=np.where(ok, z_sil, np.nan),
+                z_tempo_dev=np.where(ok, z_tmp, np.nan), impairment_index=np.where(ok, imp, np.nan),
+                sara_speech_pred=np.where(ok, sara, np.nan), sara_speech_cont=np.where(ok, cont, np.nan))
+
+def sara_speech_batch(data=None, *, duration_sec=None, silence_ratio=None, tempo_bpm=None,
+                      intelligibility_pct=None, weights=SPEECH_WEIGHTS, cuts=SPEECH_CUTS,
+                      min_duration_sec=MIN_DURATION_SEC, **norms) -> "pd.DataFrame":
+    import pandas as pd
+    c = _columns(data, SARA_SPEECH_COLS, dict(duration_sec=duration_sec, silence_ratio=silence_ratio,
+                                              tempo_bpm=tempo_bpm, intelligibility_pct=intelligibility_pct))
+    out = pd.DataFrame(sara_speech_arrays(c, weights, cuts, min_duration_sec, dict(SPEECH_NORMS, **norms)))
+    if isinstance(data, pd.DataFrame):
+        out.index = data.index
+    return out
+
+def sara_speech_from_four(duration_sec, silence_ratio, tempo_bpm, intelligibility_pct,
+                          mu_sil=0.20, sd_sil=0.10,
+                          mu_tmp=105.0, sd_tmp=10.0,
+                          mu_int=95.0, sd_int=5.0):
+    c = {k: np.array([v], dtype=float) for k, v in zip(SARA_SPEECH_COLS, (duration_sec, silence_ratio, tempo_bpm,
+                                                                          intelligibility_pct))}
+    r = sara_speech_arrays(c, SPEECH_WEIGHTS, SPEECH_CUTS, MIN_DURATION_SEC,
+                            dict(mu_sil=mu_sil, sd_sil=sd_sil, mu_tmp=mu_tmp, sd_tmp=sd_tmp, mu_int=mu_int, sd_int=sd_int))
+    if not r["ok"][0]:
+        return {"ok": False, "reason": "insufficient_duration"}
+    return {
+        "ok": True,
+        "z_scores": {"intelligibility": float(r["z_intelligibility"][0]), "silence": float(r["z_silence"][0]),
+                     "tempo_dev": float(r["z_tempo_dev"][0])},
+        "impairment_index": round(float(r["impairment_index"][0]), 3),
+        "sara_speech_pred": int(r["sara_speech_pred"][0]),
+        "sara_speech_cont": round(float(r["sara_speech_cont"][0]), 2)
+    }
+
+# -------------------------
+# sara4_autoscore
+# -------------------------
+def sara4_batch(data=None, thresholds: Optional[Dict] = None, **cols) -> np.ndarray:
+    # one point per criterion met (NaN never meets a criterion), capped at 6
+    th = dict(SARA4_THRESHOLDS, **(thresholds or {}))
+    c = _columns(data, SARA4_COLS, cols)
+    with np.errstate(invalid="ignore"):
+        score = ((c["speech_rate"] < th["speech_rate"]).astype(np.int64)
+                 + (c["pause_ratio"] > th["pause_ratio"])
+                 + (c["f0_sd_st"] > th["f0_sd_st"])
+                 + (c["jitter_percent"] > th["jitter_percent"])
+                 + (c["shimmer_percent"] > th["shimmer_percent"])
+                 + ((c["tremor_peak_hz"] >= th["tremor_lo_hz"]) & (c["tremor_peak_hz"] <= th["tremor_hi_hz"])
+                    & (c["tremor_rms"] > th["tremor_rms"])))
+    return np.minimum(score, 6)
+
+# -------------------------
+# CLI
+# -------------------------
+def _scalar_sara_speech(df: "pd.DataFrame") -> list:
+    return [sara_speech_from_four(*row) for row in df[SARA_SPEECH_COLS].itertuples(index=False)]
+
+if __name__ == "__main__":
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="Re-score speech summaries (vectorized SARA scoring)")
+    parser.add_argument("--summary", default=None, help="speech_batch summary CSV (-> sara4_auto)")
+    parser.add_argument("--asr", default=None, help="speech_asr scores CSV (-> sara_speech_from_four)")
+    parser.add_argument("--out", default="speech_scores.csv")
+    parser.add_argument("--check", action="store_true", help="compare against the scalar scorer loop")
+    args = parser.parse_args()
+    if not (args.summary or args.asr):
+        parser.error("give --summary and/or --asr")
+
+    out = None
+    if args.summary:
+        summ = pd.read_csv(args.summary)
+        t0 = time.perf_counter()
+        sara4 = sara4_batch(summ).astype(float)
+        if "status" in summ:
+            sara4[summ["status"].fillna("ok").ne("ok").to_numpy()] = np.nan   # failed records stay unscored
+        summ["sara4_auto"] = sara4
+        print(f"sara4: {len(summ)} rows in {1000*(time.perf_counter()-t0):.1f} ms")
+        out = summ
+    if args.asr:
+        asr = pd.read_csv(args.asr)
+        t0 = time.perf_counter()
+        scored = pd.concat([asr, sara_speech_batch(asr)], axis=1)
+        print(f"sara_speech: {len(asr)} rows in {1000*(time.perf_counter()-t0):.1f} ms")
+        if args.check:
+            t0 = time.perf_counter()
+            ref = _scalar_sara_speech(asr)
+            print(f"  scalar loop: {1000*(time.perf_counter()-t0):.1f} ms")
+            same = all((not r["ok"] and not ok) or
+                       (r["ok"] and ok and r["sara_speech_pred"] == p and r["impairment_index"] == round(i, 3))
+                       for r, ok, p, i in zip(ref, scored["ok"], scored["sara_speech_pred"], scored["impairment_index"]))
+            print("  identical to scalar:", same)
+        out = scored if out is None else out.merge(
+            scored.drop(columns=[c for c in ("pid", "path") if c in scored]), on="record_id", how="outer")
+    out.to_csv(args.out, index=False)
+    print("Saved:", args.out)
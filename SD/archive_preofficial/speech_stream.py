@@ -0,0 +1,392 @@
+# speech_stream.py
+# Bounded-memory streaming mode for speech_pipeline
+# - Reads the WAV in blocks via soundfile (native sample rate, no full-file load)
+# - High-pass / DDK band-pass run as causal SOS filters with carried state (two passes: the magnitude
+#   response of the in-memory filtfilt; the phase differs, which is what remains of the tolerance)
+# - VAD features, onset envelope and F0 (yin engine) are computed per frame as blocks arrive
+# - DDK envelope on a DDK_SR polyphase view: overlap-save Hilbert per block (1 s margin), candidate peaks
+#   decided with 2x the peak distance of context, 70th-percentile threshold from a running log-histogram;
+#   the peaks do not depend on the block size
+# Only block-sized audio buffers are alive at any time; what grows with length is the frame-rate side tracks
+# (a few float32 per 10 ms VAD frame / F0 frame, ~4 KB per second) and, in finish(), the whole-file statistics
+# over those contours (~10 KB per second at the peak: 5 / 19 / 38 MiB for 12 s / 10 min / 30 min at 16 kHz).
+# Praat perturbation needs the whole signal and is not run in this mode (NaN + note).
+# Tolerances vs the in-memory path (run_pipeline(sr=native, f0_engine="yin")): see --check.
+
+import time, argparse
+from math import gcd
+from typing import List, Tuple, Dict
+
+import numpy as np
+import soundfile as sf
+
+from speech_f0 import (yin_frames, n_f0_frames, f0_frame_centers,
+                       F0_REF_SR, F0_HOP, F0_FRAME, F0_FPS, YIN_FS)
+from speech_pipeline import (DDK_SR, vad_from_features, pause_metrics, f0_stats, tremor_features,
+                             syllables_from_onset, ddk_from_peaks, assemble_results)
+from speech_tremor import tremor_map, tremor_map_summary, TREMOR_MAP_PARAMS
+from cmq_intervals import as_intervals, contains     # common/ on sys.path via speech_f0
+
+# -------------------------
+# Buffers & filters
+# -------------------------
+class FrameBuffer:
+    # rolling sample buffer; cuts fixed-length frames at absolute start indices
+    def __init__(self, frame_len: int, lead: int = 0):
+        self.frame_len = frame_len
+        self.buf = np.zeros(lead, dtype=np.float32)   # zero padding before sample 0
+        self.offset = -lead                           # absolute index of buf[0]
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.buf)
+
+    def push(self, x: np.ndarray):
+        self.buf = np.concatenate([self.buf, x.astype(np.float32, copy=False)])
+
+    def frames(self, starts: np.ndarray) -> np.ndarray:
+        idx = starts - self.offset
+        return self.buf[idx[:, None] + np.arange(self.frame_len)[None, :]]
+
+    def trim(self, keep_from: int):
+        cut = max(0, keep_from - self.offset)
+        if cut:
+            self.buf = self.buf[cut:]
+            self.offset += cut
+
+class StreamFilter:
+    # causal SOS filter with carried state (passes=2 -> same magnitude response as filtfilt)
+    def __init__(self, sos: np.ndarray, passes: int = 1):
+        self.sos, self.passes = sos, passes
+        self.zi = None
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        from scipy.signal import sosfilt, sosfilt_zi
+        if self.zi is None:
+            # steady state at the first sample for pass 1; later passes see a settled input
+            zi = sosfilt_zi(self.sos)
+            self.zi = [zi*x[0]] + [zi*0.0 for _ in range(1, self.passes)]
+        for i in range(self.passes):
+            x, self.zi[i] = sosfilt(self.sos, x, zi=self.zi[i])
+        return x
+
+class StreamResampler:
+    # resample_poly over overlapping chunks (overlap-save); matches the one-shot call
+    # because every chunk starts on the polyphase grid (multiple of `down`)
+    def __init__(self, sr_in: int, sr_out: int, margin: int = 2048):
+        g = gcd(int(sr_in), int(sr_out))
+        self.up, self.down = int(sr_out)//g, int(sr_in)//g
+        self.M = -(-margin//self.down)*self.down
+        self.buf = FrameBuffer(1)
+        self.done = 0                                  # input consumed up to here (multiple of down)
+
+    def _run(self, stop: int, final: bool) -> np.ndarray:
+        from scipy.signal import resample_poly
+        lo = max(0, self.done - self.M)
+        hi = self.buf.end if final else stop + self.M
+        out = resample_poly(self.buf.buf[lo - self.buf.offset:hi - self.buf.offset], self.up, self.down)
+        a = (self.done - lo)*self.up//self.down
+        b = -(-(stop - lo)*self.up//self.down) if final else (stop - lo)*self.up//self.down
+        self.done = stop
+        self.buf.trim(self.done - self.M)
+        return out[a:b].astype(np.float32, copy=False)
+
+    def push(self, x: np.ndarray) -> np.ndarray:
+        self.buf.push(x)
+        stop = (self.buf.end - self.M)//self.down*self.down
+        if stop <= self.done:
+            return np.zeros(0, dtype=np.float32)
+        return self._run(stop, final=False)
+
+    def finish(self) -> np.ndarray:
+        return self._run(self.buf.end, final=True)
+
+# -------------------------
+# Stage accumulators
+# -------------------------
+class VadAccumulator:
+    # 30/10 ms frames on the AnalysisContext grid (same zero-padded FFT size and mel basis)
+    # -> rms, zcr, flux, onset envelope
+    def __init__(self, sr: int, frame_ms=30, hop_ms=10, n_mels=64):
+        import librosa
+        from scipy.fft import next_fast_len
+        from scipy.signal import get_window
+        self.sr = sr
+        self.n_fft = int(sr*frame_ms/1000)
+        self.hop = int(sr*hop_ms/1000)
+        self.n_fft_pad = next_fast_len(self.n_fft, real=True)
+        self.win = get_window("hann", self.n_fft, fftbins=True).astype(np.float32)
+        self.mel_fb = librosa.filters.mel(sr=sr, n_fft=self.n_fft_pad, n_mels=n_mels).astype(np.float32)
+        self.fb = FrameBuffer(self.n_fft, lead=self.n_fft//2)
+        self.k = 0
+        self.prev_S = None
+        self.prev_db = None
+        self.rms, self.zcr, self.flux, self.onset = [], [], [], []
+
+    def _emit(self, k_stop: int):
+        if k_stop <= self.k:
+            return
+        starts = np.arange(self.k, k_stop)*self.hop - self.n_fft//2
+        fr = self.fb.frames(starts)
+        S = np.abs(np.fft.rfft(fr*self.win[None, :], n=self.n_fft_pad, axis=1))**2
+        neg = np.signbit(fr)
+        self.rms.append(np.sqrt(np.mean(fr**2, axis=1)).astype(np.float32))
+        self.zcr.append(np.mean(neg[:, 1:] != neg[:, :-1], axis=1).astype(np.float32))
+        prev = S[:1] if self.prev_S is None else self.prev_S
+        fl = np.maximum(np.diff(np.vstack([prev, S]), axis=0), 0).sum(axis=1)
+        if self.prev_S is None:
+            fl[0] = 0.0
+        self.flux.append(fl.astype(np.float32))
+        db = 10.0*np.log10(np.maximum(S @ self.mel_fb.T, 1e-10))
+        prev_db = db[:1] if self.prev_db is None else self.prev_db
+        self.onset.append(np.maximum(np.diff(np.vstack([prev_db, db]), axis=0), 0).mean(axis=1)
+                          .astype(np.float32))
+        self.prev_S, self.prev_db = S[-1:], db[-1:]
+        self.k = k_stop
+        self.fb.trim(self.k*self.hop - self.n_fft//2)
+
+    def push(self, x: np.ndarray):
+        self.fb.push(x)
+        self._emit((self.fb.end - self.n_fft + self.n_fft//2)//self.hop + 1)
+
+    def finish(self, n_total: int) -> Dict:
+        self.fb.push(np.zeros(self.n_fft//2, dtype=np.float32))
+        self._emit(1 + (n_total + 2*(self.n_fft//2) - self.n_fft)//self.hop)
+        rms, zcr, flux = (np.concatenate(v) if v else np.zeros(0, np.float32)
+                          for v in (self.rms, self.zcr, self.flux))
+        raw = np.concatenate(self.onset) if self.onset else np.zeros(0, np.float32)
+        # librosa.onset.onset_strength(center=True) alignment: env[k] = raw[k-1] (lag 1 + centering)
+        shift = 1 + self.n_fft//(2*self.hop)
+        onset = np.concatenate([np.zeros(shift, np.float32), raw[1:]])[:len(raw)]
+        return dict(rms=rms, zcr=zcr, flux=flux, onset=onset, hop=self.hop)
+
+class F0Accumulator:
+    # streaming YIN: polyphase decimation to YIN_FS, frames on the F0_FPS grid (same as yin_track)
+    def __init__(self, sr: int, fmin=50.0, fmax=500.0, threshold=0.15):
+        self.sr, self.fmin, self.fmax, self.threshold = sr, fmin, fmax, threshold
+        self.rs = StreamResampler(sr, YIN_FS) if sr > YIN_FS else None
+        self.fs = YIN_FS if sr > YIN_FS else sr
+        self.W = int(round(F0_FRAME*self.fs/F0_REF_SR))
+        self.min_lag = max(2, int(self.fs/fmax))
+        self.max_lag = min(int(np.ceil(self.fs/fmin)), self.W - 1)
+        self.N = self.W + self.max_lag
+        self.fb = FrameBuffer(self.N, lead=self.W//2)
+        self.k = 0
+        self.f0 = []
+
+    def _start(self, k):
+        return np.round(np.asarray(k)*(F0_HOP*self.fs/F0_REF_SR)).astype(np.int64) - self.W//2
+
+    def _emit(self, k_stop: int):
+        if k_stop <= self.k:
+            return
+        ks = np.arange(self.k, k_stop)
+        est = yin_frames(self.fb.frames(self._start(ks)), self.fs, self.W,
+                         self.min_lag, self.max_lag, self.threshold)
+        est[(est < self.fmin) | (est > self.fmax)] = np.nan
+        self.f0.append(est.astype(np.float32))
+        self.k = k_stop
+        self.fb.trim(int(self._start(self.k)))
+
+    def _ready(self) -> int:
+        # number of frames whose last sample is already buffered
+        k = max(self.k, int((self.fb.end - self.N + self.W//2)*F0_REF_SR/self.fs)//F0_HOP + 1)
+        while k > self.k and self._start(k-1) + self.N > self.fb.end:
+            k -= 1
+        while self._start(k) + self.N <= self.fb.end:
+            k += 1
+        return k
+
+    def push(self, x: np.ndarray):
+        self.fb.push(self.rs.push(x) if self.rs is not None else x)
+        self._emit(self._ready())
+
+    def finish(self, n_total: int) -> np.ndarray:
+        if self.rs is not None:
+            self.fb.push(self.rs.finish())
+        self.fb.push(np.zeros(self.N, dtype=np.float32))
+        self._emit(n_f0_frames(n_total, self.sr))
+        return np.concatenate(self.f0).astype(np.float64) if self.f0 else np.zeros(0)
+
+class DdkAccumulator:
+    # DDK_SR view -> 80-1000 Hz band -> Hilbert envelope (overlap-save) -> candidate peaks + histogram
+    ROUNDS = 5                                         # candidate elimination rounds (2*ROUNDS*D of context)
+    def __init__(self, sr_in: int, margin_sec=1.0, min_dist_sec=0.05):
+        from scipy.signal import butter
+        self.rs = StreamResampler(sr_in, DDK_SR) if sr_in > DDK_SR else None
+        self.sr = sr = DDK_SR if sr_in > DDK_SR else sr_in
+        self.bp = StreamFilter(butter(4, [80/(sr/2), 1000/(sr/2)], btype="band", output="sos"), passes=2)
+        self.M = int(margin_sec*sr)
+        self.D = int(min_dist_sec*sr)
+        self.buf = FrameBuffer(1)
+        self.done = 0                                  # envelope emitted up to here (absolute)
+        self.tail = np.zeros(0, dtype=np.float32)      # envelope before `done` still needed as peak context
+        self.cut = 0                                   # peaks decided up to here (absolute)
+        self.bins = np.logspace(-8, 1, 4097)
+        self.hist = np.zeros(len(self.bins) - 1, dtype=np.int64)
+        self.n_env = 0
+        self.cand_pos, self.cand_h = [], []
+
+    def _envelope(self, stop: int, right_edge: bool):
+        # M of context on both sides (zero-padded by M against the circular wrap): the Hilbert transient
+        # is gone at the emitted samples, so the envelope does not depend on where the blocks fall
+        from scipy.signal import hilbert
+        from scipy.fft import next_fast_len
+        lo = max(self.buf.offset, self.done - self.M)
+        hi = self.buf.end if right_edge else min(self.buf.end, stop + self.M)
+        seg = self.buf.buf[lo - self.buf.offset:hi - self.buf.offset]
+        env = np.abs(hilbert(seg, N=next_fast_len(len(seg) + self.M)))[self.done - lo:stop - lo].astype(np.float32)
+        self._peaks(env, final=right_edge)
+        self.done = stop
+        self.buf.trim(self.done - self.M)
+
+    def _peaks(self, env: np.ndarray, final: bool):
+        # find_peaks(distance=D) keeps a peak unless a kept, taller peak lies within D, so a peak with no taller
+        # one within D (dominant) is always kept and the peaks it suppresses can go; dropped peaks never suppress
+        # others, so the final select_by_distance over what is left equals the one-pass result exactly.
+        # A round needs 2D of context each side.
+        from scipy.signal import find_peaks
+        from scipy.ndimage import maximum_filter1d
+        self.hist += np.histogram(np.clip(env, self.bins[0], self.bins[-1]), self.bins)[0]
+        self.n_env += len(env)
+        ext = np.concatenate([self.tail, env])
+        base = self.done - len(self.tail)
+        ctx = 2*self.ROUNDS*self.D
+        ready = len(ext) if final else len(ext) - ctx
+        pk, _ = find_peaks(ext)
+        h = ext[pk]
+        sel = np.ones(len(pk), dtype=bool)
+        if self.D > 1:
+            # each round: dominant among the remaining peaks -> drop the peaks a taller dominant one suppresses
+            wmax = lambda v: maximum_filter1d(v, 2*self.D - 1, mode="constant", cval=-np.inf)[pk]
+            top = np.full(len(ext), -np.inf, dtype=np.float32)
+            for _ in range(self.ROUNDS):
+                top[:] = -np.inf
+                top[pk[sel]] = h[sel]
+                dom = sel & (wmax(top) <= h)
+                top[:] = -np.inf
+                top[pk[dom]] = h[dom]
+                sel &= ~(wmax(top) > h)
+        sel &= (pk >= self.cut - base) & (pk < ready)
+        self.cand_pos.append((base + pk[sel]).astype(np.int64)); self.cand_h.append(h[sel])
+        self.cut = max(self.cut, base + ready)
+        self.tail = ext[max(0, self.cut - ctx - 1 - base):]
+
+    def push(self, x: np.ndarray):
+        if self.rs is not None:
+            x = self.rs.push(x)
+        if len(x):
+            self.buf.push(self.bp(x))
+        if self.buf.end - self.done >= 2*self.M:
+            self._envelope(self.buf.end - self.M, right_edge=False)
+
+    def percentile(self, q: float) -> float:
+        if self.n_env == 0:
+            return 0.0
+        c = np.cumsum(self.hist)
+        i = int(np.searchsorted(c, q/100.0*self.n_env))
+        return float(self.bins[min(i+1, len(self.bins)-1)])
+
+    def finish(self) -> Dict:
+        if self.rs is not None:
+            x = self.rs.finish()
+            if len(x):
+                self.buf.push(self.bp(x))
+        if self.buf.end > self.done:
+            self._envelope(self.buf.end, right_edge=True)
+        pos = np.concatenate(self.cand_pos) if self.cand_pos else np.zeros(0, np.int64)
+        h = np.concatenate(self.cand_h) if self.cand_h else np.zeros(0, np.float32)
+        keep = h >= self.percentile(70)
+        return ddk_from_peaks(select_by_distance(pos[keep], h[keep], self.D), self.sr)
+
+def select_by_distance(pos: np.ndarray, h: np.ndarray, dist: int) -> np.ndarray:
+    # greedy tallest-first suppression (scipy.signal.find_peaks `distance` semantics)
+    keep = np.ones(len(pos), dtype=bool)
+    for i in np.argsort(-h, kind="stable"):
+        if not keep[i]:
+            continue
+        lo, hi = np.searchsorted(pos, [pos[i] - dist + 1, pos[i] + dist])
+        keep[lo:hi] = False
+        keep[i] = True
+    return pos[keep]
+
+# -------------------------
+# Streaming pipeline
+# -------------------------
+class StreamAnalyzer:
+    # push() high-passed-on-the-fly blocks as they arrive (file reader or live recorder), finish() -> results
+    def __init__(self, sr: int):
+        from scipy.signal import butter
+        self.sr = sr
+        self.hp = StreamFilter(butter(2, 40/(sr/2), btype="highpass", output="sos"), passes=2)
+        self.vad, self.f0acc, self.ddkacc = VadAccumulator(sr), F0Accumulator(sr), DdkAccumulator(sr)
+        self.n = 0
+
+    def push(self, x: np.ndarray):
+        x = self.hp(np.clip(x, -1.0, 1.0)).astype(np.float32)
+        self.vad.push(x); self.f0acc.push(x); self.ddkacc.push(x)
+        self.n += len(x)
+
+    def finish(self) -> Dict:
+        sr, n = self.sr, self.n
+        feats = self.vad.finish(n)
+        segs = vad_from_features(feats["rms"], feats["zcr"], feats["flux"], feats["hop"])
+        pmet = pause_metrics(None, sr, segs, n_samples=n)
+        rate = syllables_from_onset(feats["onset"], feats["hop"], sr, segs)
+
+        f0 = self.f0acc.finish(n)
+        centers = f0_frame_centers(len(f0), sr)
+        f0[contains(as_intervals(segs), centers) < 0] = np.nan     # same voiced-only contract as the yin engine
+        f0met = dict(f0_stats(f0), f0_engine="yin")
+        trem = tremor_features(f0met["f0_hz"], sr_frames=F0_FPS)
+        # amplitude contour: VAD frame RMS (10 ms hop) interpolated onto the F0 frame centres
+        vc = np.arange(len(feats["rms"]))*feats["hop"]        # centred frames
+        amp = np.interp(centers, vc, feats["rms"]) if len(vc) else None
+        tmap = tremor_map(f0, F0_FPS, amp=amp, **TREMOR_MAP_PARAMS)
+        trem.update(tremor_map_summary(tmap))
+        ddk = self.ddkacc.finish()
+        pert = dict(jitter_percent=np.nan, shimmer_percent=np.nan, hnr_db=np.nan,
+                    note="perturbation not computed in streaming mode")
+        return assemble_results(pmet, f0met, pert, trem, rate, ddk, tmap)
+
+def stream_pipeline(audio_path: str, block_sec: float = 1.0) -> Dict:
+    sr = int(sf.info(audio_path).samplerate)
+    an = StreamAnalyzer(sr)
+    for blk in sf.blocks(audio_path, blocksize=int(block_sec*sr), dtype="float32", always_2d=True):
+        an.push(blk.mean(axis=1))
+    out = an.finish()
+    out["mode"] = dict(stream=True, sr=sr, block_sec=block_sec)
+    return out
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speech Test pipeline (bounded-memory streaming mode)")
+    parser.add_argument("audio", help="input WAV/FLAC file")
+    parser.add_argument("--block-sec", type=float, default=1.0, help="read block length (sec)")
+    parser.add_argument("--check", action="store_true",
+                        help="also run the in-memory path (native sr, yin) and print both")
+    args = parser.parse_args()
+
+    import tracemalloc
+    from speech_pipeline import import_dsp
+    import_dsp()                                       # peak = the analysis, not the lazy scipy / librosa imports
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = stream_pipeline(args.audio, block_sec=args.block_sec)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"=== STREAM SUMMARY === ({time.perf_counter()-t0:.1f}s, peak {peak/2**20:.1f} MiB)")
+    for k,v in result["summary"].items():
+        print(f"{k}: {v}")
+    print("SARA4(auto):", result["sara4_auto"])
+    if args.check:
+        from speech_pipeline import run_pipeline
+        tracemalloc.start()
+        ref = run_pipeline(args.audio, sr=result["mode"]["sr"], save=False, f0_engine="yin")
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"=== IN-MEMORY (peak {peak/2**20:.1f} MiB) ===")
+        for k,v in ref["summary"].items():
+            print(f"{k}: {v}  (stream {result['summary'][k]})")
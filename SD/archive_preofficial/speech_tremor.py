@@ -0,0 +1,205 @@
+# speech_tremor.py
+# Time-resolved vocal tremor (3–7 Hz) of the F0 and amplitude contours (tremor_features = one number per file)
+# - Sliding windows (default 2 s, hop 0.25 s) as one strided view of the contour -> per-window linear detrend,
+#   taper (Hann, or K DPSS tapers = multitaper average), one batched rFFT per block of WINDOW_BLOCK windows:
+#   O(n/hop * w log w) = O(n log w) for a fixed overlap; the spectra are reduced to band stats block by block,
+#   so the working set stays fixed whatever the contour length
+# - Per window: 3–7 Hz peak frequency (parabolic bin interpolation), band RMS (contour units: Hz for F0,
+#   % of the median level for amplitude), band share of the non-DC power, voiced fraction
+# - Contours on the f0_hz grid (F0_FPS); unvoiced frames interpolated like f0_stats, windows with less than
+#   min_voiced voiced frames -> NaN (tremor is measured where there is phonation)
+# - Summary: % of voiced windows with tremor (band share >= ratio_th and band RMS >= rms_th), median / IQR
+#   of their peak frequency (all voiced windows if none), median / p90 / max band RMS (+ time of the max)
+
+import argparse
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from speech_f0 import F0_FPS, F0_REF_SR, F0_FRAME, f0_frame_centers
+
+TREMOR_BAND = (3.0, 7.0)
+TREMOR_MAP_PARAMS = dict(win_sec=2.0, hop_sec=0.25, tapers=1, min_voiced=0.8)
+TREMOR_RATIO_TH = 0.5        # band share of the contour's (detrended) power
+TREMOR_F0_RMS_TH = 0.5       # Hz
+TREMOR_AMP_RMS_TH = 2.0      # % of the median level
+WINDOW_BLOCK = 512           # windows per batched rFFT (~3 MiB of spectra at the default window)
+TREMOR_MAP_COLS = ["tremor_map_peak_hz", "tremor_map_peak_iqr_hz", "tremor_map_rms_median", "tremor_map_rms_p90",
+                   "tremor_map_rms_max", "tremor_map_t_max_sec", "tremor_map_active_pct",
+                   "tremor_map_amp_rms_median", "tremor_map_amp_active_pct", "tremor_map_voiced_windows"]
+
+# -------------------------
+# Contours
+# -------------------------
+def fill_unvoiced(x: np.ndarray, voiced: np.ndarray) -> np.ndarray:
+    idx = np.arange(len(x))
+    return np.interp(idx, idx[voiced], x[voiced]) if voiced.any() else np.zeros(len(x))
+
+def amplitude_contour(y: np.ndarray, sr: int, n_frames: int, block: Optional[int] = None) -> np.ndarray:
+    # RMS over the F0 analysis window centred on each f0_hz frame (cumulative sum: O(n))
+    # block: running sum over blocks of samples, read at the window edges (no full-length float64 cumsum)
+    half = max(1, int(round(F0_FRAME*sr/F0_REF_SR))//2)
+    c = f0_frame_centers(n_frames, sr)
+    lo, hi = np.clip(c - half, 0, len(y)), np.clip(c + half, 0, len(y))
+    if block is None:
+        cs = np.concatenate([[0.0], np.cumsum(np.square(y, dtype=np.float64))])
+        return np.sqrt((cs[hi] - cs[lo])/np.maximum(hi - lo, 1))
+    q = np.concatenate([lo, hi])                                    # cs[q] = sum(y[:q]**2)
+    order = np.argsort(q, kind="stable")
+    qs, cs = q[order], np.zeros(len(q))
+    carry = 0.0
+    for a in range(0, len(y), block):
+        part = np.cumsum(np.square(y[a:a + block], dtype=np.float64))
+        i, j = np.searchsorted(qs, [a, a + len(part)], side="right")
+        cs[order[i:j]] = carry + part[qs[i:j] - a - 1]
+        carry += part[-1]
+    return np.sqrt((cs[len(c):] - cs[:len(c)])/np.maximum(hi - lo, 1))
+
+# -------------------------
+# Batched window spectra
+# -------------------------
+def window_spectra(x: np.ndarray, fs: float, win_sec: float = 2.0, hop_sec: float = 0.25, tapers: int = 1,
+                   pad: int = 2):
+    # -> start indices (W,), freqs (F,), one-sided PSD (W, F) in units²/Hz, averaged over tapers
+    from scipy.fft import rfft, rfftfreq, next_fast_len
+    w = int(round(win_sec*fs))
+    hop = max(1, int(round(hop_sec*fs)))
+    if len(x) < w or w < 8:
+        return np.zeros(0, dtype=np.int64), rfftfreq(max(w, 8), 1.0/fs), np.zeros((0, max(w, 8)//2 + 1))
+    frames = sliding_window_view(x, w)[::hop]                          # (W, w) strided view, no copy
+    t = np.arange(w) - (w - 1)/2
+    slope = frames @ t/(t @ t)
+    frames = frames - frames.mean(axis=1, keepdims=True) - slope[:, None]*t   # linear detrend
+    if tapers > 1:
+        from scipy.signal.windows import dpss
+        tap = dpss(w, NW=(tapers + 1)/2, Kmax=tapers)                   # (K, w), unit energy
+    else:
+        tap = np.hanning(w + 1)[None, :-1]                              # periodic Hann, as scipy.signal.welch
+        tap = tap/np.sqrt(np.sum(tap**2))
+    n_fft = next_fast_len(pad*w, real=True)
+    X = rfft(frames[:, None, :]*tap[None, :, :], n=n_fft, axis=-1)     # (W, K, F)
+    psd = np.mean(np.abs(X)**2, axis=1)/fs
+    psd[:, 1:-1] *= 2.0                                                # one-sided
+    return np.arange(len(frames))*hop, rfftfreq(n_fft, 1.0/fs), psd
+
+def band_stats(freqs: np.ndarray, psd: np.ndarray, lo: float = TREMOR_BAND[0], hi: float = TREMOR_BAND[1]):
+    # -> peak_hz, band_rms, band_ratio per window
+    df = freqs[1] - freqs[0]
+    band = np.flatnonzero((freqs >= lo) & (freqs <= hi))
+    P = psd[:, band]
+    k = np.argmax(P, axis=1)
+    rows = np.arange(len(P))
+    a = P[rows, np.maximum(k - 1, 0)]
+    b = P[rows, k]
+    c = P[rows, np.minimum(k + 1, P.shape[1] - 1)]
+    den = a - 2*b + c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = np.where((den < 0) & (k > 0) & (k < P.shape[1] - 1), 0.5*(a - c)/den, 0.0)
+        peak = freqs[band][k] + delta*df
+        band_pow = P.sum(axis=1)*df
+        total = psd[:, 1:].sum(axis=1)*df
+        ratio = band_pow/total
+    peak[b <= 0] = np.nan
+    return peak, np.sqrt(band_pow), ratio
+
+def window_band_stats(x: np.ndarray, fs: float, win_sec: float = 2.0, hop_sec: float = 0.25, tapers: int = 1,
+                      band=TREMOR_BAND, block: int = WINDOW_BLOCK):
+    # window_spectra + band_stats over blocks of windows -> start indices, peak_hz, band_rms, band_ratio (W,)
+    w = int(round(win_sec*fs))
+    hop = max(1, int(round(hop_sec*fs)))
+    n_win = (len(x) - w)//hop + 1 if len(x) >= w >= 8 else 0
+    parts = []
+    for b0 in range(0, n_win, block):
+        b1 = min(n_win, b0 + block)
+        _, freqs, psd = window_spectra(x[b0*hop:(b1 - 1)*hop + w], fs, win_sec, hop_sec, tapers)
+        parts.append(band_stats(freqs, psd, *band))
+    stats = [np.concatenate(p) for p in zip(*parts)] if parts else [np.zeros(0)]*3
+    return (np.arange(n_win, dtype=np.int64)*hop, *stats)
+
+# -------------------------
+# Tremor map
+# -------------------------
+def tremor_map(f0: np.ndarray, fs: float = F0_FPS, amp: Optional[np.ndarray] = None,
+               win_sec: float = 2.0, hop_sec: float = 0.25, tapers: int = 1, min_voiced: float = 0.8,
+               band=TREMOR_BAND) -> Dict:
+    # f0: raw track (Hz, NaN / <= 0 unvoiced); amp: level contour on the same grid (optional)
+    f0 = np.asarray(f0, dtype=np.float64)
+    voiced = np.isfinite(f0) & (f0 > 0)
+    starts, peak, rms, ratio = window_band_stats(fill_unvoiced(f0, voiced), fs, win_sec, hop_sec, tapers, band)
+    w = int(round(win_sec*fs))
+    cv = np.concatenate([[0], np.cumsum(voiced)])
+    vfrac = (cv[starts + w] - cv[starts])/w if len(starts) else np.zeros(0)
+    ok = vfrac >= min_voiced
+    out = dict(t=(starts + (w - 1)/2)/fs, voiced_frac=vfrac)
+    out.update(f0_peak_hz=np.where(ok, peak, np.nan), f0_rms_hz=np.where(ok, rms, np.nan),
+               f0_ratio=np.where(ok, ratio, np.nan))
+    if amp is not None and len(starts):
+        amp = np.asarray(amp, dtype=np.float64)[:len(f0)]
+        level = np.median(amp[voiced]) if voiced.any() else np.nan
+        rel = 100.0*fill_unvoiced(amp, voiced)/level if level > 0 else np.zeros(len(amp))
+        _, peak, rms, ratio = window_band_stats(rel, fs, win_sec, hop_sec, tapers, band)
+        out.update(amp_peak_hz=np.where(ok, peak, np.nan), amp_rms_pct=np.where(ok, rms, np.nan),
+                   amp_ratio=np.where(ok, ratio, np.nan))
+    return out
+
+def tremor_map_summary(m: Dict, ratio_th: float = TREMOR_RATIO_TH, f0_rms_th: float = TREMOR_F0_RMS_TH,
+                       amp_rms_th: float = TREMOR_AMP_RMS_TH) -> Dict:
+    ok = np.isfinite(m["f0_rms_hz"])
+    n = int(ok.sum())
+    s = dict.fromkeys(TREMOR_MAP_COLS, float("nan"))
+    s["tremor_map_voiced_windows"] = n
+    if n == 0:
+        return s
+    pk, rms = m["f0_peak_hz"][ok], m["f0_rms_hz"][ok]
+    active = (m["f0_ratio"][ok] >= ratio_th) & (rms >= f0_rms_th)
+    q1, med, q3 = np.nanpercentile(pk[active] if active.any() else pk, [25, 50, 75])   # peak of the tremor windows
+    i = int(np.argmax(rms))
+    s.update(tremor_map_peak_hz=float(med), tremor_map_peak_iqr_hz=float(q3 - q1),
+             tremor_map_rms_median=float(np.median(rms)), tremor_map_rms_p90=float(np.percentile(rms, 90)),
+             tremor_map_rms_max=float(rms[i]), tremor_map_t_max_sec=float(m["t"][ok][i]),
+             tremor_map_active_pct=float(100.0*np.mean(active)))
+    if "amp_rms_pct" in m:
+        arms = m["amp_rms_pct"][ok]
+        s.update(tremor_map_amp_rms_median=float(np.median(arms)),
+                 tremor_map_amp_active_pct=float(100.0*np.mean((m["amp_ratio"][ok] >= ratio_th)
+                                                               & (arms >= amp_rms_th))))
+    return s
+
+# -------------------------
+# CLI: synthetic check (tremor in the second half only) + timing vs a per-window loop
+# -------------------------
+if __name__ == "__main__":
+    import time
+    from scipy.signal import welch
+    from scipy.fft import next_fast_len
+    parser = argparse.ArgumentParser(description="Time-resolved tremor map (synthetic check)")
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--tapers", type=int, default=1)
+    args = parser.parse_args()
+
+    fs = F0_FPS
+    t = np.arange(int(args.minutes*60*fs))/fs
+    rng = np.random.default_rng(0)
+    late = t >= t[-1]/2
+    f0 = 140.0 + 0.3*rng.standard_normal(len(t)) + np.where(late, 140*0.03*np.sin(2*np.pi*5.0*t), 0.0)
+    f0[(t % 7.0) > 6.0] = np.nan                                    # 1 s pause every 7 s
+    amp = 1.0 + np.where(late, 0.05*np.sin(2*np.pi*4.0*t), 0.0) + 0.005*rng.standard_normal(len(t))
+    t0 = time.perf_counter()
+    m = tremor_map(f0, fs, amp=amp, tapers=args.tapers)
+    sec = time.perf_counter() - t0
+    s = tremor_map_summary(m)
+    early = m["t"] < t[-1]/2 - 1
+    print(f"{len(t)} frames ({args.minutes:g} min), {len(m['t'])} windows: {1000*sec:.1f} ms")
+    print(f"  late half : peak {np.nanmedian(m['f0_peak_hz'][~early]):.2f} Hz (true 5.00), "
+          f"rms {np.nanmedian(m['f0_rms_hz'][~early]):.2f} Hz (true {140*0.03/np.sqrt(2):.2f}), "
+          f"amp peak {np.nanmedian(m['amp_peak_hz'][~early]):.2f} Hz, amp rms {np.nanmedian(m['amp_rms_pct'][~early]):.2f} % "
+          f"(true {5/np.sqrt(2):.2f})")
+    print(f"  early half: rms {np.nanmedian(m['f0_rms_hz'][early]):.2f} Hz")
+    print("  summary:", {k: round(v, 3) for k, v in s.items()})
+    w, hop = int(round(2.0*fs)), int(round(0.25*fs))
+    ff = fill_unvoiced(f0, np.isfinite(f0))
+    t0 = time.perf_counter()
+    for i in range(0, len(ff) - w + 1, hop):
+        welch(ff[i:i + w], fs=fs, window="hann", nperseg=w, nfft=next_fast_len(2*w), detrend="linear")
+    print(f"  per-window scipy.signal.welch loop: {1000*(time.perf_counter() - t0):.1f} ms")
@@ -0,0 +1,362 @@
+# speech_worker.py
+# Warm resident analysis worker for speech_pipeline + thin CLI client
+# - serve : one long-lived process imports librosa / scipy / Praat once, runs a short warm-up clip
+#           (first-call JIT, FFT plans, Praat worker start) and then takes jobs on a local socket
+#           (Unix socket where available, else 127.0.0.1:PORT); jobs run one at a time in arrival order.
+#           A connection idle for --idle-timeout sec is dropped so it cannot hold the worker. TCP has no
+#           file permissions: the worker writes a random token to a user-only file and every request must
+#           carry it. --save writes to the client's directory on the (same-user) Unix socket; over TCP, or
+#           whenever --out-root is given, only under --out-root (TCP default: the worker's start directory)
+# - run   : thin client (stdlib only, no numpy / librosa import) -> same printout as speech_pipeline;
+#           no worker listening -> runs in-process (cold) with a note
+# - ping / stop : worker status (pid, uptime, jobs, cache hits) / shut down
+# - bench : per-clip latency, cold (fresh `python speech_pipeline.py clip`) vs warm (client -> worker),
+#           on ST1-style 5 s clips @ 16 kHz
+# Protocol: one JSON object per line each way. Request {"audio": abs path, "f0_engine", "sr", "praat_mode", "low_mem",
+# "save", "out_dir", "metrics"[, "token"]} -> {"status": ok|error, "summary", "sara4_auto", "tremor", "elapsed_sec"
+# (+ "metrics": full speech_metrics.json content)}. Commands: {"cmd": "ping"|"stop"}.
+
+import os, sys, json, time, socket, secrets, tempfile, argparse, subprocess
+from typing import List, Dict, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ADDR = (os.path.join(tempfile.gettempdir(), f"speech_worker_{os.getuid()}.sock")
+                if hasattr(socket, "AF_UNIX") and hasattr(os, "getuid") else "127.0.0.1:8765")
+JOB_KEYS = ("f0_engine", "sr", "praat_mode", "low_mem")
+IDLE_TIMEOUT = 30.0
+
+# -------------------------
+# Addressing
+# -------------------------
+def parse_addr(addr: str):
+    # "host:port" -> TCP (localhost only), anything else -> Unix socket path
+    host, _, port = addr.rpartition(":")
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, addr
+
+def token_path(addr: str) -> str:
+    # TCP only: shared secret next to where a Unix socket would live (user temp dir, mode 0600)
+    return os.path.join(tempfile.gettempdir(), f"speech_worker_{parse_addr(addr)[1][1]}.token")
+
+def read_token(addr: str) -> Optional[str]:
+    if parse_addr(addr)[0] != socket.AF_INET:
+        return None
+    try:
+        with open(token_path(addr), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def write_token(addr: str) -> str:
+    token = secrets.token_urlsafe(24)
+    p = token_path(addr)
+    if os.path.exists(p):
+        os.remove(p)
+    fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+def connect(addr: str, timeout: Optional[float] = None) -> socket.socket:
+    fam, a = parse_addr(addr)
+    s = socket.socket(fam, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    try:
+        s.connect(a)
+    except OSError:
+        s.close()
+        raise
+    return s
+
+def listen(addr: str) -> socket.socket:
+    fam, a = parse_addr(addr)
+    if fam == socket.AF_UNIX and os.path.exists(a):
+        try:
+            connect(addr, timeout=1.0).close()
+            raise SystemExit(f"a worker is already listening on {addr}")
+        except OSError:
+            os.remove(a)                   # stale socket file from a killed worker
+    s = socket.socket(fam, socket.SOCK_STREAM)
+    if fam == socket.AF_INET:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind(a)
+    if fam == socket.AF_UNIX:
+        os.chmod(a, 0o600)                 # same-user clients only
+    s.listen(16)
+    return s
+
+# -------------------------
+# Client (stdlib only)
+# -------------------------
+def request(addr: str, msgs: List[Dict], timeout: Optional[float] = None) -> List[Dict]:
+    # one connection, one JSON line per message, replies in order
+    token = read_token(addr)
+    with connect(addr, timeout) as s, s.makefile("rw", encoding="utf-8") as f:
+        out = []
+        for m in msgs:
+            f.write(json.dumps(dict(m, token=token) if token else m) + "\n")
+            f.flush()
+            line = f.readline()
+            if not line:
+                raise ConnectionError("worker closed the connection")
+            out.append(json.loads(line))
+    return out
+
+def job(audio: str, **kw) -> Dict:
+    return dict(audio=os.path.abspath(audio), **{k: v for k, v in kw.items() if v is not None})
+
+def run_local(msg: Dict) -> Dict:
+    # cold fallback: same reply shape, computed in this process
+    from speech_pipeline import run_pipeline
+    return handle_job(msg, run_pipeline)
+
+def print_result(audio: str, r: Dict):
+    if r.get("status") != "ok":
+        print(f"{audio}: {r.get('error')}")
+        return
+    print(f"=== SUMMARY === {audio} ({r['elapsed_sec']:.3f}s)")
+    for k, v in r["summary"].items():
+        print(f"{k}: {v}")
+    print("SARA4(auto):", r["sara4_auto"])
+
+# -------------------------
+# Worker
+# -------------------------
+def confined(out_dir: Optional[str], root: str) -> str:
+    # out_dir (relative to root) must resolve inside root
+    root = os.path.realpath(root)
+    p = os.path.realpath(os.path.join(root, out_dir or "."))
+    if os.path.commonpath([root, p]) != root:
+        raise PermissionError(f"out_dir {out_dir!r} is outside the worker's out root {root}")
+    return p
+
+def handle_job(msg: Dict, run_pipeline, cache=None, praat_workers: int = 1,
+               praat_timeout: float = 30.0, defaults: Optional[Dict] = None, out_root: Optional[str] = None) -> Dict:
+    # never raises: a bad file is an error reply, the worker keeps serving
+    # out_root=None (in-process fallback, Unix socket without --out-root): out_dir is used as given
+    from speech_pipeline import save_outputs, to_jsonable
+    t0 = time.perf_counter()
+    kw = dict(defaults or {}, **{k: msg[k] for k in JOB_KEYS if msg.get(k) is not None})
+    try:
+        out_dir = confined(msg.get("out_dir"), out_root) if out_root else msg.get("out_dir") or "."
+        out = run_pipeline(msg["audio"], save=False, cache=cache, praat_workers=praat_workers,
+                           praat_timeout=praat_timeout, **kw)
+        if msg.get("save"):
+            save_outputs(out["summary"], out, out_dir=out_dir)
+        r = dict(status="ok", summary=out["summary"], sara4_auto=out["sara4_auto"],
+                 tremor={k: v for k, v in out["tremor"].items() if k.startswith("tremor")})
+        if msg.get("metrics"):
+            r["metrics"] = out
+    except Exception as e:
+        r = dict(status="error", error=f"{type(e).__name__}: {e}")
+    r["elapsed_sec"] = round(time.perf_counter() - t0, 4)
+    return to_jsonable(r)
+
+def warm_up(run_pipeline, f0_engine: str, praat_mode: str, praat_workers: int, praat_timeout: float,
+            low_mem: bool = False) -> float:
+    # one short synthetic clip through every stage: imports, numba JIT (pyin), FFT plans, Praat pool
+    import soundfile as sf
+    from speech_f0 import synth_vowel
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as d:
+        p = os.path.join(d, "warmup.wav")
+        sf.write(p, synth_vowel(16000, 2.0), 16000)
+        run_pipeline(p, save=False, f0_engine=f0_engine, praat_mode=praat_mode,
+                     praat_workers=praat_workers, praat_timeout=praat_timeout, low_mem=low_mem)
+    return time.perf_counter() - t0
+
+def serve(addr: str = DEFAULT_ADDR, f0_engine: str = "pyin", praat_mode: str = "concat",
+          praat_workers: int = 1, praat_timeout: float = 30.0, cache_dir: Optional[str] = None,
+          cache_max_mb: float = 2048, warm: bool = True, low_mem: bool = False,
+          idle_timeout: float = IDLE_TIMEOUT, out_root: Optional[str] = None):
+    t_start = time.perf_counter()
+    tcp = parse_addr(addr)[0] == socket.AF_INET
+    # Unix socket (0600): the client is the same user, its directory is fine unless a root is set
+    out_root = os.path.abspath(out_root or os.getcwd()) if (tcp or out_root) else None
+    from speech_pipeline import run_pipeline
+    from speech_cache import FeatureCache
+    cache = FeatureCache(cache_dir, max_mb=cache_max_mb) if cache_dir else None
+    defaults = dict(f0_engine=f0_engine, praat_mode=praat_mode, low_mem=low_mem)
+    warm_sec = warm_up(run_pipeline, f0_engine, praat_mode, praat_workers, praat_timeout, low_mem) if warm else 0.0
+    srv = listen(addr)
+    token = write_token(addr) if tcp else None
+    print(f"speech worker pid {os.getpid()} on {addr} (ready in {time.perf_counter() - t_start:.2f}s, "
+          f"warm-up {warm_sec:.2f}s)", flush=True)
+    jobs, stop = 0, False
+    try:
+        while not stop:
+            conn, _ = srv.accept()
+            conn.settimeout(idle_timeout)      # applies to waiting for the client, not to the analysis
+            with conn, conn.makefile("rw", encoding="utf-8") as f:
+                while True:
+                    try:
+                        line = f.readline()
+                    except OSError:            # idle past the timeout / reset: next client
+                        break
+                    if not line:
+                        break
+                    try:
+                        msg = json.loads(line)
+                    except ValueError as e:
+                        msg, r = {}, dict(status="error", error=f"bad request: {e}")
+                    else:
+                        cmd = msg.get("cmd", "job")
+                        if token and not secrets.compare_digest(str(msg.get("token", "")), token):
+                            r, cmd = dict(status="error", error="bad or missing token"), None
+                        elif cmd == "job":
+                            r = handle_job(msg, run_pipeline, cache, praat_workers, praat_timeout, defaults,
+                                           out_root)
+                            jobs += 1
+                        elif cmd in ("ping", "stop"):
+                            r = dict(status="ok", pid=os.getpid(), addr=addr, jobs=jobs,
+                                     uptime_sec=round(time.perf_counter() - t_start, 1), defaults=defaults,
+                                     cache=dict(dir=cache_dir, hits=cache.hits, misses=cache.misses) if cache else None)
+                            stop = cmd == "stop"
+                        elif cmd is not None:
+                            r = dict(status="error", error=f"unknown cmd {cmd!r}")
+                    try:
+                        f.write(json.dumps(r) + "\n")
+                        f.flush()
+                    except OSError:
+                        break                  # client went away; the worker keeps serving
+                    if stop:
+                        break
+    finally:
+        srv.close()
+        fam, a = parse_addr(addr)
+        if fam == socket.AF_UNIX and os.path.exists(a):
+            os.remove(a)
+        if token and os.path.exists(token_path(addr)):
+            os.remove(token_path(addr))
+
+# -------------------------
+# Cold vs warm benchmark
+# -------------------------
+def wait_ready(addr: str, proc: subprocess.Popen, timeout: float = 300.0) -> float:
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"worker exited with code {proc.returncode}")
+        try:
+            request(addr, [dict(cmd="ping")], timeout=5.0)
+            return time.perf_counter() - t0
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"worker not ready after {timeout:.0f}s")
+
+def bench(clips: List[str], f0_engine: str = "yin", runs: int = 3, sr: int = 16000, dur: float = 5.0) -> Dict:
+    # cold = python speech_pipeline.py <clip> as a fresh process (what ST1 / a shell loop pays per clip);
+    # warm = speech_worker.py run <clip> against a resident worker (client process included)
+    tmp = tempfile.mkdtemp(prefix="speech_worker_bench_")
+    if not clips:
+        import soundfile as sf
+        from speech_bench import gen_speech_pauses
+        for i in range(3):
+            p = os.path.join(tmp, f"SD_BENCH{i}_20250101.wav")
+            sf.write(p, gen_speech_pauses(sr, dur, seed=i)[0], sr)
+            clips.append(p)
+    addr = os.path.join(tmp, "w.sock") if hasattr(socket, "AF_UNIX") else "127.0.0.1:8766"
+    py, me = sys.executable, os.path.join(HERE, "speech_worker.py")
+
+    def timed(cmd: List[str]) -> float:
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - t0
+
+    res = dict(clips=len(clips), runs=runs, f0_engine=f0_engine)
+    res["help_sec"] = min(timed([py, os.path.join(HERE, "speech_pipeline.py"), "--help"]) for _ in range(3))
+    cold = [timed([py, os.path.join(HERE, "speech_pipeline.py"), c, "--f0-engine", f0_engine])
+            for _ in range(runs) for c in clips]
+    proc = subprocess.Popen([py, me, "serve", "--addr", addr, "--f0-engine", f0_engine], cwd=tmp,
+                            stdout=subprocess.DEVNULL)
+    try:
+        res["worker_ready_sec"] = wait_ready(addr, proc)
+        warm = [timed([py, me, "run", c, "--addr", addr, "--f0-engine", f0_engine, "--save"])
+                for _ in range(runs) for c in clips]
+        t0 = time.perf_counter()
+        rep = request(addr, [job(c, f0_engine=f0_engine) for _ in range(runs) for c in clips])
+        res["in_worker_sec"] = sorted(r["elapsed_sec"] for r in rep)[len(rep)//2]
+        res["warm_batch_sec_per_clip"] = (time.perf_counter() - t0)/len(rep)
+        request(addr, [dict(cmd="stop")])
+        proc.wait(timeout=30)
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+        proc.wait(timeout=30)
+    med = lambda v: sorted(v)[len(v)//2]
+    res.update(cold_median_sec=med(cold), cold_min_sec=min(cold), warm_median_sec=med(warm), warm_min_sec=min(warm))
+    res["speedup"] = res["cold_median_sec"]/res["warm_median_sec"]
+    return res
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm resident speech_pipeline worker + thin client")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve", help="start a worker (foreground)")
+    p.add_argument("--addr", default=DEFAULT_ADDR, help="Unix socket path or host:port (localhost)")
+    p.add_argument("--f0-engine", default="pyin", help="default F0 engine (pyin / yin)")
+    p.add_argument("--praat-mode", default="concat")
+    p.add_argument("--praat-workers", type=int, default=1)
+    p.add_argument("--praat-timeout", type=float, default=30.0)
+    p.add_argument("--cache", default=None, help="per-stage feature cache directory")
+    p.add_argument("--cache-max-mb", type=float, default=2048)
+    p.add_argument("--no-warmup", action="store_true")
+    p.add_argument("--low-mem", action="store_true", help="float32 low-memory mode by default (more workers per node)")
+    p.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                   help="drop a connection that sends nothing for this long (sec)")
+    p.add_argument("--out-root", default=None,
+                   help="--save output must stay under here (TCP default: cwd; Unix socket default: "
+                        "the client's directory, unconfined)")
+    p = sub.add_parser("run", help="analyse clips on the worker (in-process fallback if none is running)")
+    p.add_argument("audio", nargs="+")
+    p.add_argument("--addr", default=DEFAULT_ADDR)
+    p.add_argument("--f0-engine", default=None, help="override the worker's default engine")
+    p.add_argument("--sr", type=int, default=None)
+    p.add_argument("--praat-mode", default=None)
+    p.add_argument("--low-mem", action="store_true", help="float32 low-memory mode for these clips")
+    p.add_argument("--save", action="store_true", help="write speech_summary.csv / speech_metrics.json here")
+    p.add_argument("--json", action="store_true", help="print the raw replies")
+    for name in ("ping", "stop"):
+        sub.add_parser(name).add_argument("--addr", default=DEFAULT_ADDR)
+    p = sub.add_parser("bench", help="cold vs warm per-clip latency")
+    p.add_argument("audio", nargs="*", help="clips (default: three synthetic 5 s clips @ 16 kHz)")
+    p.add_argument("--f0-engine", default="yin")
+    p.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        serve(args.addr, args.f0_engine, args.praat_mode, args.praat_workers, args.praat_timeout,
+              args.cache, args.cache_max_mb, warm=not args.no_warmup, low_mem=args.low_mem,
+              idle_timeout=args.idle_timeout, out_root=args.out_root)
+    elif args.cmd == "run":
+        msgs = [job(a, f0_engine=args.f0_engine, sr=args.sr, praat_mode=args.praat_mode, low_mem=args.low_mem or None,
+                    save=args.save or None, out_dir=os.getcwd() if args.save else None) for a in args.audio]
+        try:
+            replies = request(args.addr, msgs)
+        except OSError:
+            print(f"(no worker on {args.addr}: running in-process, cold)", file=sys.stderr)
+            replies = [run_local(m) for m in msgs]
+        for a, r in zip(args.audio, replies):
+            if args.json:
+                print(json.dumps(r))
+            else:
+                print_result(a, r)
+        sys.exit(0 if all(r.get("status") == "ok" for r in replies) else 1)
+    elif args.cmd in ("ping", "stop"):
+        try:
+            print(json.dumps(request(args.addr, [dict(cmd=args.cmd)], timeout=10.0)[0], indent=2))
+        except OSError as e:
+            sys.exit(f"no worker on {args.addr} ({e})")
+    else:
+        r = bench(list(args.audio), args.f0_engine, args.runs)
+        print(f"{r['clips']} clips x {r['runs']} runs, f0 engine {r['f0_engine']}")
+        print(f"  speech_pipeline.py --help      : {r['help_sec']:.3f}s")
+        print(f"  cold  (fresh process per clip) : median {r['cold_median_sec']:.3f}s, min {r['cold_min_sec']:.3f}s")
+        print(f"  warm  (client -> worker)       : median {r['warm_median_sec']:.3f}s, min {r['warm_min_sec']:.3f}s "
+              f"(x{r['speedup']:.1f})")
+        print(f"  warm, one connection           : {r['warm_batch_sec_per_clip']:.3f}s/clip "
+              f"(analysis alone {r['in_worker_sec']:.3f}s)")
+        print(f"  worker start + warm-up         : {r['worker_ready_sec']:.2f}s (paid once)")
@@ -0,0 +1,61 @@
+# test_speech_asr.py
+# IntelligibilityService with a stand-in transcriber (no Whisper here): batches loaded in duration order,
+# cache hits skip loading, long clips flagged by their 30 s window count; no speech_batch import side effects
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import speech_asr
+from speech_asr import ASR_SR, IntelligibilityService, asr_windows, n_windows
+from speech_cache import FeatureCache
+
+class FakeTranscriber:
+    name, language, batch_size = "fake", "en", 2
+
+    def __init__(self):
+        self.batches = []
+
+    def transcribe(self, clips):
+        self.batches.append([len(c)/ASR_SR for c in clips])
+        return ["the quick brown fox"]*len(clips)
+
+@pytest.fixture
+def clips(tmp_path):
+    paths = []
+    for i, sec in enumerate([3.0, 1.0, 31.0, 2.0, 0.5]):
+        p = str(tmp_path/f"SD_P00{i}_20251026_14170{i}.wav")
+        sf.write(p, np.zeros(int(sec*ASR_SR), dtype=np.float32), ASR_SR)
+        paths.append(p)
+    return paths
+
+def test_batches_in_duration_order(clips, tmp_path):
+    fake = FakeTranscriber()
+    svc = IntelligibilityService(fake, cache=FeatureCache(str(tmp_path/"cache")))
+    rows = svc.score(clips, ["the quick brown fox"]*len(clips))
+    assert fake.batches == [[0.5, 1.0], [2.0, 3.0], [31.0]]
+    assert [r["asr_windows"] for r in rows] == [1, 1, 2, 1, 1]
+    assert svc.throughput()["long_clips"] == 1
+    assert all(r["wer"] == 0.0 for r in rows) and rows[0]["record_id"] == "SD_P000_20251026_141700"
+    fake.batches.clear()
+    svc.score(clips, ["the quick brown fox"]*len(clips))
+    assert fake.batches == [] and svc.stats["cached"] == len(clips)
+
+def test_windows():
+    y = np.arange(int(65*ASR_SR), dtype=np.float32)
+    w = asr_windows(y)
+    assert [len(x)/ASR_SR for x in w] == [30.0, 30.0, 5.0] and np.array_equal(np.concatenate(w), y)
+    assert len(asr_windows(np.zeros(0, np.float32))) == 1
+    assert (n_windows(0.0), n_windows(30.0), n_windows(30.5), n_windows(65.0)) == (1, 1, 2, 3)
+
+def test_no_batch_env_pinning():
+    code = "import os, sys, speech_asr; print('speech_batch' in sys.modules, os.environ.get('OMP_NUM_THREADS'))"
+    env = {k: v for k, v in os.environ.items() if k != "OMP_NUM_THREADS"}
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(speech_asr.__file__), env=env,
+                         capture_output=True, text=True, check=True).stdout.split()
+    assert out == ["False", "None"]
+    assert speech_asr.parse_record_name.__module__ == "cmq_records"
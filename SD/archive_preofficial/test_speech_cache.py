@@ -0,0 +1,82 @@
+# test_speech_cache.py
+# FeatureCache: npz round trip, parameter / content keys, incremental size index vs the disk, LRU eviction;
+# run_pipeline served from the cache gives the computed result
+
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from speech_bench import gen_speech_pauses
+from speech_cache import EVICT_TO, FeatureCache, StageRunner
+from speech_pipeline import run_pipeline
+
+def _disk_bytes(cache):
+    return sum(s for _, s, _ in cache.entries())
+
+def test_round_trip_and_keys(tmp_path):
+    cache = FeatureCache(str(tmp_path/"c"))
+    value = dict(f0=np.linspace(80, 200, 50), segs=np.array([[0, 10], [20, 30]], dtype=np.int64),
+                 rate=4.5, n=np.int64(3), engine="yin", missing=None)
+    cache.put("ab"*32, "f0", dict(engine="yin"), value)
+    out = cache.get("ab"*32, "f0", dict(engine="yin"))
+    assert set(out) == set(value) and out["rate"] == 4.5 and out["n"] == 3 and out["missing"] is None
+    assert np.array_equal(out["f0"], value["f0"]) and out["segs"].dtype == np.int64
+    assert cache.get("ab"*32, "f0", dict(engine="pyin")) is None          # other params
+    assert cache.get("cd"*32, "f0", dict(engine="yin")) is None           # other audio
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_audio_key_follows_content(tmp_path):
+    cache = FeatureCache(str(tmp_path/"c"))
+    a, b = str(tmp_path/"a.wav"), str(tmp_path/"b.wav")
+    y = np.zeros(1600, dtype=np.float32)
+    sf.write(a, y, 16000)
+    sf.write(b, y, 16000)
+    assert cache.audio_key(a) == cache.audio_key(b)                       # same bytes, other name
+    sf.write(b, y + 0.01, 16000)
+    assert cache.audio_key(a) != cache.audio_key(b)
+
+def test_size_index_and_lru_eviction(tmp_path):
+    cache = FeatureCache(str(tmp_path/"c"), max_mb=0.25)
+    key = "ef"*32
+    blob = lambda i: dict(x=np.full(4096, i, dtype=np.float64))           # ~32 KiB per entry
+    for i in range(6):
+        cache.put(key, "s", dict(i=i), blob(i))
+    assert cache.size() == _disk_bytes(cache)
+    cache.put(key, "s", dict(i=0), dict(x=np.zeros(10)))                  # replace: old size released
+    assert cache.size() == _disk_bytes(cache)
+    for i in range(6):                                                    # LRU order = i ...
+        os.utime(cache._path(key, "s", dict(i=i)), (1e9 + i, 1e9 + i))
+    assert cache.get(key, "s", dict(i=1)) is not None                     # ... except i=1, touched now
+    for i in range(6, 12):
+        cache.put(key, "s", dict(i=i), blob(i))
+    assert _disk_bytes(cache) <= cache.max_bytes and cache.size() == _disk_bytes(cache)
+    assert cache.get(key, "s", dict(i=11)) is not None                    # newest kept
+    assert cache.get(key, "s", dict(i=1)) is not None                     # recently read kept
+    assert cache.get(key, "s", dict(i=2)) is None                         # old, untouched entries gone
+    assert cache.size() >= EVICT_TO*cache.max_bytes - 40_000               # evicted down to the low-water mark
+    assert FeatureCache(cache.root, max_mb=0.25).size() == cache.size()   # fresh scan agrees
+
+def test_stage_runner_keep(tmp_path):
+    clip = str(tmp_path/"a.wav")
+    sf.write(clip, np.zeros(1600, dtype=np.float32), 16000)
+    cache = FeatureCache(str(tmp_path/"c"))
+    calls = []
+    run = StageRunner(cache, clip, dict(sr="native"))
+    compute = lambda: calls.append(1) or dict(v=len(calls))
+    assert run("s", {}, compute, keep=lambda v: False)["v"] == 1
+    assert run("s", {}, compute)["v"] == 2
+    assert run("s", {}, compute)["v"] == 2 and len(calls) == 2
+
+def test_pipeline_from_cache(tmp_path):
+    sr = 16000
+    clip = str(tmp_path/"clip.wav")
+    sf.write(clip, gen_speech_pauses(sr, 5.0)[0], sr)
+    cache = FeatureCache(str(tmp_path/"c"))
+    ref = run_pipeline(clip, save=False, f0_engine="yin", cache=cache, praat_workers=0)
+    misses = cache.misses
+    got = run_pipeline(clip, save=False, f0_engine="yin", cache=cache, praat_workers=0)
+    assert cache.misses - misses <= 1                                      # perturbation not kept without parselmouth
+    for k, v in ref["summary"].items():
+        assert v == got["summary"][k] or (isinstance(v, float) and np.isnan(v) and np.isnan(got["summary"][k])), k
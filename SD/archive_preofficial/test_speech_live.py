@@ -0,0 +1,30 @@
+# test_speech_live.py
+# Live recorder (fake input, no pacing): final summary = stream_pipeline whatever the update interval
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from speech_bench import gen_ddk_train, gen_speech_pauses
+from speech_live import LiveRecorder
+from speech_stream import stream_pipeline
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    sr = 16000
+    y = np.concatenate([gen_speech_pauses(sr, 6.0)[0], gen_ddk_train(sr, 6.0, rate=7.0)[0]])
+    path = str(tmp_path_factory.mktemp("live")/"clip.wav")
+    sf.write(path, y, sr)
+    return path
+
+@pytest.mark.parametrize("update_sec", [0.13, 0.5])
+def test_live_summary_equals_stream(clip, tmp_path, update_sec):
+    rec = LiveRecorder(fake_input=clip, speed=0, update_sec=update_sec, out_wav=str(tmp_path/"out.wav"))
+    rec.start()
+    assert rec.ended.wait(60)
+    res = rec.stop()
+    assert res["mode"]["valid"]
+    ref = stream_pipeline(clip)["summary"]
+    for k, v in res["summary"].items():
+        assert v == ref[k] or (np.isnan(v) and np.isnan(ref[k])), k
+    assert res["live"]["syllables"] > 0 and len(rec.live.voiced) < 100     # bounded voicing window
@@ -0,0 +1,31 @@
+# test_speech_pipeline.py
+# Stage edge cases: clips too short for the DDK band-pass give the empty DDK result (no filtfilt error);
+# syllable peaks >= SYLLABLE_MIN_GAP_SEC apart, so the speech rate does not depend on the sample rate
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from speech_bench import gen_speech_pauses
+from speech_pipeline import DDK_PADLEN, DDK_SR, ddk_metrics, run_pipeline, syllable_rate, vad_segments
+
+@pytest.mark.parametrize("sr", [16000, 44100])
+@pytest.mark.parametrize("low_mem", [False, True])
+def test_ddk_short_clip_is_empty(sr, low_mem):
+    rng = np.random.default_rng(0)
+    for n in (0, 1, 50, (DDK_PADLEN + 1)*sr//DDK_SR - 1, (DDK_PADLEN + 1)*sr//DDK_SR + sr//DDK_SR):
+        out = ddk_metrics(0.1*rng.standard_normal(n).astype(np.float32), sr, low_mem=low_mem)
+        assert out["ddk_rate_sps"] == 0.0 and np.isnan(out["ddk_interval_sd_ms"]), n
+
+def test_pipeline_on_a_tiny_clip(tmp_path):
+    clip = str(tmp_path/"tiny.wav")
+    sf.write(clip, 0.1*np.random.default_rng(1).standard_normal(100).astype(np.float32), 16000)
+    out = run_pipeline(clip, save=False, f0_engine="yin", praat_workers=0)
+    assert out["summary"]["ddk_rate_sps"] == 0.0 and np.isnan(out["summary"]["ddk_interval_sd_ms"])
+
+def test_speech_rate_independent_of_sr():
+    rates = {}
+    for sr in (16000, 44100):
+        y, _ = gen_speech_pauses(sr, 30.0)
+        rates[sr] = syllable_rate(y, sr, vad_segments(y, sr))["speech_rate_sps"]
+    assert rates[16000] == pytest.approx(rates[44100], rel=0.05)
@@ -0,0 +1,97 @@
+# test_speech_score.py
+# speech_score batch scorers vs the original scalar Python (cmq_SpeechDeturbance_20251018.sara_speech_from_four,
+# speech_pipeline.sara4_autoscore as they were before the vectorized versions), row for row on random inputs
+# with NaN / inf and rows under the duration gate
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from speech_score import SPEECH_NORMS, sara_speech_arrays, sara_speech_batch, sara_speech_from_four, sara4_batch
+
+def _ref_sara_speech(duration_sec, silence_ratio, tempo_bpm, intelligibility_pct,
+                     mu_sil=0.20, sd_sil=0.10, mu_tmp=105.0, sd_tmp=10.0, mu_int=95.0, sd_int=5.0):
+    if duration_sec < 4:
+        return {"ok": False, "reason": "insufficient_duration"}
+    def clamp(x, lo, hi): return max(lo, min(hi, x))
+    z_sil = clamp((silence_ratio - mu_sil)/(sd_sil or 1e-9), -3.0, 3.0)
+    z_tmp = clamp(abs((tempo_bpm - mu_tmp)/(sd_tmp or 1e-9)), 0.0, 3.0)
+    z_int = clamp(max(0.0, (mu_int - intelligibility_pct)/(sd_int or 1e-9)), 0.0, 3.0)
+    imp = 0.60*z_int + 0.25*z_sil + 0.15*z_tmp
+    sara = sum(imp >= c for c in [0.25, 0.75, 1.25, 1.75, 2.50, 3.50])
+    return {"ok": True, "z_scores": {"intelligibility": z_int, "silence": z_sil, "tempo_dev": z_tmp},
+            "impairment_index": round(imp, 3), "sara_speech_pred": int(sara),
+            "sara_speech_cont": round(6.0/(1.0 + math.exp(-1.1*imp)), 2)}
+
+def _ref_sara4(r) -> int:
+    score = 0
+    if r["speech_rate"] < 4.5: score += 1
+    if r["pause_ratio"] > 0.25: score += 1
+    if r["f0_sd_st"] > 1.0: score += 1
+    if not math.isnan(r["jitter_percent"]) and r["jitter_percent"] > 1.0: score += 1
+    if not math.isnan(r["shimmer_percent"]) and r["shimmer_percent"] > 3.0: score += 1
+    if (not math.isnan(r["tremor_peak_hz"])) and (3.0 <= r["tremor_peak_hz"] <= 7.0) and (r["tremor_rms"] > 0.05):
+        score += 1
+    return min(score, 6)
+
+def _with_gaps(rng, a, frac=0.1):
+    a = a.copy()
+    a[rng.random(len(a)) < frac] = np.nan
+    a[rng.random(len(a)) < frac/4] = rng.choice([np.inf, -np.inf])
+    return a
+
+def _speech_rows(n=2000, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(dict(duration_sec=_with_gaps(rng, rng.uniform(0, 20, n)),
+                             silence_ratio=_with_gaps(rng, rng.uniform(-0.1, 0.9, n)),
+                             tempo_bpm=_with_gaps(rng, rng.uniform(40, 200, n)),
+                             intelligibility_pct=_with_gaps(rng, rng.uniform(40, 110, n))))
+
+def test_sara_speech_batch_matches_scalar():
+    df = _speech_rows()
+    out = sara_speech_batch(df)
+    for row, (_, b) in zip(df.itertuples(index=False), out.iterrows()):
+        ref = _ref_sara_speech(*row)
+        assert bool(b["ok"]) == ref["ok"]
+        if not ref["ok"]:
+            assert np.isnan(b["impairment_index"]) and np.isnan(b["sara_speech_pred"])
+            continue
+        assert round(b["impairment_index"], 3) == ref["impairment_index"]
+        assert b["sara_speech_pred"] == ref["sara_speech_pred"]
+        assert round(b["sara_speech_cont"], 2) == ref["sara_speech_cont"]
+        assert np.allclose([b["z_intelligibility"], b["z_silence"], b["z_tempo_dev"]],
+                           [ref["z_scores"][k] for k in ("intelligibility", "silence", "tempo_dev")])
+
+def test_sara_speech_from_four_wrapper_matches_scalar():
+    for row in _speech_rows(300, seed=1).itertuples(index=False):
+        got, ref = sara_speech_from_four(*row), _ref_sara_speech(*row)
+        assert got["ok"] == ref["ok"]
+        if ref["ok"]:
+            assert {k: got[k] for k in ("impairment_index", "sara_speech_pred", "sara_speech_cont")} == \
+                   {k: ref[k] for k in ("impairment_index", "sara_speech_pred", "sara_speech_cont")}
+
+def test_sara_speech_candidate_axis():
+    # calibration shape: columns (N, 1), weights (3, K), cuts (K, 6) -> (N, K), each column = that candidate alone
+    df = _speech_rows(200, seed=2).fillna(10.0)
+    rng = np.random.default_rng(3)
+    w = rng.dirichlet(np.ones(3), 4).T
+    cuts = np.sort(rng.uniform(0, 4, (4, 6)), axis=1)
+    cols = {k: df[k].to_numpy()[:, None] for k in df}
+    grid = sara_speech_arrays(cols, w, cuts, 4.0, SPEECH_NORMS)
+    for k in range(4):
+        one = sara_speech_arrays({c: v[:, 0] for c, v in cols.items()}, w[:, k], cuts[k], 4.0, SPEECH_NORMS)
+        assert np.array_equal(grid["sara_speech_pred"][:, k], one["sara_speech_pred"], equal_nan=True)
+
+def test_sara4_batch_matches_scalar():
+    rng = np.random.default_rng(4)
+    n = 5000
+    df = pd.DataFrame(dict(speech_rate=_with_gaps(rng, rng.uniform(2, 7, n)),
+                           pause_ratio=_with_gaps(rng, rng.uniform(0, 0.5, n)),
+                           f0_sd_st=_with_gaps(rng, rng.uniform(0, 2, n)),
+                           jitter_percent=_with_gaps(rng, rng.uniform(0, 2, n)),
+                           shimmer_percent=_with_gaps(rng, rng.uniform(0, 6, n)),
+                           tremor_peak_hz=_with_gaps(rng, rng.choice([3.0, 7.0, 5.0, 2.0, 9.0], n)),
+                           tremor_rms=_with_gaps(rng, rng.uniform(0, 0.1, n))))
+    ref = [_ref_sara4(r) for r in df.to_dict("records")]
+    assert sara4_batch(df).tolist() == ref
@@ -0,0 +1,47 @@
+# test_speech_stream.py
+# Streaming DDK: same peaks whatever the block size, and the in-memory ddk_metrics rate
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from speech_bench import gen_ddk_train, gen_speech_pauses, gen_tremor_vowel
+from speech_pipeline import ddk_metrics
+from speech_stream import StreamAnalyzer, stream_pipeline
+
+def _highpassed(y, sr):
+    from scipy.signal import butter, filtfilt
+    b, a = butter(2, 40/(sr/2), btype="highpass")
+    return filtfilt(b, a, y.astype(np.float64) - np.mean(y))
+
+def _mix(sr):
+    parts = [gen_speech_pauses(sr, 8.0)[0], gen_ddk_train(sr, 8.0, rate=7.0)[0], gen_tremor_vowel(sr, 4.0)[0]]
+    return np.concatenate(parts).astype(np.float32)
+
+def _stream_ddk(y, sr, block_sec):
+    an = StreamAnalyzer(sr)
+    b = max(1, int(block_sec*sr))
+    for i in range(0, len(y), b):
+        x = an.hp(np.clip(y[i:i+b], -1.0, 1.0)).astype(np.float32)
+        an.ddkacc.push(x)
+    return an.ddkacc.finish()
+
+@pytest.mark.parametrize("sr", [16000, 44100])
+def test_ddk_block_size_invariant(sr):
+    y = _mix(sr)
+    ref = _stream_ddk(y, sr, 4.0)
+    assert ref["ddk_rate_sps"] > 0
+    for block_sec in (0.05, 0.25, 0.37, 1.0):
+        assert _stream_ddk(y, sr, block_sec) == ref
+    mem = ddk_metrics(_highpassed(y, sr), sr)
+    assert ref["ddk_rate_sps"] == pytest.approx(mem["ddk_rate_sps"], rel=0.01)
+
+def test_stream_pipeline_ddk_matches_in_memory(tmp_path):
+    sr = 16000
+    y, truth = gen_ddk_train(sr, 20.0, rate=6.0)
+    path = str(tmp_path/"ddk.wav")
+    sf.write(path, y, sr)
+    rates = {b: stream_pipeline(path, block_sec=b)["ddk"]["ddk_rate_sps"] for b in (0.05, 1.0)}
+    assert rates[0.05] == rates[1.0]
+    assert rates[1.0] == pytest.approx(ddk_metrics(_highpassed(y, sr), sr)["ddk_rate_sps"], rel=0.005)
+    assert rates[1.0] == pytest.approx(truth["ddk_rate_sps"], rel=0.01)
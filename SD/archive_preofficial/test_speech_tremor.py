@@ -0,0 +1,24 @@
+# test_speech_tremor.py
+# Blocked window spectra (window_band_stats) vs one batched window_spectra over the whole contour
+
+import numpy as np
+import pytest
+
+from speech_tremor import F0_FPS, window_spectra, band_stats, window_band_stats
+
+@pytest.mark.parametrize("tapers", [1, 3])
+def test_window_band_stats_blocks_match_one_batch(tapers):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(90*F0_FPS))/F0_FPS
+    x = 140.0 + 0.3*rng.standard_normal(len(t)) + 4.0*np.sin(2*np.pi*5.0*t)*(t > 45)
+    starts, freqs, psd = window_spectra(x, F0_FPS, tapers=tapers)
+    ref = band_stats(freqs, psd)
+    for block in (1, 7, 64, 10_000):
+        got = window_band_stats(x, F0_FPS, tapers=tapers, block=block)
+        assert np.array_equal(got[0], starts)
+        for a, b in zip(got[1:], ref):
+            assert np.allclose(a, b, rtol=1e-12, atol=0, equal_nan=True)
+
+def test_window_band_stats_short_contour():
+    starts, peak, rms, ratio = window_band_stats(np.ones(10), F0_FPS)
+    assert len(starts) == len(peak) == len(rms) == len(ratio) == 0
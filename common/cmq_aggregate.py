@@ -0,0 +1,305 @@
+# cmq_aggregate.py
+# Incremental cohort aggregation -> data/summary/CeMoQu_aggregate_<YYYYMMDD>.csv (one row per participant + day)
+# - Scans the module folders (default LD/raw, RT/raw, SD/raw, data/csv; .csv / .json) and parses each file
+#   into per-record metric rows; kind detected from the CSV header / JSON layout:
+#   LD app JSON (stats + clinical), RT app touches / targets summary / final summary, RT camera-script CSV,
+#   SD app speech_reading CSV / JSON, result tables with a record_id column (speech_batch, speech_asr,
+#   rt_replay summaries), any other MOD_PID_YYYYMMDD[_HHMMSS] CSV (numeric column means)
+# - Join: record names (cmq_records.parse_record_name) -> (pid, date); records of one module on the same
+#   day are averaged (<mod>_n_records, <mod>_time = first session time), modules side by side
+# - Manifest (data/summary/.cmq_aggregate_manifest.json): size, mtime, sha1 and the parsed rows per file.
+#   Unchanged files (size + mtime, or same sha1) are never re-read, new / changed ones are parsed in
+#   parallel, deleted ones dropped; a rerun is a directory scan + the join
+# - Parser changes: bump PARSER_VERSION (the whole manifest is re-parsed once)
+
+import os, re, sys, json, time, argparse
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from cmq_records import parse_record_name, file_sha1, MODULES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INPUTS = [os.path.join(ROOT, *d) for d in (("LD", "raw"), ("RT", "raw"), ("SD", "raw"), ("data", "csv"))]
+SUMMARY_DIR = os.path.join(ROOT, "data", "summary")
+MANIFEST_NAME = ".cmq_aggregate_manifest.json"
+SOURCE_EXTS = (".csv", ".json")
+PARSER_VERSION = 1
+CHUNK = 64
+KEY_COLS = ["pid", "date"]
+
+class Skip(ValueError):
+    pass
+
+# -------------------------
+# Parsers (path -> record rows); run in pool workers
+# -------------------------
+def _slug(name: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", str(name).lower()).strip("_")
+
+def _numeric_means(df: pd.DataFrame, skip=()) -> Dict[str, float]:
+    # columns read_csv typed as numbers (text / mixed columns are handled by the parsers that know them)
+    num = df.drop(columns=[c for c in skip if c in df.columns]).select_dtypes("number")
+    return {_slug(k): float(v) for k, v in num.mean().items() if v == v}
+
+def _record(path: str, name: Optional[str] = None, **metrics) -> Dict:
+    rec = parse_record_name(name or path)
+    rec.pop("export")
+    return dict(rec, **metrics)
+
+def _rt_touches(path: str, df: pd.DataFrame) -> List[Dict]:
+    tracked = df["x_px"].notna()
+    return [_record(path, n_frames=len(df), n_trials=int(df["trial_idx"].nunique()),
+                    tracked_pct=100.0*tracked.mean() if len(df) else np.nan,
+                    inside_pct=100.0*pd.to_numeric(df["inside"], errors="coerce").mean() if len(df) else np.nan)]
+
+def _rt_targets(path: str, df: pd.DataFrame) -> List[Dict]:
+    m = _numeric_means(df, skip=("trial_global_index", "target_x_px", "target_y_px", "radius_px", "missed"))
+    return [_record(path, n_targets=len(df), missed=int(pd.to_numeric(df["missed"], errors="coerce").sum()), **m)]
+
+def _rt_script(path: str, df: pd.DataFrame) -> List[Dict]:
+    # cmq_RandomTargetTouch_251020.py / draft RTT1 CSV ("Timeout" / "-" for misses)
+    out = dict(score=pd.to_numeric(df["Score (0-4)"], errors="coerce").mean(),
+               hit_time_s=pd.to_numeric(df["Hit Time (s)"], errors="coerce").mean(),
+               distance_px=pd.to_numeric(df["Distance (px)"], errors="coerce").mean(),
+               timeouts=int((df["Hit Time (s)"].astype(str) == "Timeout").sum()), n_targets=len(df))
+    if "Test Type" in df.columns:
+        for test, g in df.groupby("Test Type", sort=False):
+            out[f"score_{_slug(test)}"] = pd.to_numeric(g["Score (0-4)"], errors="coerce").mean()
+    return [_record(path, **out)]
+
+def _by_record_id(path: str, df: pd.DataFrame) -> List[Dict]:
+    # result tables (speech_batch / speech_asr / rt_replay ...): numeric means per record_id (status ok rows)
+    if "status" in df.columns:
+        df = df[df["status"].astype(str) == "ok"]
+    skip = [c for c in ("record_id", "date", "time", "elapsed_sec") if c in df.columns]
+    means = df.drop(columns=skip).select_dtypes("number").groupby(df["record_id"].astype(str), sort=False).mean()
+    means = means.loc[:, means.notna().any()]
+    means.columns = [_slug(c) for c in means.columns]
+    return [_record(path, rid, **{k: v for k, v in m.items() if v == v})
+            for rid, m in zip(means.index, means.to_dict("records"))]
+
+def _sd_reading(path: str, df: pd.DataFrame) -> List[Dict]:
+    # SD app export: <participant>_speech_reading.csv, one row per task; date from recorded_at (ISO, UTC)
+    day = (df["recorded_at"].astype(str).str[:10].str.replace("-", "") if "recorded_at" in df.columns
+           else pd.Series("", index=df.index))
+    day = day.where(day.str.fullmatch(r"\d{8}"), "")
+    out = []
+    for (pid, d), g in df.groupby([df["participant"].astype(str), day], sort=False):
+        rec = parse_record_name(path)
+        rec.update(record_id=f"SD_{pid}_{d}", module="SD", pid=pid, date=d or rec["date"])
+        rec.pop("export")
+        out.append(dict(rec, n_tasks=len(g),
+                        **_numeric_means(g, skip=("participant", "session", "sample_rate", "mic_cm"))))
+    return out
+
+def _ld_json(path: str, obj: Dict) -> List[Dict]:
+    stats = dict(obj.get("stats") or {})
+    clinical = stats.pop("clinical", None) or {}
+    m = {_slug(k): float(v) for k, v in stats.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    m.update({_slug(k): float(v) for k, v in clinical.items() if isinstance(v, (int, float))})
+    if obj.get("touches"):
+        m["n_points"] = sum(len(s["points"] if isinstance(s, dict) else s) for s in obj["touches"])
+    rec = _record(path, **m)
+    if not rec["pid"]:
+        rec["pid"] = str((obj.get("patient") or {}).get("id", ""))
+    return [rec]
+
+def _sd_json(path: str, items: List[Dict]) -> List[Dict]:
+    rows = [dict(participant=i["features"].get("participant", ""), recorded_at=i["features"].get("recordedAt"),
+                 duration_s=i.get("duration"), mean_rms=i["features"].get("meanRMS"),
+                 rms_cv=i["features"].get("rmsCV"), mean_f0_hz=i["features"].get("meanF0"),
+                 f0_cv=i["features"].get("f0CV"), score_0_6=i["features"].get("score06"))
+            for i in items if isinstance(i, dict) and isinstance(i.get("features"), dict)]
+    return _sd_reading(path, pd.DataFrame(rows)) if rows else []
+
+def _rt_final(path: str, df: pd.DataFrame) -> List[Dict]:
+    return [_record(path, final_score=pd.to_numeric(df["final_score"], errors="coerce").mean(),
+                    num_targets=pd.to_numeric(df["num_targets"], errors="coerce").mean(), n_runs=len(df))]
+
+def _rt_frames(path: str, df: pd.DataFrame) -> List[Dict]:
+    raise Skip("frame log (scored by rt_replay.py)")
+
+def _generic(path: str, df: pd.DataFrame) -> List[Dict]:
+    rec = _record(path)
+    if rec["module"] not in MODULES:
+        raise Skip("unrecognised export (no MOD_PID_YYYYMMDD name)")
+    return [dict(rec, n_rows=len(df), **_numeric_means(df))]
+
+CSV_KINDS = [   # (kind, required columns, parser) -- first match wins
+    ("rt_touches", ("trial_idx", "x_px", "inside"), _rt_touches),
+    ("rt_targets", ("trial_global_index", "missed"), _rt_targets),
+    ("rt_final", ("run_ts", "final_score", "num_targets"), _rt_final),
+    ("rt_script", ("Score (0-4)", "Hit Time (s)", "Distance (px)"), _rt_script),
+    ("rt_frames", ("frame_idx", "tip_x"), _rt_frames),
+    ("records", ("record_id",), _by_record_id),
+    ("sd_reading", ("participant", "score_0_6"), _sd_reading),
+    ("generic", (), _generic),
+]
+
+def parse_file(path: str) -> Dict:
+    # never raises; rows = list of {record_id, module, pid, date, time, metric...}
+    try:
+        if os.path.getsize(path) <= 1:
+            return dict(kind="empty", rows=[], status="skipped", error="empty file")
+        if path.lower().endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                obj = json.load(f)
+            if isinstance(obj, dict) and "stats" in obj:
+                return dict(kind="ld_json", rows=_ld_json(path, obj), status="ok", error="")
+            if isinstance(obj, list):
+                return dict(kind="sd_json", rows=_sd_json(path, obj), status="ok", error="")
+            return dict(kind="", rows=[], status="skipped", error="unrecognised JSON")
+        with open(path, encoding="utf-8") as f:
+            commented = f.read(1) == "#"                  # frame-log header line
+        df = pd.read_csv(path, skiprows=1 if commented else 0)
+        for kind, cols, fn in CSV_KINDS:
+            if all(c in df.columns for c in cols):
+                try:
+                    return dict(kind=kind, rows=fn(path, df), status="ok", error="")
+                except Skip as e:
+                    return dict(kind=kind, rows=[], status="skipped", error=str(e))
+    except Exception as e:
+        return dict(kind="", rows=[], status="error", error=f"{type(e).__name__}: {e}")
+
+def _parse_chunk(paths: List[str]) -> List[Dict]:
+    return [dict(parse_file(p), path=p, sha1=file_sha1(p)) for p in paths]
+
+def collect_sources(spec: str, exclude: str = SUMMARY_DIR) -> List[str]:
+    if os.path.isdir(spec):
+        return [os.path.join(d, f) for d, dirs, files in os.walk(spec)
+                if not os.path.abspath(d).startswith(os.path.abspath(exclude))
+                for f in files if f.lower().endswith(SOURCE_EXTS)]
+    return [spec] if os.path.isfile(spec) else []
+
+# -------------------------
+# Manifest + incremental parse
+# -------------------------
+def load_manifest(path: str) -> Dict:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            man = json.load(f)
+        if man.get("version") == PARSER_VERSION:
+            return man
+    return dict(version=PARSER_VERSION, files={})
+
+def save_manifest(man: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(man, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def refresh(paths: List[str], man: Dict, workers: Optional[int] = None, verbose: bool = True) -> Dict[str, int]:
+    files = man["files"]
+    counts = dict(unchanged=0, parsed=0, removed=0, error=0)
+    seen, todo = set(), []
+    for p in paths:
+        key = os.path.abspath(p)
+        seen.add(key)
+        st = os.stat(p)
+        old = files.get(key)
+        if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime:
+            counts["unchanged"] += 1
+            continue
+        if old and old["size"] == st.st_size and file_sha1(p) == old["sha1"]:
+            old["mtime"] = st.st_mtime
+            counts["unchanged"] += 1
+            continue
+        todo.append(key)
+    for key in [k for k in files if k not in seen]:
+        del files[key]
+        counts["removed"] += 1
+
+    def commit(res: Dict):
+        st = os.stat(res["path"])
+        files[res["path"]] = dict(size=st.st_size, mtime=st.st_mtime, sha1=res.get("sha1", ""),
+                                  kind=res["kind"], status=res["status"], error=res["error"], rows=res["rows"])
+        counts["error" if res["status"] == "error" else "parsed"] += 1
+        if verbose and res["status"] == "error":
+            print(f"  {os.path.basename(res['path'])}: {res['error']}")
+
+    chunks = [todo[i:i + CHUNK] for i in range(0, len(todo), CHUNK)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_parse_chunk, c): c for c in chunks}
+            for fut in as_completed(futures):
+                try:
+                    results = fut.result()
+                except Exception as e:
+                    results = [dict(path=p, kind="", rows=[], status="error", error=f"{type(e).__name__}: {e}")
+                               for p in futures[fut]]
+                for res in results:
+                    commit(res)
+    else:
+        for c in chunks:
+            for res in _parse_chunk(c):
+                commit(res)
+    return counts
+
+# -------------------------
+# Join
+# -------------------------
+def aggregate(man: Dict) -> pd.DataFrame:
+    rows = [dict(r, source=p) for p, f in man["files"].items() for r in f["rows"]]
+    rows = [r for r in rows if r.get("module") in MODULES and r.get("pid") and r.get("date")]
+    if not rows:
+        return pd.DataFrame(columns=KEY_COLS)
+    df = pd.DataFrame(rows)
+    df["time"] = pd.to_numeric(df["time"], errors="coerce")      # HHMMSS as a number: vectorized min
+    # one record can come from several files (RT touches + targets + final summary): merge them first
+    meta = ["record_id", "module", "pid", "date", "time", "source"]
+    metrics = [c for c in df.columns if c not in meta]
+    rec = df.groupby(["module", "record_id"], sort=False).agg(
+        {"pid": "first", "date": "first", "time": "min", **{c: "mean" for c in metrics}}).reset_index()
+    out = None
+    for mod in MODULES:
+        m = rec[rec["module"] == mod]
+        if m.empty:
+            continue
+        cols = [c for c in metrics if m[c].notna().any()]
+        g = m.groupby(KEY_COLS)
+        part = g[cols].mean()
+        part.insert(0, "n_records", g.size())
+        part.insert(1, "time", g["time"].min().map(lambda v: f"{int(v):06d}" if v == v else ""))
+        part.columns = [f"{mod.lower()}_{c}" for c in part.columns]
+        out = part if out is None else out.join(part, how="outer")
+    out = out.reset_index().sort_values(KEY_COLS, kind="stable")
+    out.insert(2, "modules", out[[f"{m.lower()}_n_records" for m in MODULES if f"{m.lower()}_n_records" in out]]
+               .notna().apply(lambda r: "+".join(c[:2].upper() for c, v in r.items() if v), axis=1))
+    return out
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental CeMoQu cohort aggregate (LD / RT / SD)")
+    parser.add_argument("inputs", nargs="*", help="files / directories (default: LD/raw RT/raw SD/raw data/csv)")
+    parser.add_argument("--summary-dir", default=SUMMARY_DIR)
+    parser.add_argument("--out", default=None, help="default: <summary-dir>/CeMoQu_aggregate_<today>.csv")
+    parser.add_argument("--manifest", default=None, help=f"default: <summary-dir>/{MANIFEST_NAME}")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: all cores)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-parse everything")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    man_path = args.manifest or os.path.join(args.summary_dir, MANIFEST_NAME)
+    man = dict(version=PARSER_VERSION, files={}) if args.full else load_manifest(man_path)
+    paths = [p for spec in (args.inputs or DEFAULT_INPUTS) for p in collect_sources(spec, args.summary_dir)]
+    t_scan = time.perf_counter()
+    counts = refresh(paths, man, workers=args.workers)
+    t_parse = time.perf_counter()
+    if counts["parsed"] or counts["error"] or counts["removed"] or not os.path.exists(man_path):
+        save_manifest(man, man_path)
+    table = aggregate(man)
+    out = args.out or os.path.join(args.summary_dir, f"CeMoQu_aggregate_{date.today():%Y%m%d}.csv")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    table.to_csv(out, index=False)
+    print(f"=== {len(paths)} files: " + ", ".join(f"{k} {v}" for k, v in counts.items())
+          + f" | scan {t_scan - t0:.2f}s, parse {t_parse - t_scan:.2f}s, total {time.perf_counter() - t0:.2f}s")
+    print(f"{len(table)} participant-days, {table.shape[1]} columns -> {out}")
+    sys.exit(0 if counts["error"] == 0 else 1)
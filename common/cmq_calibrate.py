@@ -0,0 +1,296 @@
+# cmq_calibrate.py
+# Threshold / weight calibration against clinician SARA ratings (features only: no DSP, no tracking)
+# - speech: sara_speech_from_four weights + cuts      (features: speech_asr_scores.csv / speech_scores.csv)
+# - sara4 : sara4_autoscore thresholds                (features: speech_batch_summary.csv)
+# - rt    : sara_score_from_distance cut-offs (px)    (features: RT session CSVs, per-target distances;
+#                                                      session score = mean target score, timeouts = 4)
+# - Candidates: random search (default) or grid, current defaults always candidate 0
+# - Each candidate chunk is scored as one (N, K) array (scorers take a trailing candidate axis),
+#   chunks optionally spread over worker processes
+# - Agreement vs ratings: QWK, exact / within-1 agreement, MAE, bias, Spearman; k-fold CV picks the
+#   best candidate on the training folds and reports it on the held-out fold (optimism check)
+# Ratings CSV: record_id,rating (+ test for rt: "Finger Chase" / "Finger to Nose")
+
+import os, sys, glob, json, time, itertools, argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _d in (("SD", "archive_preofficial"), ("RT", "archive_preofficial")):
+    sys.path.insert(0, os.path.join(ROOT, *_d))
+
+from speech_score import (sara_speech_arrays, sara4_batch, SARA_SPEECH_COLS, SARA4_COLS, SPEECH_NORMS,
+                          SPEECH_WEIGHTS, SPEECH_CUTS, MIN_DURATION_SEC, SARA4_THRESHOLDS)
+from rt_score import distance_score_batch, RT_DISTANCE_CUTS, RT_MAX_SCORE
+
+METRICS = ("qwk", "exact_pct", "within1_pct", "mae", "bias", "spearman")
+LOWER_IS_BETTER = ("mae",)
+CHUNK = 512
+
+# -------------------------
+# Parameter spaces
+# -------------------------
+# groups: ("range", [name], lo, hi) | ("sorted", names, lo, hi) (non-decreasing) | ("simplex", names) (sum 1)
+def _group_grid(g, steps: int) -> np.ndarray:
+    kind, names = g[0], g[1]
+    if kind == "simplex":
+        m = steps - 1
+        rows = [c for c in itertools.product(range(m + 1), repeat=len(names)) if sum(c) == m]
+        return np.asarray(rows, dtype=float)/m
+    lv = np.linspace(g[2], g[3], steps)
+    if kind == "sorted":
+        return np.asarray(list(itertools.combinations_with_replacement(lv, len(names))), dtype=float)
+    return lv[:, None]
+
+def _group_sample(g, rng, n: int) -> np.ndarray:
+    kind, names = g[0], g[1]
+    if kind == "simplex":
+        return rng.dirichlet(np.ones(len(names)), size=n)
+    x = rng.uniform(g[2], g[3], size=(n, len(names)))
+    return np.sort(x, axis=1) if kind == "sorted" else x
+
+def candidates(groups, defaults: np.ndarray, search: str, n: int, steps: int, seed: int) -> np.ndarray:
+    # (K, n_params), row 0 = current defaults
+    if search == "grid":
+        parts = [_group_grid(g, steps) for g in groups]
+        idx = np.array(list(itertools.product(*[range(len(p)) for p in parts])), dtype=np.int64)
+        P = np.concatenate([p[idx[:, j]] for j, p in enumerate(parts)], axis=1)
+    else:
+        rng = np.random.default_rng(seed)
+        P = np.concatenate([_group_sample(g, rng, n) for g in groups], axis=1)
+    return np.vstack([defaults[None, :], P])
+
+# -------------------------
+# Scorers: features once, predict(X, P) -> (N, K) scores for K candidates
+# -------------------------
+class SpeechScorer:
+    name, n_classes = "speech", 7
+    params = ["w_int", "w_sil", "w_tmp", "cut1", "cut2", "cut3", "cut4", "cut5", "cut6"]
+    groups = [("simplex", params[:3]), ("sorted", params[3:], 0.0, 3.5)]
+    defaults = np.array(list(SPEECH_WEIGHTS) + list(SPEECH_CUTS))
+
+    def features(self, df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        c = {k: df[k].to_numpy(dtype=float) for k in SARA_SPEECH_COLS}
+        ok = ~(c["duration_sec"] < MIN_DURATION_SEC)          # scalar scorer returns ok=False otherwise
+        return {k: v[:, None] for k, v in c.items()}, ok
+
+    def predict(self, X: Dict[str, np.ndarray], P: np.ndarray) -> np.ndarray:
+        return sara_speech_arrays(X, P[:, :3].T, P[:, 3:], MIN_DURATION_SEC,
+                                  SPEECH_NORMS)["sara_speech_pred"]
+
+class Sara4Scorer:
+    name, n_classes = "sara4", 7
+    params = list(SARA4_THRESHOLDS)
+    groups = [("range", ["speech_rate"], 2.0, 8.0), ("range", ["pause_ratio"], 0.05, 0.6),
+              ("range", ["f0_sd_st"], 0.3, 4.0), ("range", ["jitter_percent"], 0.2, 3.0),
+              ("range", ["shimmer_percent"], 1.0, 10.0), ("sorted", ["tremor_lo_hz", "tremor_hi_hz"], 2.0, 9.0),
+              ("range", ["tremor_rms"], 0.01, 0.3)]
+    defaults = np.array([SARA4_THRESHOLDS[k] for k in params])
+
+    def features(self, df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        ok = df["status"].fillna("ok").eq("ok").to_numpy() if "status" in df else np.ones(len(df), bool)
+        return {k: df[k].to_numpy(dtype=float)[:, None] for k in SARA4_COLS}, ok
+
+    def predict(self, X: Dict[str, np.ndarray], P: np.ndarray) -> np.ndarray:
+        return sara4_batch(thresholds={k: P[:, j] for j, k in enumerate(self.params)}, **X)
+
+class RTScorer:
+    name, n_classes = "rt", RT_MAX_SCORE + 1
+    params = ["cut1", "cut2", "cut3", "cut4"]
+    groups = [("sorted", params, 5.0, 150.0)]
+    defaults = np.array(RT_DISTANCE_CUTS)
+
+    def features(self, df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        # df: one row per session, "distances" = per-target hit distances (NaN = timeout)
+        lens = df["distances"].map(len).to_numpy()
+        d = np.concatenate(df["distances"].to_list()) if len(df) else np.zeros(0)
+        starts = np.r_[0, np.cumsum(lens)[:-1]]
+        return dict(dist=d[:, None], starts=starts, lens=lens), lens > 0
+
+    def predict(self, X: Dict[str, np.ndarray], P: np.ndarray) -> np.ndarray:
+        s = distance_score_batch(X["dist"], P)                                   # (targets, K)
+        return np.add.reduceat(s, X["starts"], axis=0)/X["lens"][:, None]        # session mean
+
+SCORERS = {s.name: s for s in (SpeechScorer, Sara4Scorer, RTScorer)}
+
+# -------------------------
+# Feature tables
+# -------------------------
+def load_rt_sessions(specs: List[str], by_test: bool) -> pd.DataFrame:
+    # RT script CSVs (ataxia_test_results.csv renamed RT_PID_YYYYMMDD_HHMMSS.csv): record_id = file stem,
+    # or rt_replay.py targets CSVs (record_id column)
+    paths = []
+    for spec in specs:
+        paths += sorted(glob.glob(os.path.join(spec, "*.csv"))) if os.path.isdir(spec) else sorted(glob.glob(spec))
+    rows = []
+    for p in paths:
+        try:
+            t = pd.read_csv(p)
+        except pd.errors.EmptyDataError:
+            continue
+        if "Distance (px)" not in t:
+            continue
+        t["dist"] = pd.to_numeric(t["Distance (px)"], errors="coerce")        # "-" (timeout) -> NaN
+        if "record_id" not in t:                                              # rt_replay.py: many sessions
+            t["record_id"] = os.path.splitext(os.path.basename(p))[0]
+        keys = ["record_id", "Test Type"] if by_test else ["record_id"]
+        for k, g in t.groupby(keys, sort=False):
+            k = k if isinstance(k, tuple) else (k,)
+            rows.append(dict(record_id=k[0], test=k[1] if by_test else None,
+                             distances=g["dist"].to_numpy(dtype=float)))
+    return pd.DataFrame(rows, columns=["record_id", "test", "distances"])
+
+def join_ratings(feats: pd.DataFrame, ratings_csv: str, rating_col: str, by_test: bool) -> pd.DataFrame:
+    r = pd.read_csv(ratings_csv, dtype={"record_id": str})
+    keys = ["record_id", "test"] if by_test else ["record_id"]
+    r = r.dropna(subset=[rating_col])[keys + [rating_col]].rename(columns={rating_col: "rating"})
+    feats = feats.assign(record_id=feats["record_id"].astype(str))
+    return feats.merge(r, on=keys, how="inner")
+
+# -------------------------
+# Agreement (vectorized over candidates, from confusion counts)
+# -------------------------
+def _counts(y: np.ndarray, pred: np.ndarray, n_classes: int, group: np.ndarray, n_groups: int):
+    # per group (CV fold) and candidate: confusion (G, K, C, C) [pred, rating], sum |err|, sum err (G, K)
+    n, k = pred.shape
+    C = n_classes
+    cls = np.clip(np.floor(pred + 0.5), 0, C - 1).astype(np.int64)        # session means -> class
+    code = ((group[:, None]*k + np.arange(k)[None, :])*C + cls)*C + y[:, None]
+    conf = np.bincount(code.ravel(), minlength=n_groups*k*C*C).reshape(n_groups, k, C, C).astype(float)
+    onehot = (group[None, :] == np.arange(n_groups)[:, None]).astype(float)
+    err = pred - y[:, None]
+    return conf, onehot @ np.abs(err), onehot @ err
+
+def _metrics(conf: np.ndarray, abs_sum: np.ndarray, err_sum: np.ndarray) -> Dict[str, np.ndarray]:
+    # conf (..., C, C) -> metric arrays (...); Spearman from mid-ranks of the tied classes
+    C = conf.shape[-1]
+    n = conf.sum(axis=(-2, -1))
+    i, j = np.indices((C, C))
+    W = (i - j)**2/(C - 1)**2
+    pm, tm = conf.sum(axis=-1), conf.sum(axis=-2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        E = pm[..., :, None]*tm[..., None, :]/n[..., None, None]
+        den = (W*E).sum(axis=(-2, -1))
+        qwk = np.where(den > 0, 1.0 - (W*conf).sum(axis=(-2, -1))/den, np.nan)
+        rp = np.cumsum(pm, axis=-1) - (pm - 1)/2.0 - (n[..., None] + 1)/2.0
+        rt = np.cumsum(tm, axis=-1) - (tm - 1)/2.0 - (n[..., None] + 1)/2.0
+        cov = (conf*rp[..., :, None]*rt[..., None, :]).sum(axis=(-2, -1))
+        rho = cov/np.sqrt((pm*rp**2).sum(axis=-1)*(tm*rt**2).sum(axis=-1))
+        return dict(qwk=qwk, exact_pct=100*np.trace(conf, axis1=-2, axis2=-1)/n,
+                    within1_pct=100*(conf*(np.abs(i - j) <= 1)).sum(axis=(-2, -1))/n,
+                    mae=abs_sum/n, bias=err_sum/n, spearman=rho)
+
+def agreement(y: np.ndarray, pred: np.ndarray, n_classes: int) -> Dict[str, np.ndarray]:
+    # y (N,) integer ratings, pred (N, K) scores -> one value per candidate
+    conf, a, e = _counts(y, pred, n_classes, np.zeros(len(y), np.int64), 1)
+    return {k: v[0] for k, v in _metrics(conf, a, e).items()}
+
+def _objective(m: Dict[str, np.ndarray], metric: str) -> np.ndarray:
+    v = -m[metric] if metric in LOWER_IS_BETTER else m[metric]
+    return np.nan_to_num(v, nan=-np.inf)
+
+def _eval_chunk(job) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    # -> all-row metrics (K,), train / test objective per fold (n_folds, K)
+    scorer_name, X, y, folds, P, metric = job
+    sc = SCORERS[scorer_name]()
+    pred = sc.predict(X, P).astype(float)
+    n_folds = int(folds.max()) + 1 if len(folds) else 1
+    conf, a, e = _counts(y, pred, sc.n_classes, folds, n_folds)
+    tot = conf.sum(axis=0), a.sum(axis=0), e.sum(axis=0)
+    m = _metrics(*tot)
+    if n_folds < 2:
+        return m, np.zeros((0, len(P))), np.zeros((0, len(P)))
+    te = _objective(_metrics(conf, a, e), metric)
+    tr = _objective(_metrics(tot[0][None] - conf, tot[1][None] - a, tot[2][None] - e), metric)
+    return m, tr, te
+
+def calibrate(scorer, X: Dict[str, np.ndarray], y: np.ndarray, P: np.ndarray, metric: str = "qwk",
+              folds: int = 5, workers: int = 1, seed: int = 0, chunk: int = CHUNK) -> Dict:
+    fold_id = np.random.default_rng(seed).permutation(len(y)) % folds if folds > 1 else np.zeros(len(y), int)
+    jobs = [(scorer.name, X, y, fold_id, P[i:i+chunk], metric) for i in range(0, len(P), chunk)]
+    t0 = time.perf_counter()
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            res = list(ex.map(_eval_chunk, jobs))
+    else:
+        res = [_eval_chunk(j) for j in jobs]
+    elapsed = time.perf_counter() - t0
+    metrics = {k: np.concatenate([r[0][k] for r in res]) for k in METRICS}
+    tr = np.concatenate([r[1] for r in res], axis=1)
+    te = np.concatenate([r[2] for r in res], axis=1)
+    cv = []
+    for f in range(tr.shape[0] if folds > 1 else 0):
+        k = int(np.argmax(tr[f]))
+        sgn = -1 if metric in LOWER_IS_BETTER else 1
+        cv.append(dict(fold=f, candidate=k, train=sgn*tr[f, k], test=sgn*te[f, k],
+                       default_test=sgn*te[f, 0]))
+    table = pd.DataFrame(P, columns=scorer.params)
+    for k, v in metrics.items():
+        table[k] = v
+    table.insert(0, "candidate", np.arange(len(P)))
+    return dict(table=table, best=int(np.argmax(_objective(metrics, metric))), cv=pd.DataFrame(cv),
+                elapsed_sec=elapsed, cand_per_sec=len(P)/elapsed if elapsed > 0 else np.nan)
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate SARA thresholds / weights against clinician ratings")
+    parser.add_argument("scorer", choices=list(SCORERS))
+    parser.add_argument("features", nargs="+", help="features CSV (speech / sara4) or RT session CSVs / dirs")
+    parser.add_argument("--ratings", required=True, help="record_id,rating[,test] CSV")
+    parser.add_argument("--rating-col", default="rating")
+    parser.add_argument("--search", choices=["random", "grid"], default="random")
+    parser.add_argument("--n", type=int, default=20000, help="random candidates")
+    parser.add_argument("--steps", type=int, default=6, help="grid levels per parameter")
+    parser.add_argument("--metric", choices=[m for m in METRICS if m != "bias"], default="qwk")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds (<=1: off)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", default=None, help="all candidates + metrics CSV")
+    parser.add_argument("--save-best", default=None, help="best parameters JSON")
+    args = parser.parse_args()
+
+    sc = SCORERS[args.scorer]()
+    by_test = False
+    if args.scorer == "rt":
+        by_test = "test" in pd.read_csv(args.ratings, nrows=0).columns
+        feats = load_rt_sessions(args.features, by_test)
+    else:
+        feats = pd.concat([pd.read_csv(p) for p in args.features], ignore_index=True)
+    data = join_ratings(feats, args.ratings, args.rating_col, by_test)
+    data = data[sc.features(data)[1]].reset_index(drop=True)
+    X, _ = sc.features(data)
+    y = np.clip(data["rating"].to_numpy(dtype=float).round(), 0, sc.n_classes - 1).astype(np.int64)
+    print(f"{sc.name}: {len(feats)} feature rows, {len(y)} rated and scorable")
+    if len(y) < 2:
+        parser.error("not enough rated records")
+
+    P = candidates(sc.groups, sc.defaults, args.search, args.n, args.steps, args.seed)
+    res = calibrate(sc, X, y, P, metric=args.metric, folds=args.folds, workers=args.workers, seed=args.seed)
+    t = res["table"]
+    print(f"{len(P)} candidates in {res['elapsed_sec']:.2f}s ({res['cand_per_sec']:.0f}/s, {args.workers} workers)")
+    order = t[args.metric].sort_values(ascending=args.metric in LOWER_IS_BETTER, na_position="last").index
+    with pd.option_context("display.width", 200, "display.max_columns", 30, "display.precision", 3):
+        print("=== Current defaults ===")
+        print(t.iloc[[0]].to_string(index=False))
+        print(f"=== Top {args.top} by {args.metric} ===")
+        print(t.loc[order[:args.top]].to_string(index=False))
+        if len(res["cv"]):
+            cv = res["cv"]
+            print(f"=== {args.folds}-fold CV ({args.metric}) === train {cv['train'].mean():.3f}, "
+                  f"held-out {cv['test'].mean():.3f} ± {cv['test'].std():.3f}, "
+                  f"defaults held-out {cv['default_test'].mean():.3f}")
+    if args.out:
+        t.loc[order].to_csv(args.out, index=False)
+        print("Saved:", args.out)
+    if args.save_best:
+        b = t.loc[res["best"]]
+        with open(args.save_best, "w", encoding="utf-8") as f:
+            json.dump(dict(scorer=sc.name, metric=args.metric, params={k: float(b[k]) for k in sc.params},
+                           metrics={k: float(b[k]) for k in METRICS}, n=int(len(y))), f, indent=2)
+        print("Saved:", args.save_best)
@@ -0,0 +1,639 @@
+# cmq_ingest.py
+# Local ingest server for the browser exports (asyncio, stdlib HTTP/1.1) + fake load client
+# - POST/PUT /upload?module=SD&pid=P003[&filename=...][&ts=YYYYMMDD_HHMMSS]  body = the exported file
+#   (Content-Length or chunked, streamed to disk in 64 KB pieces, never held in memory)
+#   -> <root>/<MOD>/raw/MOD_PID_YYYYMMDD_HHMMSS.ext (RT app exports keep their infix: RT_touches_PID_...;
+#   names the apps already give -- RT_*_PID_stamp.csv, ataxia_data_PID_ms.json -- supply pid / time;
+#   otherwise ts, else server local time). Same name + same bytes -> "duplicate"; same name, other
+#   bytes -> next free second
+# - Analysis per upload, on a bounded process pool (the event loop only moves bytes):
+#   SD audio -> speech_batch.analyse_one (run_pipeline), LD app JSON -> ld_analytics.analyse_files,
+#   RT frame logs (*_frames.csv) -> rt_replay.rescore_session; result rows appended (by the loop, one
+#   writer) to <root>/data/csv/MOD_PID_YYYYMMDD.csv (record_id tables, picked up by cmq_aggregate.py).
+#   Other exports (RT app CSVs, SD reading CSV / JSON) are stored only
+# - Backpressure: at most max_pending analysis jobs (queued + running); a further upload that needs
+#   analysis gets 503 + Retry-After before its body is read. At most max_uploads bodies are read at once
+#   (the rest wait in the kernel's TCP buffers)
+# - Status: GET /jobs/<id> (queued / running / done / error + result rows), GET /jobs (recent),
+#   GET /status (counts, queue depth, event-loop lag). CORS open so the web apps can POST directly;
+#   `serve` always requires a token (random one printed at start unless --token is given)
+# - SIGTERM / SIGINT: stop accepting, shut the analysis pool down (no orphaned workers)
+# - `load`: N fake stations upload synthetic SD / RT / LD sessions concurrently, retry on 503, poll
+#   their jobs to completion and report latency / throughput / server loop lag
+
+import os, re, sys, csv, json, time, math, signal, hashlib, secrets, asyncio, argparse, tempfile, subprocess
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import List, Dict, Tuple, Optional
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from cmq_records import parse_record_name, file_sha1, MODULES, EXPORTS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _d in (("SD", "archive_preofficial"), ("RT", "archive_preofficial"), ("LD", "archive_preofficial")):
+    sys.path.insert(0, os.path.join(ROOT, *_d))
+
+DEFAULT_PORT = 8770
+CHUNK = 1 << 16
+MAX_HEADER = 1 << 16
+MAX_UPLOAD_MB = 512
+AUDIO_EXTS = (".wav", ".webm", ".ogg", ".mp3", ".flac", ".m4a")
+UPLOAD_EXTS = (".csv", ".json") + AUDIO_EXTS
+KEEP_JOBS = 10000
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 401: "Unauthorized",
+           404: "Not Found", 405: "Method Not Allowed", 411: "Length Required", 413: "Payload Too Large",
+           415: "Unsupported Media Type", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class HTTPError(Exception):
+    def __init__(self, code: int, msg: str, headers: Optional[Dict] = None):
+        super().__init__(msg)
+        self.code, self.headers = code, headers or {}
+
+# -------------------------
+# Naming & analysis routing
+# -------------------------
+def ingest_name(filename: str, module: str = "", pid: str = "", ts: str = "",
+                now: Optional[datetime] = None) -> Tuple[str, Dict[str, str]]:
+    # -> (file name under <MOD>/raw, parsed record); raises HTTPError(400 / 415)
+    rec = parse_record_name(filename or "")
+    mod = (module or rec["module"]).upper()
+    if mod not in MODULES:
+        raise HTTPError(400, f"module must be one of {MODULES}")
+    if rec["module"] and rec["module"] != mod:
+        raise HTTPError(400, f"file name says {rec['module']}, upload says {mod}")
+    pid = re.sub(r"[^A-Za-z0-9-]+", "-", pid or rec["pid"]).strip("-")
+    if not pid:
+        raise HTTPError(400, "pid missing (query ?pid= or a MOD_PID_... file name)")
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in UPLOAD_EXTS:
+        raise HTTPError(415, f"extension {ext or '(none)'} not in {UPLOAD_EXTS}")
+    if ts:
+        if not re.fullmatch(r"\d{8}_\d{6}", ts):
+            raise HTTPError(400, "ts must be YYYYMMDD_HHMMSS")
+        date, hms = ts.split("_")
+    elif rec["date"] and rec["time"]:
+        date, hms = rec["date"], rec["time"]
+    else:
+        date, hms = (now or datetime.now()).strftime("%Y%m%d_%H%M%S").split("_")
+    export = rec["export"]
+    name = (f"{mod}_" + (f"{export}_" if export in EXPORTS else "") + f"{pid}_{date}_{hms}"
+            + ("_frames" if export == "frames" else "") + ext)
+    return name, dict(module=mod, pid=pid, date=date, time=hms, export=export, ext=ext)
+
+def analysis_kind(rec: Dict[str, str]) -> Optional[str]:
+    if rec["module"] == "SD" and rec["ext"] in AUDIO_EXTS:
+        return "speech"
+    if rec["module"] == "LD" and rec["ext"] == ".json":
+        return "ld"
+    if rec["module"] == "RT" and rec["export"] == "frames":
+        return "rt_replay"
+    return None
+
+def next_free(path: str) -> str:
+    # same record name taken by different bytes -> bump the HHMMSS stamp
+    d, name = os.path.split(path)
+    m = re.search(r"_(\d{8})_(\d{6})(_frames)?(\.\w+)$", name)
+    t = datetime.strptime(m[1] + m[2], "%Y%m%d%H%M%S")
+    while os.path.exists(path):
+        t = datetime.fromtimestamp(t.timestamp() + 1)
+        path = os.path.join(d, name[:m.start()] + t.strftime("_%Y%m%d_%H%M%S") + (m[3] or "") + m[4])
+    return path
+
+# -------------------------
+# Analysis (runs in pool workers; never raises)
+# -------------------------
+def analyse_upload(path: str, kind: str, opts: Dict) -> Dict:
+    t0 = time.perf_counter()
+    try:
+        if kind == "speech":
+            from speech_batch import analyse_one
+            rows = [analyse_one(path, sr=None, f0_engine=opts.get("f0_engine", "pyin"),
+                                cache_dir=opts.get("cache_dir"))["row"]]
+        elif kind == "ld":
+            from ld_analytics import analyse_files
+            rows = analyse_files([path]).to_dict("records")
+        elif kind == "rt_replay":
+            from rt_replay import rescore_session, summarize
+            rows = summarize(rescore_session(path))
+        else:
+            raise ValueError(f"unknown analysis {kind!r}")
+        errs = [str(r.get("error")) for r in rows if r.get("status", "ok") != "ok"]
+        res = dict(status="error" if errs else "ok", error="; ".join(errs), rows=rows)
+    except Exception as e:
+        res = dict(status="error", error=f"{type(e).__name__}: {e}", rows=[])
+    res["run_sec"] = round(time.perf_counter() - t0, 4)
+    return res
+
+def _clean(v):
+    # JSON for browsers: NaN / inf -> null, numpy scalars -> python
+    if isinstance(v, dict):
+        return {k: _clean(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_clean(x) for x in v]
+    if hasattr(v, "item") and not isinstance(v, (str, bytes)):
+        v = v.item()
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    return v
+
+def append_rows(path: str, rows: List[Dict]):
+    # one writer (the event loop): header = existing file's columns + any new keys in order;
+    # new keys (e.g. metrics after an error-only first row) -> file rewritten with the union
+    if not rows:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cols, old = [], []
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            r = csv.DictReader(f)
+            cols = list(r.fieldnames or [])
+            extra = [k for row in rows for k in row if k not in cols]
+            if extra:
+                old = list(r)
+    union = list(dict.fromkeys(cols + [k for row in rows for k in row]))
+    if cols and union == cols:
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=cols, restval="").writerows(rows)
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=union, restval="")
+        w.writeheader()
+        w.writerows(old + rows)
+    os.replace(tmp, path)
+
+# -------------------------
+# Server
+# -------------------------
+class IngestServer:
+    def __init__(self, root: str = ROOT, workers: int = 2, max_pending: int = 32, max_uploads: int = 16,
+                 max_upload_mb: float = MAX_UPLOAD_MB, token: Optional[str] = None, opts: Optional[Dict] = None):
+        # opts: passed to every analysis job (f0_engine, cache_dir)
+        self.root, self.workers, self.token = root, max(1, workers), token
+        self.max_pending, self.max_uploads, self.max_bytes = max_pending, max_uploads, int(max_upload_mb*2**20)
+        self.opts = dict(opts or {})
+        self.jobs: Dict[str, Dict] = {}
+        self.order = deque()
+        self.stats = Counter()
+        self.lag = dict(max_ms=0.0, sum_ms=0.0, n=0)
+        self.t0 = time.time()
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_pending)
+        self.upload_gate = asyncio.Semaphore(self.max_uploads)
+        self.tasks = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self._lag_monitor()))
+        self.server = await asyncio.start_server(self._client, host, port, limit=MAX_HEADER)
+        return self.server
+
+    async def close(self):
+        self.server.close()
+        for t in self.tasks:
+            t.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    # --- event-loop health: how late a 100 ms timer fires (blocking work shows up here)
+    async def _lag_monitor(self, period: float = 0.1):
+        loop = asyncio.get_running_loop()
+        while True:
+            t = loop.time()
+            await asyncio.sleep(period)
+            ms = max(0.0, (loop.time() - t - period)*1000.0)
+            self.lag["max_ms"] = max(self.lag["max_ms"], ms)
+            self.lag["sum_ms"] += ms
+            self.lag["n"] += 1
+
+    # --- analysis dispatch: one task per pool worker, so the pool never holds more than it can run
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.update(state="running", t_started=time.time())
+            try:
+                res = await loop.run_in_executor(self.pool, analyse_upload, job["path"], job["kind"], self.opts)
+            except BrokenProcessPool as e:
+                self.pool = ProcessPoolExecutor(self.workers)      # a crashed worker takes the pool down
+                res = dict(status="error", error=f"worker crashed: {e}", rows=[], run_sec=0.0)
+            except Exception as e:
+                res = dict(status="error", error=f"{type(e).__name__}: {e}", rows=[], run_sec=0.0)
+            try:
+                append_rows(job["result_csv"], res["rows"])
+            except OSError as e:
+                res.update(status="error", error=f"result csv: {e}")
+            job.update(state="done" if res["status"] == "ok" else "error", error=res["error"],
+                       rows=_clean(res["rows"]), run_sec=res["run_sec"], t_done=time.time())
+            job["wait_sec"] = round(job["t_started"] - job["t_received"], 4)
+            self.stats["jobs_" + job["state"]] += 1
+            self.slots.release()
+            self.queue.task_done()
+
+    def _add_job(self, job: Dict):
+        self.jobs[job["id"]] = job
+        self.order.append(job["id"])
+        while len(self.order) > KEEP_JOBS:
+            old = self.jobs.get(self.order[0])
+            if old is not None and old["state"] in ("queued", "running"):
+                break
+            self.jobs.pop(self.order.popleft(), None)
+
+    # --- HTTP
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 400, dict(error="header too large"), close=True)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, _ = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._send(writer, 400, dict(error="bad request line"), close=True)
+                    break
+                hdr = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+                keep = hdr.get("connection", "").lower() != "close"
+                try:
+                    code, body, extra, consumed = await self._route(method.upper(), target, hdr, reader, writer)
+                except HTTPError as e:
+                    code, body, extra, consumed = e.code, dict(error=str(e)), e.headers, False
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                keep = keep and (consumed or not _has_body(hdr))
+                await self._send(writer, code, body, extra, close=not keep)
+                if not keep:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _send(self, writer, code: int, body: Dict, extra: Optional[Dict] = None, close: bool = False):
+        data = json.dumps(_clean(body)).encode() if code != 204 else b""
+        h = {"Content-Type": "application/json", "Content-Length": str(len(data)),
+             "Access-Control-Allow-Origin": "*", "Connection": "close" if close else "keep-alive", **(extra or {})}
+        writer.write((f"HTTP/1.1 {code} {REASONS.get(code, '')}\r\n"
+                      + "".join(f"{k}: {v}\r\n" for k, v in h.items()) + "\r\n").encode("latin-1") + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _route(self, method: str, target: str, hdr: Dict, reader, writer) -> Tuple[int, Dict, Dict, bool]:
+        url = urlsplit(target)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+        if method == "OPTIONS":
+            return 204, {}, {"Access-Control-Allow-Methods": "GET, POST, PUT, OPTIONS",
+                             "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Filename",
+                             "Access-Control-Max-Age": "600"}, True
+        if self.token and hdr.get("authorization") != f"Bearer {self.token}" and q.get("token") != self.token:
+            raise HTTPError(401, "bad or missing token")
+        if path == "/upload":
+            if method not in ("POST", "PUT"):
+                raise HTTPError(405, "use POST or PUT")
+            return await self._upload(q, hdr, reader, writer)
+        if method != "GET":
+            raise HTTPError(405, "use GET")
+        if path == "/status":
+            return 200, self.status(), {}, True
+        if path == "/jobs":
+            ids = list(self.order)[-int(q.get("limit", 100)):]
+            return 200, dict(jobs=[_job_view(self.jobs[i], rows=False) for i in ids if i in self.jobs]), {}, True
+        if path.startswith("/jobs/"):
+            job = self.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                raise HTTPError(404, "no such job")
+            return 200, _job_view(job), {}, True
+        raise HTTPError(404, f"no route {path}")
+
+    async def _upload(self, q: Dict, hdr: Dict, reader, writer) -> Tuple[int, Dict, Dict, bool]:
+        filename = unquote(q.get("filename") or hdr.get("x-filename", ""))
+        name, rec = ingest_name(os.path.basename(filename) or f"upload{q.get('ext', '')}",
+                                q.get("module", ""), q.get("pid", ""), q.get("ts", ""))
+        kind = analysis_kind(rec)
+        n = hdr.get("content-length")
+        chunked = "chunked" in hdr.get("transfer-encoding", "").lower()
+        if n is None and not chunked:
+            raise HTTPError(411, "Content-Length or chunked body required")
+        if n is not None and int(n) > self.max_bytes:
+            raise HTTPError(413, f"upload larger than {self.max_bytes >> 20} MB")
+        if kind and self.slots.locked():
+            # backpressure: refuse before reading the body; the station retries later
+            self.stats["rejected_busy"] += 1
+            raise HTTPError(503, "analysis queue full", {"Retry-After": str(self._retry_after())})
+        if kind:
+            await self.slots.acquire()
+        try:
+            async with self.upload_gate:
+                if hdr.get("expect", "").lower() == "100-continue":
+                    # the client sends the body only now (and got a 503 above instead of uploading in vain)
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                self.stats["uploads_active"] += 1
+                try:
+                    dest, size, sha1, dup = await self._receive(reader, n, chunked, rec["module"], name)
+                finally:
+                    self.stats["uploads_active"] -= 1
+        except BaseException:
+            if kind:
+                self.slots.release()
+            raise
+        self.stats["uploads"] += 1
+        self.stats["bytes"] += size
+        rid = parse_record_name(dest)["record_id"]
+        out = dict(record_id=rid, path=os.path.relpath(dest, self.root), size=size, sha1=sha1)
+        if dup or not kind:
+            if kind:
+                self.slots.release()
+            self.stats["duplicates" if dup else "stored_only"] += 1
+            return (200 if dup else 201), dict(out, state="duplicate" if dup else "stored", job=None), {}, True
+        job = dict(id=f"{int(self.t0):x}-{self.stats['jobs'] + 1}", state="queued", kind=kind, module=rec["module"],
+                   pid=rec["pid"], t_received=time.time(), path=dest,
+                   result_csv=os.path.join(self.root, "data", "csv", f"{rec['module']}_{rec['pid']}_{rec['date']}.csv"),
+                   **{k: out[k] for k in ("record_id", "size", "sha1")})
+        self.stats["jobs"] += 1
+        self._add_job(job)
+        self.queue.put_nowait(job)
+        return 201, dict(out, state="queued", job=job["id"], queue_depth=self.queue.qsize()), {}, True
+
+    async def _receive(self, reader, n: Optional[str], chunked: bool, module: str, name: str):
+        # stream the body into <MOD>/raw/.<name>.part (sha1 on the fly), then rename into place
+        d = os.path.join(self.root, module, "raw")
+        os.makedirs(d, exist_ok=True)
+        dest = os.path.join(d, name)
+        part = os.path.join(d, f".{name}.{os.getpid()}.{id(reader)}.part")
+        h, size = hashlib.sha1(), 0
+        try:
+            with open(part, "wb") as f:
+                async for piece in _body(reader, n, chunked):
+                    size += len(piece)
+                    if size > self.max_bytes:
+                        raise HTTPError(413, f"upload larger than {self.max_bytes >> 20} MB")
+                    h.update(piece)
+                    f.write(piece)
+            sha1 = h.hexdigest()
+            while os.path.exists(dest):
+                if os.path.getsize(dest) == size and await asyncio.to_thread(file_sha1, dest) == sha1:
+                    os.remove(part)
+                    return dest, size, sha1, True
+                dest = next_free(dest)
+            os.replace(part, dest)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        return dest, size, sha1, False
+
+    def _retry_after(self) -> int:
+        # rough: one pool round of the recent mean job time
+        done = [j["run_sec"] for j in list(self.jobs.values())[-50:] if j.get("run_sec")]
+        return max(1, int(math.ceil((sum(done)/len(done) if done else 1.0)*self.max_pending/self.workers/4)))
+
+    def status(self) -> Dict:
+        states = Counter(j["state"] for j in self.jobs.values())
+        return dict(uptime_sec=round(time.time() - self.t0, 1), root=self.root, workers=self.workers,
+                    max_pending=self.max_pending, queue_depth=self.queue.qsize(), jobs=dict(states),
+                    uploads=self.stats["uploads"], uploads_active=self.stats["uploads_active"],
+                    bytes=self.stats["bytes"], duplicates=self.stats["duplicates"],
+                    stored_only=self.stats["stored_only"], rejected_busy=self.stats["rejected_busy"],
+                    loop_lag_ms=dict(max=round(self.lag["max_ms"], 2),
+                                     mean=round(self.lag["sum_ms"]/max(self.lag["n"], 1), 3)))
+
+def _has_body(hdr: Dict) -> bool:
+    return int(hdr.get("content-length") or 0) > 0 or "chunked" in hdr.get("transfer-encoding", "").lower()
+
+async def _body(reader, n: Optional[str], chunked: bool):
+    if not chunked:
+        left = int(n)
+        while left > 0:
+            piece = await reader.read(min(CHUNK, left))
+            if not piece:
+                raise asyncio.IncompleteReadError(b"", left)
+            left -= len(piece)
+            yield piece
+        return
+    while True:
+        size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+        if size == 0:
+            while (await reader.readuntil(b"\r\n")) != b"\r\n":    # trailers
+                pass
+            return
+        while size > 0:
+            piece = await reader.read(min(CHUNK, size))
+            if not piece:
+                raise asyncio.IncompleteReadError(b"", size)
+            size -= len(piece)
+            yield piece
+        await reader.readexactly(2)
+
+def _job_view(job: Dict, rows: bool = True) -> Dict:
+    skip = ("path", "result_csv") + (() if rows else ("rows",))
+    return {k: v for k, v in job.items() if k not in skip}
+
+async def serve(root: str, host: str, port: int, **kw):
+    srv = IngestServer(root, **kw)
+    server = await srv.start(host, port)
+    print(f"ingest server on http://{host}:{port} -> {root} ({srv.workers} analysis workers, "
+          f"max {srv.max_pending} pending)", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):   # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        await srv.close()
+
+# -------------------------
+# Fake stations (load test)
+# -------------------------
+def fake_exports(sr: int = 16000, dur: float = 5.0) -> Dict[str, Tuple[str, bytes]]:
+    # one synthetic export per kind: SD wav (vowel runs), RT app touches CSV, RT frame log, LD app JSON
+    import io, wave
+    import numpy as np
+    t = np.arange(int(sr*dur))/sr
+    y = 0.2*np.sin(2*np.pi*140*t*(1 + 0.03*np.sin(2*np.pi*5*t)))*((t % 1.1) < 0.8)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1); w.setsampwidth(2); w.setframerate(sr)
+        w.writeframes((y*32767).astype("<i2").tobytes())
+    rng = np.random.default_rng(0)
+    touches = "trial_idx,frame_idx,timestamp,x_px,y_px,inside\n" + "\n".join(
+        f"{i//300},{i},{i*33},{200 + rng.integers(0, 400)},{150 + rng.integers(0, 300)},{int(rng.random() < 0.6)}"
+        for i in range(3000))
+    frames = "# preset=251020 seed=7\nframe_idx,t,tip_x,tip_y\n" + "\n".join(
+        f"{i},{i/30:.4f},{320 + int(200*math.cos(i/15))},{240 + int(150*math.sin(i/15))}" for i in range(900))
+    xs = np.linspace(35, 865, 400)
+    stroke = [[float(x), float(300 + 8*math.sin(x/20)), float(k*16)] for k, x in enumerate(xs)]
+    ld = json.dumps(dict(patient=dict(id="X"), test="Horizontal Test", stats=dict(outOfBounds=0, startFails=0),
+                         touches=[stroke]))
+    return dict(sd=("SD.wav", buf.getvalue()), rt_touches=("RT_touches_X_20250101_000000.csv", touches.encode()),
+                rt_frames=("RT_X_20250101_000000_frames.csv", frames.encode()),
+                ld=("ataxia_data_X_1735689600000.json", ld.encode()))
+
+async def _http(host: str, port: int, method: str, target: str, body: bytes = b"",
+                headers: Optional[Dict] = None) -> Tuple[int, Dict, Dict]:
+    # one request per connection; bodies go with Expect: 100-continue (a 503 costs no upload)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        h = {"Host": f"{host}:{port}", "Connection": "close", "Content-Length": str(len(body)),
+             **({"Expect": "100-continue"} if body else {}), **(headers or {})}
+        writer.write((f"{method} {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in h.items())
+                      + "\r\n").encode("latin-1"))
+        await writer.drain()
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        if body and head[0].split()[1] == "100":
+            for i in range(0, len(body), CHUNK):            # streamed like a browser upload
+                writer.write(body[i:i + CHUNK])
+                await writer.drain()
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        rh = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in head[1:] if l)}
+        data = await reader.readexactly(int(rh.get("content-length", 0)))
+        return int(head[0].split()[1]), json.loads(data or b"{}"), rh
+    finally:
+        writer.close()
+
+async def load_test(url: str, stations: int = 20, sessions: int = 3, mix: str = "sd,rt_touches,rt_frames,ld",
+                    token: Optional[str] = None, poll: float = 0.25, timeout: float = 1800.0) -> Dict:
+    u = urlsplit(url)
+    host, port = u.hostname or "127.0.0.1", u.port or DEFAULT_PORT
+    files = fake_exports()
+    kinds = [k.strip() for k in mix.split(",") if k.strip()]
+    auth = {"Authorization": f"Bearer {token}"} if token else {}
+    up_lat, retries, jobs, errors = [], Counter(), [], []
+
+    async def station(s: int):
+        for k in range(sessions):
+            kind = kinds[(s + k) % len(kinds)]
+            fname, body = files[kind]
+            module = kind[:2].upper()
+            i = s*sessions + k
+            ts = f"20250101_{i//3600 % 24:02d}{i//60 % 60:02d}{i % 60:02d}"
+            q = f"/upload?module={module}&pid=ST{s:03d}&filename={fname}&ts={ts}"
+            while True:
+                t0 = time.perf_counter()
+                code, r, rh = await _http(host, port, "POST", q, body, auth)
+                if code == 503:
+                    retries[kind] += 1
+                    await asyncio.sleep(float(rh.get("retry-after", 1)))
+                    continue
+                up_lat.append(time.perf_counter() - t0)
+                if code >= 400:
+                    errors.append(r.get("error"))
+                elif r.get("job"):
+                    jobs.append((r["job"], time.perf_counter()))
+                break
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(station(s) for s in range(stations)))
+    t_up = time.perf_counter() - t_start
+    done, states, e2e = {}, Counter(), []
+    while len(done) < len(jobs) and time.perf_counter() - t_start < timeout:
+        for jid, t_sent in jobs:
+            if jid in done:
+                continue
+            _, j, _ = await _http(host, port, "GET", f"/jobs/{jid}", headers=auth)
+            if j.get("state") in ("done", "error"):
+                done[jid] = j
+                states[j["state"]] += 1
+                e2e.append(time.perf_counter() - t_sent)
+        await asyncio.sleep(poll)
+    _, st, _ = await _http(host, port, "GET", "/status", headers=auth)
+    pct = lambda v, p: sorted(v)[min(len(v) - 1, int(p*len(v)))] if v else float("nan")
+    return dict(stations=stations, uploads=len(up_lat), upload_errors=len(errors), retries_503=dict(retries),
+                upload_sec=t_up, upload_p50=pct(up_lat, 0.5), upload_p95=pct(up_lat, 0.95), upload_max=max(up_lat),
+                jobs=len(jobs), job_states=dict(states), total_sec=time.perf_counter() - t_start,
+                job_e2e_p50=pct(e2e, 0.5), job_e2e_p95=pct(e2e, 0.95),
+                job_errors=[j.get("error") for j in done.values() if j["state"] == "error"][:3],
+                server=st)
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CeMoQu ingest server (browser exports -> raw folders + analysis)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve")
+    p.add_argument("--root", default=ROOT, help="repository root holding LD/ RT/ SD/ data/")
+    p.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to accept other stations on the LAN")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="analysis processes")
+    p.add_argument("--max-pending", type=int, default=32, help="analysis jobs queued + running before 503")
+    p.add_argument("--max-uploads", type=int, default=16, help="bodies read concurrently")
+    p.add_argument("--max-upload-mb", type=float, default=MAX_UPLOAD_MB)
+    p.add_argument("--token", default=None,
+                   help="Authorization: Bearer <token> (or ?token=); default: a random token, printed")
+    p.add_argument("--f0-engine", default="pyin", help="speech_pipeline F0 engine for SD audio")
+    p.add_argument("--cache", default=None, help="speech feature cache directory")
+    p = sub.add_parser("load", help="fake stations against a running server (or --spawn one)")
+    p.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    p.add_argument("--stations", type=int, default=20)
+    p.add_argument("--sessions", type=int, default=3, help="uploads per station")
+    p.add_argument("--mix", default="sd,rt_touches,rt_frames,ld")
+    p.add_argument("--token", default=None)
+    p.add_argument("--spawn", action="store_true", help="start a server on a temporary root for the test")
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--max-pending", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        if not args.token:
+            args.token = secrets.token_urlsafe(16)
+            print(f"token: {args.token}", flush=True)
+        try:
+            asyncio.run(serve(os.path.abspath(args.root), args.host, args.port, workers=args.workers,
+                              max_pending=args.max_pending, max_uploads=args.max_uploads,
+                              max_upload_mb=args.max_upload_mb, token=args.token,
+                              opts=dict(f0_engine=args.f0_engine, cache_dir=args.cache)))
+        except KeyboardInterrupt:
+            pass
+    else:
+        proc = None
+        if args.spawn:
+            args.token = args.token or secrets.token_urlsafe(16)
+            root = tempfile.mkdtemp(prefix="cmq_ingest_")
+            port = urlsplit(args.url).port or DEFAULT_PORT
+            proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", "--root", root,
+                                     "--port", str(port), "--workers", str(args.workers), "--max-pending",
+                                     str(args.max_pending), "--f0-engine", "yin", "--token", args.token],
+                                    stdout=subprocess.DEVNULL)
+            for _ in range(200):
+                try:
+                    asyncio.run(_http("127.0.0.1", port, "GET", "/status"))
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            print(f"spawned server (root {root})")
+        try:
+            r = asyncio.run(load_test(args.url, args.stations, args.sessions, args.mix, args.token))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=60)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+        st = r.pop("server")
+        print(f"{r['stations']} stations, {r['uploads']} uploads in {r['upload_sec']:.2f}s "
+              f"(p50 {1000*r['upload_p50']:.0f} ms, p95 {1000*r['upload_p95']:.0f} ms, max {1000*r['upload_max']:.0f} ms), "
+              f"503 retries {r['retries_503']}, upload errors {r['upload_errors']}")
+        print(f"{r['jobs']} analysis jobs {r['job_states']} in {r['total_sec']:.2f}s "
+              f"(upload -> result p50 {r['job_e2e_p50']:.2f}s, p95 {r['job_e2e_p95']:.2f}s)")
+        if r["job_errors"]:
+            print("  job errors:", r["job_errors"])
+        print(f"server: {st['uploads']} uploads, {st['bytes']/2**20:.1f} MB, {st['stored_only']} stored only, "
+              f"{st['rejected_busy']} rejected busy, event-loop lag max {st['loop_lag_ms']['max']:.1f} ms "
+              f"(mean {st['loop_lag_ms']['mean']:.2f} ms)")
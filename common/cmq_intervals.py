@@ -0,0 +1,115 @@
+# cmq_intervals.py
+# Interval arrays shared by the module pipelines (SD VAD / pauses / syllables, RT / LD time inside target)
+# - Interval array: (K, 2) int64 rows [start, stop), sorted and non-overlapping, in any index unit
+#   (frames, samples, ms); every operation is vectorized numpy, no Python loop per frame or interval
+# - runs(mask): run-length encoding of a boolean mask -> intervals where it is True
+# - merge_gaps(iv, max_gap): joins intervals whose gap is <= max_gap (hangover, short-pause bridging)
+# - min_length(iv, n): drops intervals shorter than n
+# - complement(iv, start, stop): the gaps inside [start, stop) (pauses of a voiced-segment list)
+# - intersect(a, b): overlaps of two interval arrays (searchsorted, O((A + B) log B))
+# - contains(iv, points): index of the interval holding each point, -1 outside (searchsorted)
+# - to_mask(iv, n): back to a boolean mask; durations(iv, t): run lengths on a timestamp array
+#   (a run lasts until the first sample after it, the last one until the last sample)
+
+import argparse
+from typing import List, Tuple, Sequence
+
+import numpy as np
+
+# -------------------------
+# Construction
+# -------------------------
+def as_intervals(segs) -> np.ndarray:
+    # list of (start, stop) pairs / (K, 2) array -> (K, 2) int64
+    return np.asarray(segs, dtype=np.int64).reshape(-1, 2)
+
+def to_pairs(iv: np.ndarray) -> List[Tuple[int, int]]:
+    return [(int(s), int(e)) for s, e in iv.tolist()]
+
+def runs(mask) -> np.ndarray:
+    m = np.asarray(mask, dtype=bool)
+    d = np.diff(m.view(np.int8), prepend=np.int8(0), append=np.int8(0))
+    return np.stack([np.flatnonzero(d == 1), np.flatnonzero(d == -1)], axis=1).astype(np.int64)
+
+def to_mask(iv: np.ndarray, n: int) -> np.ndarray:
+    iv = clip(iv, 0, n)
+    d = np.bincount(iv[:, 0], minlength=n + 1) - np.bincount(iv[:, 1], minlength=n + 1)
+    return np.cumsum(d[:n]) > 0
+
+# -------------------------
+# Operations
+# -------------------------
+def lengths(iv: np.ndarray) -> np.ndarray:
+    return iv[:, 1] - iv[:, 0]
+
+def clip(iv: np.ndarray, start: int, stop: int) -> np.ndarray:
+    c = np.clip(iv, start, stop)
+    return c[c[:, 1] > c[:, 0]]
+
+def merge_gaps(iv: np.ndarray, max_gap: int = 0) -> np.ndarray:
+    # max_gap=0 joins touching intervals only
+    if len(iv) < 2:
+        return iv.copy()
+    split = iv[1:, 0] - iv[:-1, 1] > max_gap
+    return np.stack([iv[np.r_[True, split], 0], iv[np.r_[split, True], 1]], axis=1)
+
+def min_length(iv: np.ndarray, n: int) -> np.ndarray:
+    return iv[lengths(iv) >= n]
+
+def complement(iv: np.ndarray, start: int, stop: int) -> np.ndarray:
+    edges = np.concatenate([[start], clip(iv, start, stop).ravel(), [stop]]).reshape(-1, 2)
+    return edges[edges[:, 1] > edges[:, 0]]
+
+def intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # for each a_i the b rows it overlaps are b[j0:j1]; expanded without a loop
+    j0 = np.searchsorted(b[:, 1], a[:, 0], side="right")
+    j1 = np.searchsorted(b[:, 0], a[:, 1], side="left")
+    cnt = np.maximum(j1 - j0, 0)
+    ia = np.repeat(np.arange(len(a)), cnt)
+    jb = np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt) + np.repeat(j0, cnt)
+    out = np.stack([np.maximum(a[ia, 0], b[jb, 0]), np.minimum(a[ia, 1], b[jb, 1])], axis=1)
+    return out[out[:, 1] > out[:, 0]]
+
+def contains(iv: np.ndarray, points) -> np.ndarray:
+    p = np.asarray(points)
+    i = np.searchsorted(iv[:, 0], p, side="right") - 1
+    ok = i >= 0
+    ok[ok] = p[ok] < iv[i[ok], 1]
+    return np.where(ok, i, -1)
+
+def durations(iv: np.ndarray, t: Sequence[float]) -> np.ndarray:
+    # iv over sample indices of t (e.g. runs of an RT `inside` column) -> seconds per run
+    t = np.asarray(t, dtype=np.float64)
+    if len(iv) == 0:
+        return np.zeros(0)
+    return t[np.minimum(iv[:, 1], len(t) - 1)] - t[iv[:, 0]]
+
+# -------------------------
+# CLI: timing on a speech-like mask (correctness vs the Python loops: test_cmq_intervals.py)
+# -------------------------
+if __name__ == "__main__":
+    import time
+    parser = argparse.ArgumentParser(description="Interval arrays: timing on a speech-like mask")
+    parser.add_argument("--minutes", type=float, default=60.0, help="mask length at a 10 ms hop")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = int(args.minutes*60*100)
+    # speech-like mask: runs of 5-150 frames on / off
+    mask = np.repeat(np.arange(n) % 2 == 0, rng.integers(5, 150, n))[:n]
+    mask ^= rng.random(n) < 0.01                                   # 1 % single-frame flips
+    t0 = time.perf_counter()
+    iv = runs(mask)
+    pau = complement(iv, 0, n)
+    m = to_mask(iv, n)
+    t_vec = time.perf_counter() - t0
+    assert np.array_equal(m, mask) and np.array_equal(to_mask(pau, n), ~mask)
+    sm = min_length(merge_gaps(iv, 5), 10)
+    other = runs(rng.random(n) < 0.5)
+    t0 = time.perf_counter()
+    ov = intersect(sm, other)
+    t_int = time.perf_counter() - t0
+    print(f"{n} frames ({args.minutes:g} min @ 10 ms), {len(iv)} runs, {len(pau)} gaps: "
+          f"runs + complement + to_mask {1000*t_vec:.1f} ms")
+    print(f"  merge_gaps(5) + min_length(10): {len(sm)} runs; intersect with {len(other)} runs: "
+          f"{len(ov)} overlaps in {1000*t_int:.1f} ms")
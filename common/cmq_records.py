@@ -0,0 +1,44 @@
+# cmq_records.py
+# Record naming shared by the common/ tools (README "Repository Structure")
+# - MOD_PID_YYYYMMDD[_HHMMSS].ext, plus the app download names:
+#   RT_touches_ / RT_targets_summary_ / RT_final_summary_<PID>_<YYYYMMDD_HHMMSS>.csv (RT/app.js),
+#   <record_id>_frames.csv (rt_pipeline frame logs), ataxia_data_<PID>_<epoch ms>.json (LD/app.js, UTC)
+# - parse_record_name() -> record_id (MOD_PID_DATE[_TIME], export infix / suffix dropped), module, pid,
+#   date, time, export ("" for plain MOD_PID_DATE files)
+# - file_sha1(): content hash for the incremental manifests
+
+import os, re, hashlib
+from datetime import datetime, timezone
+from typing import Dict
+
+MODULES = ("LD", "RT", "SD")
+EXPORTS = ("touches", "targets_summary", "final_summary")
+
+RECORD_RE = re.compile(r"^(?P<module>LD|RT|SD)_(?:(?P<export>" + "|".join(EXPORTS) + r")_)?"
+                       r"(?P<pid>.+?)_(?P<date>\d{8})(?:_(?P<time>\d{6}))?(?:_(?P<suffix>frames))?$",
+                       re.IGNORECASE)
+LD_APP_RE = re.compile(r"^ataxia_data_(?P<pid>.+)_(?P<ms>\d{12,14})$")
+
+def parse_record_name(path: str) -> Dict[str, str]:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    m = RECORD_RE.match(stem)
+    if m:
+        d = m.groupdict(default="")
+        mod = d["module"].upper()
+        rid = "_".join(v for v in (mod, d["pid"], d["date"], d["time"]) if v)
+        return dict(record_id=rid, module=mod, pid=d["pid"], date=d["date"], time=d["time"],
+                    export=(d["export"] or d["suffix"]).lower())
+    m = LD_APP_RE.match(stem)
+    if m:
+        ts = datetime.fromtimestamp(int(m["ms"])/1000.0, tz=timezone.utc)
+        date, hms = ts.strftime("%Y%m%d"), ts.strftime("%H%M%S")
+        return dict(record_id=f"LD_{m['pid']}_{date}_{hms}", module="LD", pid=m["pid"], date=date, time=hms,
+                    export="")
+    return dict(record_id=stem, module="", pid="", date="", time="", export="")
+
+def file_sha1(path: str, block: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
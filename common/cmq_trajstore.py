@@ -0,0 +1,372 @@
+# cmq_trajstore.py
+# Columnar, memory-mappable store for the trajectory exports (parse the text once, map it afterwards)
+# - Sources: RT browser touches (RT_touches_<PID>_<YYYYMMDD_HHMMSS>.csv: trial_idx, frame_idx, timestamp,
+#   x_px, y_px, inside), LD JSON exports with `touches` (strokes of [x, y, t_ms]), rt_pipeline frame logs
+#   (<record_id>_frames.csv: frame_idx, t, tip_x, tip_y); kind detected from the CSV header / JSON keys
+# - Layout: one raw little-endian file per column (t.f8, x.f4, y.f4, trial.i4, frame.i4, flags.u1),
+#   sessions appended back to back; index.json maps each session to its [start, stop) row range
+#   -> TrajStore.session() returns zero-copy slices of np.memmap columns
+# - Incremental / idempotent ingest: sources with the same size + mtime are skipped without reading,
+#   otherwise sha1-compared; changed sources are re-appended and the index repointed (the old rows
+#   stay as garbage until `compact`). Columns are written before index.json is atomically replaced,
+#   so an interrupted ingest leaves only unreferenced tail rows, trimmed on the next run
+# - Session keys: <record_id>:<kind> with record_id from cmq_records.parse_record_name. Byte-identical
+#   copies under other paths are recorded as `copies` (skipped on size + mtime like the source); another
+#   existing file with the same key but different bytes is a `conflict` (error, the stored session is kept).
+#   Results are committed in input order, so the outcome does not depend on which worker finishes first
+# - t is seconds: epoch for RT touches (ISO timestamp) and LD (Date.now()), capture clock for frame logs
+# - Missing fingertip -> x, y NaN; flags: 1 = inside target (RT), 2 = first point of a stroke / trial
+
+import os, json, time, argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from cmq_records import parse_record_name, file_sha1
+
+COLUMNS = {"t": "<f8", "x": "<f4", "y": "<f4", "trial": "<i4", "frame": "<i4", "flags": "u1"}
+FLAG_INSIDE = 1
+FLAG_START = 2
+SOURCE_EXTS = (".csv", ".json")
+INDEX_NAME = "index.json"
+STORE_VERSION = 1
+
+class NoTrajectory(ValueError):
+    pass
+
+# -------------------------
+# Parsers (path -> meta, columns); run in pool workers
+# -------------------------
+def _columns(n: int, **cols) -> Dict[str, np.ndarray]:
+    out = {}
+    for name, dt in COLUMNS.items():
+        v = cols.get(name)
+        if v is None:
+            v = np.full(n, np.nan) if dt.startswith("<f") else np.zeros(n)
+        out[name] = np.ascontiguousarray(v, dtype=dt)
+    return out
+
+def _starts(key: np.ndarray) -> np.ndarray:
+    s = np.ones(len(key), dtype=bool)
+    s[1:] = key[1:] != key[:-1]
+    return s
+
+def parse_rt_touches(path: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    df = pd.read_csv(path, dtype={"trial_idx": "int32", "frame_idx": "int32", "timestamp": str,
+                                  "x_px": "float32", "y_px": "float32", "inside": "float32"})
+    ts = pd.to_datetime(df["timestamp"], utc=True, format="ISO8601")
+    t = (ts - pd.Timestamp(0, tz="UTC")).dt.total_seconds().to_numpy(dtype=float, na_value=np.nan)
+    trial = df["trial_idx"].to_numpy()
+    flags = (df["inside"].fillna(0).to_numpy() > 0)*FLAG_INSIDE | _starts(trial)*FLAG_START
+    cols = _columns(len(df), t=t, x=df["x_px"].to_numpy(), y=df["y_px"].to_numpy(), trial=trial,
+                    frame=df["frame_idx"].to_numpy(), flags=flags)
+    return {}, cols
+
+def parse_frame_log(path: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    with open(path, newline="") as fh:
+        first = fh.readline()
+    meta = dict(kv.split("=", 1) for kv in first[1:].split() if "=" in kv) if first.startswith("#") else {}
+    df = pd.read_csv(path, skiprows=1 if first.startswith("#") else 0,
+                     dtype={"frame_idx": "int32", "t": "float64", "tip_x": "float32", "tip_y": "float32"})
+    n = len(df)
+    flags = np.zeros(n, dtype=np.uint8)
+    flags[:1] = FLAG_START
+    cols = _columns(n, t=df["t"].to_numpy(), x=df["tip_x"].to_numpy(), y=df["tip_y"].to_numpy(),
+                    trial=np.full(n, -1), frame=df["frame_idx"].to_numpy(), flags=flags)
+    return {k: meta[k] for k in ("preset", "seed") if k in meta}, cols
+
+def parse_ld_json(path: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    with open(path, encoding="utf-8") as f:
+        obj = json.load(f)
+    strokes = [s["points"] if isinstance(s, dict) else s for s in obj.get("touches") or []]
+    strokes = [np.asarray(s, dtype=float).reshape(-1, 3) for s in strokes if len(s)]
+    if not strokes:
+        raise NoTrajectory("no touches (LD export without trajectory)")
+    lens = np.array([len(s) for s in strokes])
+    pts = np.concatenate(strokes)
+    trial = np.repeat(np.arange(len(strokes)), lens)
+    frame = np.arange(len(pts)) - np.repeat(np.cumsum(lens) - lens, lens)
+    patient = obj.get("patient") or {}
+    meta = dict(test=obj.get("test", ""), pid=str(patient.get("id", "")),
+                exported=obj.get("timestamp", ""))
+    if obj.get("geometry"):
+        meta["geometry"] = obj["geometry"]
+    cols = _columns(len(pts), t=pts[:, 2]/1000.0, x=pts[:, 0], y=pts[:, 1], trial=trial, frame=frame,
+                    flags=np.where(frame == 0, FLAG_START, 0))
+    return meta, cols
+
+def sniff(path: str) -> Optional[str]:
+    if path.lower().endswith(".json"):
+        return "ld"
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        head = fh.readline()
+        if head.startswith("#"):
+            head = fh.readline()
+    if "x_px" in head and "trial_idx" in head:
+        return "touches"
+    if "tip_x" in head:
+        return "frames"
+    return None
+
+PARSERS = {"touches": parse_rt_touches, "frames": parse_frame_log, "ld": parse_ld_json}
+
+def parse_source(path: str) -> Dict:
+    # never raises; status ok / skipped (not a trajectory export, empty file) / error
+    base = dict(path=path, **parse_record_name(path))
+    try:
+        if os.path.getsize(path) <= 1:
+            return dict(base, status="skipped", error="empty file")
+        kind = sniff(path)
+        if kind is None:
+            return dict(base, status="skipped", error="not a trajectory export")
+        meta, cols = PARSERS[kind](path)
+        if meta.get("pid") and not base["pid"]:
+            base["pid"] = meta["pid"]
+        meta.pop("pid", None)
+        return dict(base, status="ok", error="", kind=kind, meta=meta, cols=cols, sha1=file_sha1(path))
+    except NoTrajectory as e:
+        return dict(base, status="skipped", error=str(e))
+    except Exception as e:
+        return dict(base, status="error", error=f"{type(e).__name__}: {e}")
+
+def collect_sources(spec: str) -> List[str]:
+    if os.path.isdir(spec):
+        return sorted(os.path.join(d, f) for d, _, files in os.walk(spec) for f in files
+                      if f.lower().endswith(SOURCE_EXTS))
+    return [spec] if os.path.isfile(spec) else []
+
+# -------------------------
+# Store
+# -------------------------
+def _sources(s: Dict) -> Dict[str, Tuple[int, float]]:
+    # every path known to hold this session's bytes -> (size, mtime)
+    out = {s["source"]: (s["size"], s["mtime"])}
+    out.update({q: tuple(v) for q, v in s.get("copies", {}).items()})
+    return out
+
+def _set_source(s: Dict, src: str, st: os.stat_result):
+    if src == s["source"]:
+        s["size"], s["mtime"] = st.st_size, st.st_mtime
+    else:
+        s.setdefault("copies", {})[src] = [st.st_size, st.st_mtime]
+
+class TrajStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._maps: Optional[Dict[str, np.ndarray]] = None
+        path = os.path.join(root, INDEX_NAME)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.index = json.load(f)
+        else:
+            self.index = dict(version=STORE_VERSION, columns=COLUMNS, rows=0, sessions={})
+
+    # ---- reading
+    def _col_path(self, name: str) -> str:
+        return os.path.join(self.root, f"{name}.{np.dtype(COLUMNS[name]).str[1:]}")
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        # whole committed columns, memory-mapped read-only
+        if self._maps is None:
+            n = self.index["rows"]
+            self._maps = {name: (np.memmap(self._col_path(name), dtype=dt, mode="r", shape=(n,)) if n
+                                 else np.zeros(0, dtype=dt)) for name, dt in COLUMNS.items()}
+        return self._maps
+
+    def keys(self, module: Optional[str] = None, pid: Optional[str] = None,
+             kind: Optional[str] = None) -> List[str]:
+        return [k for k, s in self.index["sessions"].items()
+                if (module is None or s["module"] == module) and (pid is None or s["pid"] == pid)
+                and (kind is None or s["kind"] == kind)]
+
+    def info(self, key: str) -> Dict:
+        s = self.index["sessions"]
+        if key in s:
+            return s[key]
+        hits = [k for k, v in s.items() if v["record_id"] == key]
+        if len(hits) != 1:
+            raise KeyError(f"{key}: {'ambiguous ' + str(hits) if hits else 'not in store'}")
+        return s[hits[0]]
+
+    def session(self, key: str, cols: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        # zero-copy views (key = record_id:kind, or a record_id with a single source)
+        s = self.info(key)
+        maps = self.columns()
+        return {c: maps[c][s["start"]:s["stop"]] for c in (cols or COLUMNS)}
+
+    def to_frame(self, key: str) -> pd.DataFrame:
+        return pd.DataFrame(self.session(key))
+
+    def __len__(self) -> int:
+        return len(self.index["sessions"])
+
+    # ---- writing (single writer)
+    def _write_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, INDEX_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp, path)
+        self._maps = None
+
+    def _trim(self):
+        # drop column tails beyond the committed row count (interrupted ingest)
+        os.makedirs(self.root, exist_ok=True)
+        n = self.index["rows"]
+        for name, dt in COLUMNS.items():
+            p = self._col_path(name)
+            with open(p, "ab") as f:
+                if f.tell() != n*np.dtype(dt).itemsize:
+                    f.truncate(n*np.dtype(dt).itemsize)
+
+    def _append(self, res: Dict, stat: os.stat_result) -> Dict:
+        cols = res["cols"]
+        n = len(cols["t"])
+        self._maps = None
+        for name in COLUMNS:
+            with open(self._col_path(name), "ab") as f:
+                f.write(cols[name].tobytes())
+        start = self.index["rows"]
+        self.index["rows"] = start + n
+        return dict(record_id=res["record_id"], module=res["module"], pid=res["pid"], date=res["date"],
+                    time=res["time"], kind=res["kind"], start=start, stop=start + n, n=n,
+                    source=os.path.abspath(res["path"]), size=stat.st_size, mtime=stat.st_mtime, sha1=res["sha1"],
+                    copies={}, meta=res["meta"])
+
+    def ingest(self, paths: List[str], workers: Optional[int] = 1, verbose: bool = True) -> Dict[str, int]:
+        sessions = self.index["sessions"]
+        by_source = {src: k for k, s in sessions.items() for src in _sources(s)}
+        counts = dict(added=0, updated=0, unchanged=0, skipped=0, conflict=0, error=0)
+        todo = []
+        for p in dict.fromkeys(paths):
+            st = os.stat(p)
+            src = os.path.abspath(p)
+            key = by_source.get(src)
+            old = sessions.get(key) if key else None
+            if old:
+                size, mtime = _sources(old)[src]
+                if (size, mtime) == (st.st_size, st.st_mtime):
+                    counts["unchanged"] += 1
+                    continue
+                if file_sha1(p) == old["sha1"]:
+                    _set_source(old, src, st)
+                    counts["unchanged"] += 1
+                    continue
+            todo.append(p)
+
+        self._trim()
+        n_done = 0
+
+        def commit(res: Dict):
+            nonlocal n_done
+            n_done += 1
+            p = res["path"]
+            if res["status"] != "ok":
+                counts[res["status"]] += 1
+                if verbose and res["status"] == "error":
+                    print(f"[{n_done}/{len(todo)}] {os.path.basename(p)}: {res['error']}")
+                return
+            key = f"{res['record_id']}:{res['kind']}"
+            src = os.path.abspath(p)
+            prev = sessions.get(key)
+            if prev and prev["sha1"] == res["sha1"]:
+                _set_source(prev, src, os.stat(p))        # same content under another path
+                counts["unchanged"] += 1
+                return
+            if prev and src not in _sources(prev):
+                others = [q for q in _sources(prev) if os.path.exists(q)]
+                if others:
+                    counts["conflict"] += 1
+                    if verbose:
+                        print(f"[{n_done}/{len(todo)}] {os.path.basename(p)}: conflict, {key} is already "
+                              f"{others[0]} with different content (kept)")
+                    return
+            sessions[key] = self._append(res, os.stat(p))
+            counts["updated" if prev else "added"] += 1
+            if verbose:
+                print(f"[{n_done}/{len(todo)}] {key}: {sessions[key]['n']} rows")
+
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(parse_source, p) for p in todo]
+                for p, fut in zip(todo, futures):                 # input order: deterministic key owner
+                    try:
+                        res = fut.result()
+                    except Exception as e:
+                        res = dict(path=p, status="error", error=f"{type(e).__name__}: {e}")
+                    commit(res)
+        else:
+            for p in todo:
+                commit(parse_source(p))
+        self._write_index()
+        return counts
+
+    def garbage_rows(self) -> int:
+        return self.index["rows"] - sum(s["n"] for s in self.index["sessions"].values())
+
+    def compact(self) -> int:
+        # rewrite the columns with live rows only (session order kept), then repoint the index
+        maps = self.columns()
+        live = sorted(self.index["sessions"].values(), key=lambda s: s["start"])
+        dropped = self.garbage_rows()
+        for name in COLUMNS:
+            tmp = self._col_path(name) + ".tmp"
+            with open(tmp, "wb") as f:
+                for s in live:
+                    f.write(maps[name][s["start"]:s["stop"]].tobytes())
+        self._maps = maps = None
+        for name in COLUMNS:
+            os.replace(self._col_path(name) + ".tmp", self._col_path(name))
+        pos = 0
+        for s in live:
+            s["start"], s["stop"] = pos, pos + s["n"]
+            pos += s["n"]
+        self.index["rows"] = pos
+        self._write_index()
+        return dropped
+
+# -------------------------
+# CLI
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar trajectory store (RT touches / LD JSON / frame logs)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_in = sub.add_parser("ingest", help="add new / changed exports")
+    p_in.add_argument("store")
+    p_in.add_argument("inputs", nargs="+", help="export files or directories (searched recursively)")
+    p_in.add_argument("--workers", type=int, default=1, help="parser processes (0 = all cores)")
+    p_ls = sub.add_parser("ls", help="list sessions")
+    p_ls.add_argument("store")
+    p_ls.add_argument("--module", default=None)
+    p_ls.add_argument("--pid", default=None)
+    p_show = sub.add_parser("show", help="print one session")
+    p_show.add_argument("store")
+    p_show.add_argument("key", help="record_id or record_id:kind")
+    p_show.add_argument("--rows", type=int, default=10)
+    p_cp = sub.add_parser("compact", help="drop rows of replaced sessions")
+    p_cp.add_argument("store")
+    args = parser.parse_args()
+
+    store = TrajStore(args.store)
+    if args.cmd == "ingest":
+        paths = [p for spec in args.inputs for p in collect_sources(spec)]
+        if not paths:
+            parser.error("no exports found")
+        t0 = time.perf_counter()
+        counts = store.ingest(paths, workers=args.workers or None)
+        print(f"=== {len(paths)} files in {time.perf_counter() - t0:.2f}s: "
+              + ", ".join(f"{k} {v}" for k, v in counts.items())
+              + f" | {len(store)} sessions, {store.index['rows']} rows ({store.garbage_rows()} garbage)")
+    elif args.cmd == "ls":
+        for k in store.keys(args.module, args.pid):
+            s = store.index["sessions"][k]
+            print(f"{k:40s} {s['n']:8d} rows  {s['meta'].get('test', '')}  {s['source']}")
+    elif args.cmd == "show":
+        with pd.option_context("display.width", 120):
+            print(store.to_frame(args.key).head(args.rows))
+    elif args.cmd == "compact":
+        print(f"dropped {store.compact()} rows -> {store.index['rows']} rows")
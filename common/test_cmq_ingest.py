@@ -0,0 +1,89 @@
+# test_cmq_ingest.py
+# Ingest naming (query vs file name, app export names, ts / clock fallback, rejects) and the server's
+# same-name handling: same bytes -> duplicate (nothing written), other bytes -> next free second
+
+import asyncio
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from cmq_ingest import HTTPError, IngestServer, analysis_kind, ingest_name, next_free
+
+NOW = datetime(2025, 10, 26, 14, 17, 5)
+
+@pytest.mark.parametrize("filename, query, name", [
+    ("SD_P003_20251026_141700.wav", {}, "SD_P003_20251026_141700.wav"),
+    ("SD_P003_20251026.WAV", {}, "SD_P003_20251026_141705.wav"),                 # no time -> clock
+    ("recording.webm", dict(module="sd", pid="P 003/x"), "SD_P-003-x_20251026_141705.webm"),
+    ("recording.wav", dict(module="SD", pid="P003", ts="20251001_090000"), "SD_P003_20251001_090000.wav"),
+    ("RT_touches_P01_20251020_141700.csv", {}, "RT_touches_P01_20251020_141700.csv"),
+    ("RT_P01_20251020_141700_frames.csv", {}, "RT_P01_20251020_141700_frames.csv"),
+    ("ataxia_data_P02_1761000000000.json", {}, "LD_P02_20251020_224000.json"),   # epoch ms, UTC
+    ("SD_P003_20251026_141700.wav", dict(pid="P009"), "SD_P009_20251026_141700.wav"),
+])
+def test_ingest_name(filename, query, name):
+    assert ingest_name(filename, now=NOW, **query)[0] == name
+
+@pytest.mark.parametrize("filename, query, code", [
+    ("recording.wav", dict(pid="P003"), 400),                                      # no module
+    ("recording.wav", dict(module="XX", pid="P003"), 400),
+    ("SD_P003_20251026_141700.wav", dict(module="RT"), 400),                      # name says SD
+    ("recording.wav", dict(module="SD"), 400),                                     # no pid
+    ("SD_P003_20251026_141700.exe", {}, 415),
+    ("recording.wav", dict(module="SD", pid="P003", ts="2025-10-26"), 400),
+])
+def test_ingest_name_rejects(filename, query, code):
+    with pytest.raises(HTTPError) as e:
+        ingest_name(filename, now=NOW, **query)
+    assert e.value.code == code
+
+def test_analysis_routing():
+    kind = lambda f: analysis_kind(ingest_name(f, now=NOW)[1])
+    assert kind("SD_P003_20251026_141700.wav") == "speech"
+    assert kind("ataxia_data_P02_1761000000000.json") == "ld"
+    assert kind("RT_P01_20251020_141700_frames.csv") == "rt_replay"
+    assert kind("RT_touches_P01_20251020_141700.csv") is None
+    assert kind("SD_P003_20251026_141700.csv") is None
+
+def test_next_free(tmp_path):
+    for n in ("RT_P01_20251020_235959_frames.csv", "RT_P01_20251021_000000_frames.csv"):
+        (tmp_path/n).write_text("x")
+    assert os.path.basename(next_free(str(tmp_path/"RT_P01_20251020_235959_frames.csv"))) == \
+        "RT_P01_20251021_000001_frames.csv"                                        # across midnight
+
+async def _upload(port, filename, body, token="t"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((f"POST /upload?filename={filename}&token={token} HTTP/1.1\r\nHost: x\r\n"
+                  f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode() + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, payload = data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+def test_upload_duplicates_and_collisions(tmp_path):
+    async def run():
+        srv = IngestServer(root=str(tmp_path), workers=1, token="t")
+        server = await srv.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        name = "RT_touches_P01_20251020_141700.csv"                               # stored only, no analysis
+        try:
+            first = await _upload(port, name, b"a,b\n1,2\n")
+            dup = await _upload(port, name, b"a,b\n1,2\n")
+            other = await _upload(port, name, b"a,b\n3,4\n")
+            denied = await _upload(port, name, b"a,b\n1,2\n", token="wrong")
+        finally:
+            await srv.close()
+        return first, dup, other, denied, srv.status()
+
+    first, dup, other, denied, status = asyncio.run(run())
+    assert first[0] == 201 and first[1]["state"] == "stored"
+    assert first[1]["path"] == os.path.join("RT", "raw", "RT_touches_P01_20251020_141700.csv")
+    assert dup[0] == 200 and dup[1]["state"] == "duplicate" and dup[1]["path"] == first[1]["path"]
+    assert other[0] == 201 and other[1]["record_id"] == "RT_P01_20251020_141701"
+    assert denied[0] == 401
+    assert sorted(os.listdir(tmp_path/"RT"/"raw")) == ["RT_touches_P01_20251020_141700.csv",
+                                                       "RT_touches_P01_20251020_141701.csv"]   # no .part left
+    assert (status["uploads"], status["duplicates"], status["stored_only"]) == (3, 1, 2)
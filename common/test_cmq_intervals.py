@@ -0,0 +1,85 @@
+# test_cmq_intervals.py
+# Interval arrays vs the per-frame / per-segment Python loops they replaced (_loop_runs / _loop_pauses below,
+# mask fill) on speech-like random masks
+
+import numpy as np
+import pytest
+
+from cmq_intervals import (runs, complement, to_mask, to_pairs, contains, merge_gaps, min_length, intersect,
+                           durations, as_intervals)
+
+# reference loops (speech_pipeline's VAD / pause code before the interval arrays)
+def _loop_runs(mask):
+    segs, start = [], None
+    for i, v in enumerate(mask):
+        if v and start is None:
+            start = i
+        if (not v) and (start is not None):
+            segs.append((start, i))
+            start = None
+    if start is not None:
+        segs.append((start, len(mask)))
+    return segs
+
+def _loop_pauses(segs, n):
+    pauses, last_end = [], 0
+    for s, e in segs:
+        if s > last_end:
+            pauses.append((last_end, s))
+        last_end = e
+    if last_end < n:
+        pauses.append((last_end, n))
+    return pauses
+
+def _mask(n, seed):
+    rng = np.random.default_rng(seed)
+    mask = np.repeat(np.arange(n) % 2 == 0, rng.integers(5, 150, n))[:n]
+    mask ^= rng.random(n) < 0.01
+    return mask, rng
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_runs_complement_mask_match_loops(seed):
+    n = 20_000
+    mask, _ = _mask(n, seed)
+    ref = _loop_runs(mask)
+    iv = runs(mask)
+    assert to_pairs(iv) == ref
+    assert to_pairs(complement(iv, 0, n)) == _loop_pauses(ref, n)
+    ref_m = np.zeros(n, dtype=bool)
+    for s, e in ref:
+        ref_m[s:e] = True
+    assert np.array_equal(to_mask(iv, n), ref_m) and np.array_equal(ref_m, mask)
+
+def test_edges():
+    for m in ([], [True], [False], [True, True], [False, True], [True, False, True]):
+        assert to_pairs(runs(m)) == _loop_runs(m)
+        assert to_pairs(complement(runs(m), 0, len(m))) == _loop_pauses(_loop_runs(m), len(m))
+
+def test_contains_matches_mask():
+    n = 20_000
+    mask, rng = _mask(n, 3)
+    pts = rng.integers(0, n, 10_000)
+    assert np.array_equal(contains(runs(mask), pts) >= 0, mask[pts])
+
+def test_merge_gaps_min_length_intersect():
+    n = 20_000
+    mask, rng = _mask(n, 4)
+    iv = runs(mask)
+    sm = min_length(merge_gaps(iv, 5), 10)
+    ref, last = [], None
+    for s, e in to_pairs(iv):
+        if last is not None and s - last[1] <= 5:
+            last = (last[0], e)
+        else:
+            if last is not None:
+                ref.append(last)
+            last = (s, e)
+    ref.append(last)
+    assert to_pairs(sm) == [(s, e) for s, e in ref if e - s >= 10]
+    other = runs(rng.random(n) < 0.5)
+    assert np.array_equal(to_mask(intersect(sm, other), n), to_mask(sm, n) & to_mask(other, n))
+
+def test_durations():
+    t = np.array([0.0, 0.1, 0.25, 0.3, 0.5])
+    iv = as_intervals([(0, 2), (3, 5)])
+    assert np.allclose(durations(iv, t), [0.25, 0.2])
@@ -0,0 +1,124 @@
+# test_cmq_trajstore.py
+# TrajStore ingest (RT touches / LD JSON / frame logs), incremental re-ingest, copies vs conflicts,
+# compact, and the interrupted-ingest tail trim; sessions read back equal to the parsed exports
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from cmq_trajstore import FLAG_INSIDE, FLAG_START, TrajStore, collect_sources
+
+def _rt_touches(path, seed=0, n=40):
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        f.write("trial_idx,frame_idx,timestamp,x_px,y_px,inside\n")
+        for i in range(n):
+            f.write(f"{i//10},{i%10},2025-10-20T14:17:{i//10:02d}.{100*(i%10):03d}Z,"
+                    f"{rng.uniform(0, 640):.1f},{rng.uniform(0, 480):.1f},{int(rng.random() < 0.3)}\n")
+
+def _ld_json(path, strokes):
+    with open(path, "w") as f:
+        json.dump(dict(test="test1", patient=dict(id="P02"), touches=strokes), f)
+
+def _frame_log(path, n=25):
+    with open(path, "w") as f:
+        f.write("# preset=251020 seed=7\nframe_idx,t,tip_x,tip_y\n")
+        for i in range(n):
+            f.write(f"{i},{i/30:.6f},{'' if i == 3 else 100 + i},{'' if i == 3 else 200 - i}\n")
+
+@pytest.fixture
+def exports(tmp_path):
+    d = tmp_path/"exports"
+    d.mkdir()
+    _rt_touches(d/"RT_touches_P01_20251020_141700.csv")
+    _ld_json(d/"ataxia_data_P02_1761000000000.json", [[[10, 20, 1761000000000], [12, 22, 1761000000016]],
+                                                       [[30, 40, 1761000000500]]])
+    _frame_log(d/"RT_P03_20251021_101500_frames.csv")
+    (d/"notes.csv").write_text("a,b\n1,2\n")
+    return d
+
+def test_ingest_and_read_back(exports, tmp_path):
+    store = TrajStore(str(tmp_path/"store"))
+    counts = store.ingest(collect_sources(str(exports)), verbose=False)
+    assert counts == dict(added=3, updated=0, unchanged=0, skipped=1, conflict=0, error=0)
+    assert sorted(store.keys()) == ["LD_P02_20251020_224000:ld", "RT_P01_20251020_141700:touches",
+                                    "RT_P03_20251021_101500:frames"]
+
+    rt = store.session("RT_P01_20251020_141700")
+    assert len(rt["t"]) == 40 and rt["trial"].tolist() == [i//10 for i in range(40)]
+    assert np.flatnonzero(rt["flags"] & FLAG_START).tolist() == [0, 10, 20, 30]
+    assert rt["t"][11] - rt["t"][0] == pytest.approx(1.1)
+    ld = store.session("LD_P02_20251020_224000:ld")
+    assert ld["x"].tolist() == [10, 12, 30] and ld["frame"].tolist() == [0, 1, 0] and ld["trial"].tolist() == [0, 0, 1]
+    assert ld["t"][1] - ld["t"][0] == pytest.approx(0.016, abs=1e-6) and store.info("LD_P02_20251020_224000")["pid"] == "P02"
+    fr = store.session("RT_P03_20251021_101500")
+    assert np.isnan(fr["x"][3]) and fr["x"][4] == 104 and store.info("RT_P03_20251021_101500")["meta"]["seed"] == "7"
+    assert isinstance(rt["x"], np.memmap)                                 # zero-copy views of the columns
+
+    again = TrajStore(store.root)                                         # reopened from index.json
+    assert again.ingest(collect_sources(str(exports)), verbose=False)["unchanged"] == 3
+    assert again.to_frame("RT_P01_20251020_141700").equals(store.to_frame("RT_P01_20251020_141700"))
+
+def test_update_then_compact(exports, tmp_path):
+    store = TrajStore(str(tmp_path/"store"))
+    store.ingest(collect_sources(str(exports)), verbose=False)
+    ld_before = store.to_frame("LD_P02_20251020_224000")
+    rt = exports/"RT_touches_P01_20251020_141700.csv"
+    _rt_touches(rt, seed=1, n=30)
+    os.utime(rt, (1e9, 1e9))
+    counts = store.ingest(collect_sources(str(exports)), verbose=False)
+    assert counts["updated"] == 1 and counts["unchanged"] == 2
+    assert store.garbage_rows() == 40 and len(store.session("RT_P01_20251020_141700")["t"]) == 30
+    new = store.to_frame("RT_P01_20251020_141700")
+
+    assert store.compact() == 40
+    assert store.garbage_rows() == 0 and store.index["rows"] == 30 + 3 + 25
+    assert os.path.getsize(store._col_path("t")) == 8*store.index["rows"]
+    fresh = TrajStore(store.root)
+    assert fresh.to_frame("RT_P01_20251020_141700").equals(new)
+    assert fresh.to_frame("LD_P02_20251020_224000").equals(ld_before)
+
+def test_copies_and_conflicts(exports, tmp_path):
+    store = TrajStore(str(tmp_path/"store"))
+    src = exports/"RT_touches_P01_20251020_141700.csv"
+    store.ingest([str(src)], verbose=False)
+    other = tmp_path/"backup"
+    other.mkdir()
+    shutil.copy(src, other/src.name)                                      # same bytes, other path
+    assert store.ingest([str(other/src.name)], verbose=False)["unchanged"] == 1
+    info = store.info("RT_P01_20251020_141700")
+    assert list(info["copies"]) == [str(other/src.name)] and store.garbage_rows() == 0
+    assert store.ingest([str(src), str(other/src.name)], verbose=False)["unchanged"] == 2   # size + mtime only
+
+    clash = tmp_path/"clash"
+    clash.mkdir()
+    _rt_touches(clash/src.name, seed=5, n=12)                              # same key, different bytes
+    kept = store.to_frame("RT_P01_20251020_141700")
+    assert store.ingest([str(clash/src.name)], verbose=False)["conflict"] == 1
+    assert store.to_frame("RT_P01_20251020_141700").equals(kept) and store.index["rows"] == 40
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_conflict_owner_is_input_order(exports, tmp_path, workers):
+    a, b = tmp_path/"a", tmp_path/"b"
+    a.mkdir(), b.mkdir()
+    name = "RT_touches_P09_20251022_090000.csv"
+    _rt_touches(a/name, seed=1, n=20)
+    _rt_touches(b/name, seed=2, n=30)
+    store = TrajStore(str(tmp_path/"store"))
+    counts = store.ingest([str(b/name), str(a/name)], workers=workers, verbose=False)
+    assert (counts["added"], counts["conflict"]) == (1, 1)
+    assert store.info("RT_P09_20251022_090000")["source"] == str(b/name)
+
+def test_interrupted_ingest_tail_is_trimmed(exports, tmp_path):
+    store = TrajStore(str(tmp_path/"store"))
+    store.ingest([str(exports/"RT_touches_P01_20251020_141700.csv")], verbose=False)
+    with open(store._col_path("t"), "ab") as f:                           # rows written, index never replaced
+        f.write(np.arange(7, dtype="<f8").tobytes())
+    store = TrajStore(store.root)
+    store.ingest([str(exports/"RT_P03_20251021_101500_frames.csv")], verbose=False)
+    fr = store.session("RT_P03_20251021_101500")
+    assert fr["t"][0] == 0.0 and fr["t"][1] == pytest.approx(1/30, abs=1e-6)
+    assert os.path.getsize(store._col_path("t")) == 8*store.index["rows"] == 8*(40 + 25)